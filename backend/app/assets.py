@@ -0,0 +1,164 @@
+"""
+In-memory, precompressed static assets for the SPA.
+
+The built frontend (static/) is small and only changes on deploy, so it is
+read once at startup into a manifest of URL path -> StaticAsset holding the
+body, a gzip copy when that is worth it, the ETag and the content type.
+The catch-all route then answers from memory: no stat or open per request,
+and unknown routes fall back to the cached index.html.
+
+Vite's content-hashed bundles (assets/<name>-<hash>.<ext>) never change
+under the same name and are sent with a year-long immutable Cache-Control;
+everything else, index.html included, is revalidated through its ETag.
+gzip is negotiated from Accept-Encoding, with Vary so shared caches keep
+the two encodings apart.
+"""
+import gzip
+import mimetypes
+import os
+import re
+import threading
+from typing import Dict, NamedTuple, Optional
+
+from fastapi import Response
+
+from .cache import etag_matches, make_etag
+
+STATIC_DIR = os.getenv("STATIC_DIR", "static")
+# Bodies smaller than this are not worth a Content-Encoding
+ASSET_GZIP_MIN_BYTES = int(os.getenv("ASSET_GZIP_MIN_BYTES", "512"))
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Vite output names: assets/index-B4kYc0eR.js, assets/logo-3f9a1c2d.svg
+_HASHED = re.compile(r"(?:^|/)assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+_COMPRESSIBLE = ("text/", "application/javascript", "application/json", "application/xml",
+                 "image/svg+xml", "application/manifest+json", "font/ttf", "font/otf")
+
+
+class StaticAsset(NamedTuple):
+    body: bytes
+    gzip_body: Optional[bytes]
+    etag: str
+    content_type: str
+    cache_control: str
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether an Accept-Encoding header allows gzip; an explicit gzip entry overrides *"""
+    if not accept_encoding:
+        return False
+    qualities: Dict[str, float] = {}
+    for coding in accept_encoding.lower().split(","):
+        name, *params = (part.strip() for part in coding.split(";"))
+        if name not in ("gzip", "*"):
+            continue
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        qualities[name] = quality
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+
+def build_asset(path: str, body: bytes) -> StaticAsset:
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    gzip_body = None
+    if len(body) >= ASSET_GZIP_MIN_BYTES and content_type.startswith(_COMPRESSIBLE):
+        # mtime=0 keeps the output identical across workers and restarts
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(compressed) < len(body) * 0.9:
+            gzip_body = compressed
+    return StaticAsset(
+        body=body,
+        gzip_body=gzip_body,
+        etag=make_etag(body),
+        content_type=content_type,
+        cache_control=IMMUTABLE if _HASHED.search(path) else REVALIDATE,
+    )
+
+
+class AssetManifest:
+    """URL path -> StaticAsset for every file under the static directory"""
+
+    def __init__(self):
+        self._assets: Dict[str, StaticAsset] = {}
+        self.index: Optional[StaticAsset] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.fallbacks = 0
+        self.not_modified = 0
+        self.gzipped = 0
+
+    def load(self, directory: str = STATIC_DIR) -> int:
+        """Read and compress every file under directory; returns the file count"""
+        assets: Dict[str, StaticAsset] = {}
+        for root, _, files in os.walk(directory):
+            for name in files:
+                file_path = os.path.join(root, name)
+                path = os.path.relpath(file_path, directory).replace(os.sep, "/")
+                with open(file_path, "rb") as f:
+                    assets[path] = build_asset(path, f.read())
+        self._assets = assets
+        self.index = assets.get("index.html")
+        return len(assets)
+
+    def get(self, path: str) -> Optional[StaticAsset]:
+        return self._assets.get(path.lstrip("/"))
+
+    def __len__(self) -> int:
+        return len(self._assets)
+
+    def response(self, path: str, accept_encoding: Optional[str] = None,
+                 if_none_match: Optional[str] = None) -> Optional[Response]:
+        """The asset at path, or index.html for unknown paths; None without an index"""
+        asset = self.get(path)
+        with self._lock:
+            if asset is not None:
+                self.hits += 1
+            else:
+                self.fallbacks += 1
+        asset = asset or self.index
+        if asset is None:
+            return None
+
+        use_gzip = asset.gzip_body is not None and accepts_gzip(accept_encoding)
+        # Each encoding is a different representation, so it gets its own ETag
+        etag = asset.etag[:-1] + '-gzip"' if use_gzip else asset.etag
+        headers = {"ETag": etag, "Cache-Control": asset.cache_control}
+        if asset.gzip_body is not None:
+            headers["Vary"] = "Accept-Encoding"
+        if etag_matches(if_none_match, etag):
+            with self._lock:
+                self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+            with self._lock:
+                self.gzipped += 1
+        return Response(
+            content=asset.gzip_body if use_gzip else asset.body,
+            media_type=asset.content_type,
+            headers=headers,
+        )
+
+    def stats(self) -> dict:
+        assets = list(self._assets.values())
+        with self._lock:
+            return {
+                "files": len(assets),
+                "bytes": sum(len(a.body) for a in assets),
+                "gzip_bytes": sum(len(a.gzip_body) for a in assets if a.gzip_body is not None),
+                "hits": self.hits,
+                "fallbacks": self.fallbacks,
+                "not_modified": self.not_modified,
+                "gzipped": self.gzipped,
+            }
+
+
+# Process-wide manifest, loaded by main.py when the static directory exists
+static_assets = AssetManifest()
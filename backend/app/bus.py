@@ -0,0 +1,353 @@
+"""
+Event bus keeping per-worker in-memory state coherent.
+
+With several uvicorn workers every process has its own leaderboard cache,
+identity cache, ranking index and presence registry, so a score submitted
+to one worker leaves the others stale. Code that changes shared state
+publishes a small JSON event on a topic, and each worker applies the events
+published by the other workers to its own copies:
+
+    scores    rows committed by Database.add_scores (caches, index, windows)
+    presence  heartbeats and departures from PresenceRegistry
+
+A process never receives its own events; it has already applied them.
+
+A worker opens the bus with hold=True before it loads its state from the
+database and calls release() once loaded: events published meanwhile are
+buffered, then applied on top of the loaded state (applying is idempotent,
+so rows the load already saw are skipped). Every event carries a sequence
+number per publishing process. A gap in it means events were lost (a full
+peer queue, an oversized event, an overflowing hold buffer), and instead of
+carrying on with state that silently diverged the bus calls its resync
+handlers, which reload from the database. Presence needs no resync: the
+next heartbeats, or the TTL, correct it.
+
+Backends, chosen with BUS_BACKEND:
+
+* local (default): delivery to buses sharing the same LocalBackend, i.e.
+  within one process. Nothing leaves the process; right for one worker.
+* unix: brokerless delivery between the workers of one node. Each worker
+  binds a Unix datagram socket in BUS_SOCKET_DIR and sends every event to
+  the sockets of the other workers found there (the listing is refreshed
+  every BUS_PEER_REFRESH seconds). Sockets of dead workers are removed when
+  a send to them is refused. A peer whose receive queue is full misses the
+  event (counted as dropped), so publishers never block.
+"""
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional
+
+BUS_BACKEND = os.getenv("BUS_BACKEND", "local")
+BUS_SOCKET_DIR = os.getenv("BUS_SOCKET_DIR", os.path.join(tempfile.gettempdir(), "snaky-arena-bus"))
+BUS_PEER_REFRESH = float(os.getenv("BUS_PEER_REFRESH", "1"))
+# Events buffered while a worker loads its state; beyond this it resyncs
+BUS_HOLD_LIMIT = int(os.getenv("BUS_HOLD_LIMIT", "10000"))
+
+SCORES_TOPIC = "scores"
+PRESENCE_TOPIC = "presence"
+
+# Largest event a Unix datagram reliably carries with default socket buffers
+MAX_MESSAGE_BYTES = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[dict], None]
+ResyncHandler = Callable[[], None]
+Receiver = Callable[[bytes], None]
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class LocalBackend:
+    """Delivers each message to every receiver opened on this instance"""
+
+    def __init__(self):
+        self._receivers: List[Receiver] = []
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def open(self, receiver: Receiver):
+        with self._lock:
+            self._receivers.append(receiver)
+
+    def send(self, message: bytes):
+        with self._lock:
+            receivers = list(self._receivers)
+        for receiver in receivers:
+            receiver(message)
+
+    def close(self, receiver: Receiver):
+        with self._lock:
+            if receiver in self._receivers:
+                self._receivers.remove(receiver)
+
+    def stats(self) -> dict:
+        return {"peers": max(len(self._receivers) - 1, 0), "dropped": self.dropped}
+
+
+class UnixSocketBackend:
+    """One datagram socket per worker in a shared directory; sends go to all the others"""
+
+    def __init__(self, directory: str = BUS_SOCKET_DIR, peer_refresh: float = BUS_PEER_REFRESH):
+        self.directory = directory
+        self.peer_refresh = peer_refresh
+        self.path: Optional[str] = None
+        self._inbox: Optional[socket.socket] = None
+        self._outbox: Optional[socket.socket] = None
+        self._reader: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+        self._peers: List[str] = []
+        self._peers_at = 0.0
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def open(self, receiver: Receiver):
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        self._inbox = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._inbox.bind(self.path)
+        # Wake up regularly so close() can stop the reader
+        self._inbox.settimeout(0.5)
+        self._outbox = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._outbox.setblocking(False)
+        self._closed.clear()
+        self._reader = threading.Thread(target=self._read, args=(self._inbox, receiver), name="event-bus", daemon=True)
+        self._reader.start()
+
+    def _read(self, inbox: socket.socket, receiver: Receiver):
+        while not self._closed.is_set():
+            try:
+                message = inbox.recv(MAX_MESSAGE_BYTES)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            receiver(message)
+
+    def peers(self) -> List[str]:
+        """Sockets of the other workers, listed at most every peer_refresh seconds"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._peers_at >= self.peer_refresh:
+                try:
+                    names = os.listdir(self.directory)
+                except FileNotFoundError:
+                    names = []
+                self._peers = [
+                    os.path.join(self.directory, name) for name in names
+                    if name.endswith(".sock") and os.path.join(self.directory, name) != self.path
+                ]
+                self._peers_at = now
+            return list(self._peers)
+
+    def _forget(self, peer: str):
+        with self._lock:
+            if peer in self._peers:
+                self._peers.remove(peer)
+
+    def send(self, message: bytes):
+        if self._outbox is None:
+            return
+        for peer in self.peers():
+            try:
+                self._outbox.sendto(message, peer)
+            except ConnectionRefusedError:
+                # Nobody reads this socket any more: its worker has exited
+                self._forget(peer)
+                try:
+                    os.unlink(peer)
+                except OSError:
+                    pass
+            except FileNotFoundError:
+                self._forget(peer)
+            except OSError:
+                # Receive queue full (EAGAIN) or message too large (EMSGSIZE)
+                with self._lock:
+                    self.dropped += 1
+
+    def close(self, receiver: Receiver):
+        self._closed.set()
+        for sock in (self._inbox, self._outbox):
+            if sock is not None:
+                sock.close()
+        if self._reader is not None:
+            self._reader.join(timeout=1)
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+        self._inbox = self._outbox = self._reader = self.path = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"peers": len(self._peers), "dropped": self.dropped}
+
+
+def make_backend(name: str = BUS_BACKEND):
+    if name == "local":
+        return LocalBackend()
+    if name == "unix":
+        return UnixSocketBackend()
+    raise ValueError(f"Unknown BUS_BACKEND {name!r}: expected 'local' or 'unix'")
+
+
+class EventBus:
+    """Topic pub/sub between worker processes over a pluggable backend"""
+
+    def __init__(self, backend=None, hold_limit: int = BUS_HOLD_LIMIT):
+        self.backend = backend if backend is not None else LocalBackend()
+        self.origin = uuid.uuid4().hex
+        self.hold_limit = hold_limit
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._resync_handlers: List[ResyncHandler] = []
+        self._opened = False
+        self._lock = threading.Lock()
+        # Serialises numbering and sending, so peers see each origin's events in order
+        self._send_lock = threading.Lock()
+        # Serialises delivery, so held events are applied before later ones
+        self._deliver_lock = threading.Lock()
+        self._seq = 0
+        self._last_seq: Dict[str, int] = {}
+        self._holding = False
+        self._held: List[bytes] = []
+        self._overflowed = False
+        self.published = 0
+        self.received = 0
+        self.errors = 0
+        self.gaps = 0
+        self.duplicates = 0
+        self.resyncs = 0
+
+    def subscribe(self, topic: str, handler: Handler):
+        """Call handler(data) for each event on topic published by another process"""
+        self._handlers.setdefault(topic, []).append(handler)
+
+    def on_resync(self, handler: ResyncHandler):
+        """Call handler() when events from another process were lost"""
+        self._resync_handlers.append(handler)
+
+    def open(self, hold: bool = False):
+        """Start receiving; with hold=True events are buffered until release()"""
+        if not self._opened:
+            with self._deliver_lock:
+                self._holding = hold
+            self.backend.open(self._deliver)
+            self._opened = True
+
+    def release(self):
+        """Apply the events held since open(hold=True), then apply events as they arrive"""
+        with self._deliver_lock:
+            held, self._held = self._held, []
+            if self._overflowed:
+                self._overflowed = False
+                self._resync()
+            for message in held:
+                self._dispatch(message)
+            self._holding = False
+
+    def close(self):
+        if self._opened:
+            self.backend.close(self._deliver)
+            self._opened = False
+
+    def publish(self, topic: str, data: dict):
+        with self._send_lock:
+            # Numbered even when not sent, so peers notice the gap
+            self._seq += 1
+            message = json.dumps(
+                {"origin": self.origin, "seq": self._seq, "topic": topic, "data": data},
+                separators=(",", ":"), default=_encode_value,
+            ).encode()
+            if len(message) > MAX_MESSAGE_BYTES:
+                logger.warning("event on %s is %d bytes, over the %d byte limit; not sent",
+                               topic, len(message), MAX_MESSAGE_BYTES)
+                with self._lock:
+                    self.errors += 1
+                return
+            with self._lock:
+                self.published += 1
+            self.backend.send(message)
+
+    def _deliver(self, message: bytes):
+        with self._deliver_lock:
+            if not self._holding:
+                self._dispatch(message)
+            elif len(self._held) < self.hold_limit:
+                self._held.append(message)
+            else:
+                self._overflowed = True
+
+    def _resync(self):
+        # Caller holds the delivery lock
+        logger.warning("event bus lost events from another worker; reloading shared state")
+        with self._lock:
+            self.resyncs += 1
+        for handler in self._resync_handlers:
+            try:
+                handler()
+            except Exception:
+                logger.exception("event bus resync handler failed")
+                with self._lock:
+                    self.errors += 1
+
+    def _dispatch(self, message: bytes):
+        # Caller holds the delivery lock
+        try:
+            event = json.loads(message)
+        except ValueError:
+            with self._lock:
+                self.errors += 1
+            return
+        origin = event.get("origin")
+        if origin == self.origin:
+            return
+        seq = event.get("seq", 0)
+        last = self._last_seq.get(origin)
+        if last is not None and seq <= last:
+            with self._lock:
+                self.duplicates += 1
+            return
+        self._last_seq[origin] = seq
+        if last is not None and seq > last + 1:
+            with self._lock:
+                self.gaps += 1
+            # The reload already includes this event's rows; applying it again is a no-op
+            self._resync()
+        with self._lock:
+            self.received += 1
+        for handler in self._handlers.get(event.get("topic"), ()):
+            try:
+                handler(event["data"])
+            except Exception:
+                logger.exception("event bus handler for %s failed", event.get("topic"))
+                with self._lock:
+                    self.errors += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "published": self.published,
+                "received": self.received,
+                "errors": self.errors,
+                "gaps": self.gaps,
+                "duplicates": self.duplicates,
+                "resyncs": self.resyncs,
+                "held": len(self._held),
+                **self.backend.stats(),
+            }
+
+
+# Process-wide bus; main.py subscribes the handlers, opens it before loading and releases it after
+event_bus = EventBus(make_backend())
@@ -0,0 +1,135 @@
+"""
+Versioned response cache for leaderboard reads.
+
+Encoded response bodies are cached per (mode, key) together with the
+version of the mode they were built from. Database.add_score bumps the
+version after it commits, which makes every cached body for that mode (and
+for the combined board) stale without touching the other modes.
+render_leaderboard serves a board from the cache, building it on a miss;
+the leaderboard route and startup warm-up share it.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+
+from .database import run_db
+from .serialization import encode_leaderboard
+from .windows import window_start
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    version: int
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag derived from the body, stable across workers and restarts"""
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header value against an ETag"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class LeaderboardCache:
+    """Bounded LRU of encoded leaderboard bodies, invalidated by per-mode versions"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._versions: Dict[Optional[str], int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, mode: Optional[str]) -> int:
+        """Current version of a mode; None is the combined board"""
+        return self._versions.get(mode, 0)
+
+    def invalidate(self, mode: str):
+        """Mark cached bodies for the mode and the combined board stale"""
+        with self._lock:
+            self._versions[mode] = self._versions.get(mode, 0) + 1
+            self._versions[None] = self._versions.get(None, 0) + 1
+
+    def invalidate_all(self):
+        """Mark every cached body stale, keeping the counters"""
+        with self._lock:
+            for mode in {None, *self._versions, *(mode for mode, _ in self._entries)}:
+                self._versions[mode] = self._versions.get(mode, 0) + 1
+            self._entries.clear()
+
+    def get(self, mode: Optional[str], key: Hashable) -> Optional[CachedResponse]:
+        """Cached body for (mode, key) if it is still current"""
+        key = (mode, key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != self._versions.get(mode, 0):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, mode: Optional[str], key: Hashable, version: int, body: bytes) -> CachedResponse:
+        """Store a body built from the given version (read before querying)"""
+        entry = CachedResponse(body, make_etag(body), version)
+        key = (mode, key)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        """Drop all cached bodies and counters"""
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Process-wide cache shared by the leaderboard router and Database.add_score
+leaderboard_cache = LeaderboardCache()
+
+
+async def render_leaderboard(
+    session: Session, mode: Optional[str], limit: int, scope: str = "all", window: str = "all"
+) -> CachedResponse:
+    """Encoded leaderboard from the cache, querying and caching it on a miss"""
+    # db imports this module for leaderboard_cache
+    from .db import get_db_instance
+
+    # The window start is part of the key so cached boards roll over at midnight UTC
+    key = (scope, window, window_start(window) if window != "all" else None, limit)
+    
+    # The session is lazy, so a cache hit never opens a connection
+    cached = leaderboard_cache.get(mode, key)
+    if cached is None:
+        version = leaderboard_cache.version(mode)
+        db = get_db_instance(session)
+        if window != "all":
+            records, first_rank = await run_db(db.window_leaderboard_records, window, mode=mode, limit=limit)
+        else:
+            read = db.best_leaderboard_records if scope == "best" else db.leaderboard_records
+            records, first_rank = await run_db(read, mode=mode, limit=limit)
+        body = encode_leaderboard(records, first_rank)
+        cached = leaderboard_cache.put(mode, key, version, body)
+    return cached
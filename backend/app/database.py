@@ -2,27 +2,107 @@
 Database configuration and session management for SQLAlchemy.
 Supports both PostgreSQL and SQLite databases.
 """
+import asyncio
+import contextvars
+import functools
+import hashlib
 import os
-from sqlalchemy import create_engine
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, create_engine, delete, event, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.schema import CreateIndex, CreateTable
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 
 # Database URL from environment variable, defaults to SQLite
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./snaky_arena.db")
+# Optional separate URL (e.g. a replica) for read-only traffic
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", DATABASE_URL)
 
-# Create SQLAlchemy engine
-# For SQLite, we need check_same_thread=False to work with FastAPI
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        DATABASE_URL,
-        connect_args={"check_same_thread": False}
-    )
+# Connection pool sizing (file SQLite and PostgreSQL)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# PostgreSQL: per-statement timeout, 0 disables it
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "5000"))
+
+# SQLite pragmas applied to every new connection
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negative = KiB
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+def is_memory_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and (":memory:" in url or url.rstrip("/") == "sqlite:")
+
+def storage_profile(url: str, read_only: bool = False) -> dict:
+    """
+    create_engine keyword arguments for the storage profile matching a URL:
+    SQLite gets thread sharing (plus pool sizing for files), PostgreSQL gets
+    an explicit pool, pre-ping and a statement timeout.
+    """
+    if url.startswith("sqlite"):
+        # For SQLite, we need check_same_thread=False to work with FastAPI
+        options = {"connect_args": {"check_same_thread": False}}
+        if not is_memory_sqlite(url):
+            options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+        return options
+    
+    pg_options = []
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        pg_options.append(f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}")
+    if read_only:
+        pg_options.append("-c default_transaction_read_only=on")
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+    if pg_options and url.startswith("postgres"):
+        options["connect_args"] = {"options": " ".join(pg_options)}
+    return options
+
+def _apply_sqlite_pragmas(engine: Engine, read_only: bool):
+    memory = is_memory_sqlite(str(engine.url))
+    
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not memory:
+            cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+            cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+def create_db_engine(url: str, read_only: bool = False) -> Engine:
+    """Create an engine configured with the storage profile for its URL"""
+    db_engine = create_engine(url, **storage_profile(url, read_only=read_only))
+    if url.startswith("sqlite"):
+        _apply_sqlite_pragmas(db_engine, read_only)
+    return db_engine
+
+# Create SQLAlchemy engines: one for writes, one for leaderboard/live reads
+engine = create_db_engine(DATABASE_URL)
+if DATABASE_READ_URL == DATABASE_URL and is_memory_sqlite(DATABASE_URL):
+    # A second in-memory engine would be a different, empty database
+    read_engine = engine
 else:
-    # PostgreSQL doesn't need special connect_args
-    engine = create_engine(DATABASE_URL)
+    read_engine = create_db_engine(DATABASE_READ_URL, read_only=True)
 
 # Create SessionLocal class for database sessions
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 # Base class for declarative models
 Base = declarative_base()
@@ -30,7 +110,7 @@ Base = declarative_base()
 def get_db() -> Session:
     """
     Dependency function to get database session.
-    Yields a session and ensures it's closed after use.
+    Yields a session on the write engine and ensures it's closed after use.
     """
     db = SessionLocal()
     try:
@@ -38,9 +118,97 @@ def get_db() -> Session:
     finally:
         db.close()
 
-def init_db():
+def get_read_db() -> Session:
+    """
+    Session on the read engine, which may be a lagging replica. Only for
+    endpoints that tolerate slightly stale data (the public leaderboard
+    lists); anything a user expects to reflect their own writes, such as
+    /auth/me or /leaderboard/around-me, uses get_db.
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Bounded executor for blocking database calls made from async routers.
+# Sized to the connection pool (pool_size + max_overflow) so queued calls
+# wait here rather than inside the pool; DB_THREADS=0 runs calls inline on
+# the event loop.
+DB_THREADS = int(os.getenv("DB_THREADS", str(DB_POOL_SIZE + DB_MAX_OVERFLOW)))
+_db_executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="db") if DB_THREADS > 0 else None
+
+async def run_db(fn, *args, **kwargs):
+    """
+    Run a blocking database call on the DB executor and await its result,
+    so concurrent requests overlap their database round trips. The call
+    runs in a copy of the caller's context, so per-request state such as
+    the metrics accumulator follows it onto the thread.
+    """
+    if _db_executor is None:
+        return fn(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_db_executor, functools.partial(context.run, fn, *args, **kwargs))
+
+# Part of the fingerprint: bump it when init_db starts doing more to an
+# existing database, so databases stamped by an older init_db run it again.
+# 2: indexes declared after their table was created are added.
+SCHEMA_INIT_REVISION = 2
+
+# Fingerprint of the schema the tables were last created from. Kept out of
+# Base.metadata so it is not part of its own fingerprint.
+schema_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    schema_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("fingerprint", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+def schema_fingerprint(db_engine: Engine) -> str:
+    """Hash of the DDL for every table and index in Base.metadata"""
+    ddl = [f"init revision {SCHEMA_INIT_REVISION}"]
+    for table in Base.metadata.sorted_tables:
+        ddl.append(str(CreateTable(table).compile(dialect=db_engine.dialect)))
+        ddl.extend(sorted(str(CreateIndex(index).compile(dialect=db_engine.dialect)) for index in table.indexes))
+    return hashlib.sha256("\n".join(ddl).encode()).hexdigest()[:16]
+
+def stored_schema_fingerprint(db_engine: Engine):
+    """Fingerprint recorded by the last init_db, or None"""
+    try:
+        with db_engine.connect() as connection:
+            return connection.execute(
+                select(schema_version.c.fingerprint).where(schema_version.c.id == 1)
+            ).scalar()
+    except SQLAlchemyError:
+        # No schema_version table yet
+        return None
+
+def init_db(check_version: bool = False, db_engine: Engine = None) -> bool:
     """
     Initialize database by creating all tables.
-    Should be called on application startup.
+    Should be called on application startup. With check_version, the
+    create_all (which inspects every table and index) is skipped when the
+    stored schema fingerprint matches the models. Returns whether it ran.
     """
-    Base.metadata.create_all(bind=engine)
+    db_engine = db_engine if db_engine is not None else engine
+    fingerprint = schema_fingerprint(db_engine)
+    if check_version and stored_schema_fingerprint(db_engine) == fingerprint:
+        return False
+    
+    # Stamped only once every step below has succeeded: a stamp with missing
+    # indexes would make every fast startup skip creating them
+    Base.metadata.create_all(bind=db_engine)
+    # create_all skips tables that exist, and with them any index added to their model since
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db_engine, checkfirst=True)
+    schema_metadata.create_all(bind=db_engine)
+    with db_engine.begin() as connection:
+        connection.execute(delete(schema_version))
+        connection.execute(insert(schema_version).values(
+            id=1, fingerprint=fingerprint, applied_at=datetime.now(timezone.utc)
+        ))
+    return True
@@ -2,16 +2,31 @@
 Database operations layer using SQLAlchemy.
 Replaces the mock database with real database queries.
 """
+import bisect
 from datetime import datetime, timezone
 import uuid
-from typing import List, Optional, Dict
+from typing import Iterable, List, Optional, Dict, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, insert, select, func, and_, or_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from .models import User, UserCreate, LeaderboardEntry, ActivePlayer
-from .db_models import UserModel, ScoreModel, ActivePlayerModel
-from passlib.context import CryptContext
+from .db_models import UserModel, ScoreModel, ActivePlayerModel, BestScoreModel
+from .ranking import leaderboard_index, score_key, normalize_date, ScoreRecord
+from .pagination import Cursor
+from .windows import window_boards, window_start_datetime, Window
+from .cache import leaderboard_cache
+from .identity import identity_cache
+from .hashing import pwd_context
+from .bus import SCORES_TOPIC, event_bus
+from .database import SessionLocal
+from . import queries
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# Score rows per bus event (about 150 bytes each once encoded)
+SCORES_PER_EVENT = 200
+
+# Consecutive leaderboard records and the rank of the first
+Board = Tuple[List[ScoreRecord], int]
 
 class Database:
     """Database operations using SQLAlchemy"""
@@ -19,15 +34,15 @@ class Database:
     def __init__(self, session: Session):
         self.session = session
     
-    def create_user(self, user: UserCreate) -> Optional[User]:
-        """Create a new user"""
+    def create_user(self, user: UserCreate, hashed_password: Optional[str] = None) -> Optional[User]:
+        """Create a new user (pass hashed_password to skip hashing inline)"""
         # Check if user already exists
         existing = self.session.query(UserModel).filter(UserModel.email == user.email).first()
         if existing:
             return None
         
         # Create new user
-        hashed_pw = pwd_context.hash(user.password)
+        hashed_pw = hashed_password or pwd_context.hash(user.password)
         db_user = UserModel(
             id=str(uuid.uuid4()),
             username=user.username,
@@ -51,123 +66,372 @@ class Database:
             createdAt=db_user.created_at
         )
     
+    def _read(self, statement, **params):
+        """Run a prebuilt read statement from app.queries; rows are plain tuples"""
+        return self.session.connection().execute(statement, params)
+    
     def get_user_by_email(self, email: str) -> Optional[dict]:
         """Get user by email (returns dict with hashed_password for auth)"""
-        db_user = self.session.query(UserModel).filter(UserModel.email == email).first()
-        if not db_user:
+        row = self._read(queries.user_by_email, email=email).first()
+        if row is None:
             return None
-        
-        return {
-            "id": db_user.id,
-            "username": db_user.username,
-            "email": db_user.email,
-            "hashed_password": db_user.hashed_password,
-            "highScore": db_user.high_score,
-            "gamesPlayed": db_user.games_played,
-            "createdAt": db_user.created_at
-        }
+        return dict(zip(queries.USER_FIELDS, row))
     
     def get_user_by_id(self, user_id: str) -> Optional[User]:
         """Get user by ID"""
-        db_user = self.session.query(UserModel).filter(UserModel.id == user_id).first()
-        if not db_user:
+        row = self._read(queries.user_by_id, user_id=user_id).first()
+        if row is None:
             return None
         
+        user_id, username, email, _, high_score, games_played, created_at = row
         return User(
-            id=db_user.id,
-            username=db_user.username,
-            email=db_user.email,
-            highScore=db_user.high_score,
-            gamesPlayed=db_user.games_played,
-            createdAt=db_user.created_at
+            id=user_id,
+            username=username,
+            email=email,
+            highScore=high_score,
+            gamesPlayed=games_played,
+            createdAt=created_at
         )
     
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """Verify password against hash"""
-        return pwd_context.verify(plain_password, hashed_password)
-    
     def add_score(self, user_id: str, score: int, mode: str) -> dict:
         """Add a score for a user and return rank and high score info"""
-        # Get user
-        db_user = self.session.query(UserModel).filter(UserModel.id == user_id).first()
-        if not db_user:
+        result = self.add_scores([(user_id, score, mode)])[0]
+        if result is None:
             raise ValueError("User not found")
+        return result
+    
+    def add_scores(self, submissions: List[Tuple[str, int, str]]) -> List[Optional[dict]]:
+        """
+        Add a batch of (user_id, score, mode) submissions in one transaction.
+        Returns rank and high score info per submission, in order, or None
+        where the user does not exist.
+        """
+        # Get users
+        user_ids = {user_id for user_id, _, _ in submissions}
+        users = {
+            u.id: u for u in self.session.query(UserModel).filter(UserModel.id.in_(user_ids))
+        }
         
-        # Update user stats
-        db_user.games_played += 1
-        is_high_score = False
-        if score > db_user.high_score:
-            db_user.high_score = score
-            is_high_score = True
+        # Update user stats in submission order; the ORM flushes one UPDATE per user
+        now = datetime.now(timezone.utc)
+        rows = []
+        results: List[Optional[dict]] = []
+        for user_id, score, mode in submissions:
+            db_user = users.get(user_id)
+            if db_user is None:
+                results.append(None)
+                continue
+            db_user.games_played += 1
+            is_high_score = False
+            if score > db_user.high_score:
+                db_user.high_score = score
+                is_high_score = True
+            
+            rows.append({
+                "id": str(uuid.uuid4()),
+                "user_id": user_id,
+                "username": db_user.username,
+                "score": score,
+                "mode": mode,
+                "date": now,
+            })
+            results.append({"rank": None, "isHighScore": is_high_score})
         
-        # Create score entry
-        db_score = ScoreModel(
-            id=str(uuid.uuid4()),
-            user_id=user_id,
-            username=db_user.username,
-            score=score,
-            mode=mode,
-            date=datetime.now(timezone.utc)
-        )
+        if not rows:
+            return results
         
-        self.session.add(db_score)
+        # Create score entries with a single bulk insert
+        self.session.execute(insert(ScoreModel), rows)
+        self._update_best_scores(rows)
         self.session.commit()
         
-        # Calculate rank - count how many higher scores exist
-        higher_scores_count = self.session.query(ScoreModel).filter(
-            ScoreModel.mode == mode,
-            ScoreModel.score > score
-        ).count()
+        scores_committed(rows)
         
-        rank = higher_scores_count + 1
+        # Serve ranks from the in-memory index when it is loaded
+        if leaderboard_index.loaded:
+            rank_of = leaderboard_index.rank
+        else:
+            # Calculate rank - count how many higher scores exist, once per distinct score
+            counts: Dict[Tuple[str, int], int] = {}
+            def rank_of(mode, score):
+                if (mode, score) not in counts:
+                    counts[(mode, score)] = self.session.query(ScoreModel).filter(
+                        ScoreModel.mode == mode,
+                        ScoreModel.score > score
+                    ).count()
+                return counts[(mode, score)] + 1
         
-        return {"rank": rank, "isHighScore": is_high_score}
+        # Rank each row as if the batch had been submitted one by one: the
+        # counts above include rows later in the batch, which a sequential
+        # submit would not have seen yet
+        later_higher = _later_higher_counts(rows)
+        stored = iter(zip(rows, later_higher))
+        for result in results:
+            if result is not None:
+                row, later = next(stored)
+                result["rank"] = rank_of(row["mode"], row["score"]) - later
+        return results
     
-    def get_leaderboard(self, mode: Optional[str] = None, limit: int = 10) -> List[LeaderboardEntry]:
-        """Get leaderboard entries"""
-        query = self.session.query(ScoreModel)
+    def _update_best_scores(self, rows: List[dict]):
+        """Raise per-(user, mode) bests for newly inserted score rows"""
+        best: Dict[Tuple[str, str], dict] = {}
+        for row in rows:
+            key = (row["user_id"], row["mode"])
+            # Earlier achievement keeps ties
+            if key not in best or row["score"] > best[key]["best_score"]:
+                best[key] = {
+                    "user_id": row["user_id"], "mode": row["mode"], "username": row["username"],
+                    "best_score": row["score"], "achieved_at": row["date"], "score_id": row["id"],
+                }
+        # One upsert that only ever raises a best, so concurrent batches can
+        # neither lower each other's bests nor collide on a first insert
+        statement = dialect_insert(self.session, BestScoreModel)
+        statement = statement.on_conflict_do_update(
+            index_elements=[BestScoreModel.user_id, BestScoreModel.mode],
+            set_={
+                "username": statement.excluded.username,
+                "best_score": statement.excluded.best_score,
+                "achieved_at": statement.excluded.achieved_at,
+                "score_id": statement.excluded.score_id,
+            },
+            where=statement.excluded.best_score > BestScoreModel.best_score,
+        )
+        self.session.execute(statement, list(best.values()))
+    
+    # Leaderboard reads come in two forms: *_records return the trusted
+    # (id, username, score, mode, date) records with the rank of the first,
+    # which the routers encode straight to JSON; get_* wrap them in models.
+    
+    def best_leaderboard_records(self, mode: Optional[str] = None, limit: int = 10) -> Board:
+        """Each user's best score per mode, best first"""
+        rows = self._read(queries.top_best_scores[bool(mode)], mode=mode, limit=limit).all()
+        return rows, 1
+    
+    def leaderboard_records(self, mode: Optional[str] = None, limit: int = 10) -> Board:
+        """Top scores, from the in-memory index when it is loaded"""
+        if leaderboard_index.loaded:
+            return leaderboard_index.top(mode, limit), 1
+        
+        rows = self._read(queries.top_scores[bool(mode)], mode=mode, limit=limit).all()
+        return rows, 1
+    
+    def window_leaderboard_records(self, window: Window, mode: Optional[str] = None, limit: int = 10) -> Board:
+        """Top scores set in the current day or week (UTC)"""
+        if window_boards.loaded:
+            return window_boards.top(window, mode, limit), 1
+        
+        rows = self._board_query(mode).filter(
+            ScoreModel.date >= window_start_datetime(window)
+        ).order_by(desc(ScoreModel.score), ScoreModel.date, ScoreModel.id).limit(limit).all()
+        return rows, 1
+    
+    def leaderboard_page_records(
+        self, mode: Optional[str] = None, limit: int = 10, cursor: Optional[Cursor] = None
+    ) -> Board:
+        """Records following the cursor (from the top without one)"""
+        if cursor is None:
+            return self.leaderboard_records(mode=mode, limit=limit)
+        
+        if leaderboard_index.loaded:
+            start, records = leaderboard_index.after(
+                mode, score_key(cursor.score, cursor.date, cursor.id), limit
+            )
+            return records, start + 1
         
+        # Keyset range read; ranks continue from the one carried by the cursor
+        rows = self._board_query(mode).filter(
+            _sorts_after(cursor.score, normalize_date(cursor.date), cursor.id)
+        ).order_by(desc(ScoreModel.score), ScoreModel.date, ScoreModel.id).limit(limit).all()
+        return rows, cursor.rank + 1
+    
+    def leaderboard_around_records(self, user_id: str, mode: Optional[str] = None, count: int = 5) -> Optional[Board]:
+        """Up to count records either side of the user's best score, or None if they have none"""
+        query = self.session.query(BestScoreModel).filter(BestScoreModel.user_id == user_id)
         if mode:
-            query = query.filter(ScoreModel.mode == mode)
+            query = query.filter(BestScoreModel.mode == mode)
+        best = query.order_by(desc(BestScoreModel.best_score), BestScoreModel.achieved_at).first()
+        if best is None:
+            return None
+        score, date, score_id = best.best_score, normalize_date(best.achieved_at), best.score_id
         
-        # Order by score descending, then by date ascending (earlier is better for ties)
-        scores = query.order_by(desc(ScoreModel.score), ScoreModel.date).limit(limit).all()
-        
-        result = []
-        for i, db_score in enumerate(scores):
-            result.append(LeaderboardEntry(
-                id=db_score.id,
-                username=db_score.username,
-                score=db_score.score,
-                mode=db_score.mode,
-                date=db_score.date,
-                rank=i + 1
-            ))
+        if leaderboard_index.loaded:
+            start, records = leaderboard_index.around(mode, score_key(score, date, score_id), count)
+            return records, start + 1
         
-        return result
+        above = self._board_query(mode).filter(
+            _sorts_after(score, date, score_id, before=True)
+        ).order_by(ScoreModel.score, desc(ScoreModel.date), desc(ScoreModel.id)).limit(count).all()
+        rest = self._board_query(mode).filter(
+            ~_sorts_after(score, date, score_id, before=True)
+        ).order_by(desc(ScoreModel.score), ScoreModel.date, ScoreModel.id).limit(count + 1).all()
+        
+        # Only this path counts: with the index loaded the position is O(log n)
+        first_rank = self._board_query(mode).filter(
+            _sorts_after(score, date, score_id, before=True)
+        ).count() - len(above) + 1
+        return above[::-1] + rest, first_rank
+    
+    def get_best_leaderboard(self, mode: Optional[str] = None, limit: int = 10) -> List[LeaderboardEntry]:
+        """Leaderboard of each user's best score per mode"""
+        return _to_entries(*self.best_leaderboard_records(mode=mode, limit=limit))
+    
+    def get_leaderboard(self, mode: Optional[str] = None, limit: int = 10) -> List[LeaderboardEntry]:
+        """Get leaderboard entries"""
+        return _to_entries(*self.leaderboard_records(mode=mode, limit=limit))
+    
+    def get_window_leaderboard(self, window: Window, mode: Optional[str] = None, limit: int = 10) -> List[LeaderboardEntry]:
+        """Leaderboard of the scores set in the current day or week (UTC)"""
+        return _to_entries(*self.window_leaderboard_records(window, mode=mode, limit=limit))
+    
+    def get_leaderboard_page(
+        self, mode: Optional[str] = None, limit: int = 10, cursor: Optional[Cursor] = None
+    ) -> List[LeaderboardEntry]:
+        """Leaderboard entries following the cursor (from the top without one)"""
+        return _to_entries(*self.leaderboard_page_records(mode=mode, limit=limit, cursor=cursor))
+    
+    def get_leaderboard_around(self, user_id: str, mode: Optional[str] = None, count: int = 5) -> Optional[List[LeaderboardEntry]]:
+        """Up to count entries either side of the user's best score, or None if they have none"""
+        board = self.leaderboard_around_records(user_id, mode=mode, count=count)
+        return _to_entries(*board) if board is not None else None
     
-    def get_active_players(self) -> List[ActivePlayer]:
-        """Get active players"""
-        active = self.session.query(ActivePlayerModel).filter(
-            ActivePlayerModel.is_live == True
-        ).all()
-        
-        return [ActivePlayer(
-            id=p.id,
-            username=p.username,
-            currentScore=p.current_score,
-            mode=p.mode,
-            isLive=p.is_live,
-            startedAt=p.started_at
-        ) for p in active]
-    
-    def watch_player(self, player_id: str) -> bool:
-        """Check if player exists and is live"""
-        player = self.session.query(ActivePlayerModel).filter(
-            ActivePlayerModel.id == player_id,
-            ActivePlayerModel.is_live == True
-        ).first()
-        return player is not None
+    def _board_query(self, mode: Optional[str]):
+        query = self.session.query(
+            ScoreModel.id, ScoreModel.username, ScoreModel.score, ScoreModel.mode, ScoreModel.date
+        )
+        if mode:
+            query = query.filter(ScoreModel.mode == mode)
+        return query
+    
+    def save_presence(self, players: List[ActivePlayer], departed: Iterable[str]):
+        """Upsert live players and mark departed ones as no longer live"""
+        if players:
+            # One executemany upsert instead of a SELECT per player
+            statement = dialect_insert(self.session, ActivePlayerModel)
+            statement = statement.on_conflict_do_update(
+                index_elements=[ActivePlayerModel.id],
+                set_={
+                    "username": statement.excluded.username,
+                    "current_score": statement.excluded.current_score,
+                    "mode": statement.excluded.mode,
+                    "is_live": statement.excluded.is_live,
+                    "started_at": statement.excluded.started_at,
+                },
+            )
+            self.session.execute(statement, [{
+                "id": p.id,
+                "username": p.username,
+                "current_score": p.currentScore,
+                "mode": p.mode,
+                "is_live": True,
+                "started_at": p.startedAt,
+            } for p in players])
+        departed = list(departed)
+        if departed:
+            self.session.query(ActivePlayerModel).filter(
+                ActivePlayerModel.id.in_(departed)
+            ).update({ActivePlayerModel.is_live: False}, synchronize_session=False)
+        self.session.commit()
+
+def dialect_insert(session: Session, model):
+    """INSERT for the session's dialect, which supports on_conflict_do_update"""
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql_insert(model)
+    if dialect == "sqlite":
+        return sqlite_insert(model)
+    raise NotImplementedError(f"Upserts are not implemented for {dialect}")
+
+
+def _sorts_after(score: int, date: datetime, score_id: str, before: bool = False):
+    """Filter for scores ranked after (or, with before, ahead of) the given entry"""
+    if before:
+        return or_(
+            ScoreModel.score > score,
+            and_(ScoreModel.score == score, or_(
+                ScoreModel.date < date,
+                and_(ScoreModel.date == date, ScoreModel.id < score_id)
+            ))
+        )
+    return or_(
+        ScoreModel.score < score,
+        and_(ScoreModel.score == score, or_(
+            ScoreModel.date > date,
+            and_(ScoreModel.date == date, ScoreModel.id > score_id)
+        ))
+    )
+
+
+def _later_higher_counts(rows: List[dict]) -> List[int]:
+    """For each row, how many rows after it in the same mode have a higher score"""
+    seen: Dict[str, List[int]] = {}
+    counts = [0] * len(rows)
+    for i in range(len(rows) - 1, -1, -1):
+        scores = seen.setdefault(rows[i]["mode"], [])
+        counts[i] = len(scores) - bisect.bisect_right(scores, rows[i]["score"])
+        bisect.insort(scores, rows[i]["score"])
+    return counts
+
+
+def _to_entries(records: List[ScoreRecord], first_rank: int) -> List[LeaderboardEntry]:
+    """LeaderboardEntry list from consecutive (id, username, score, mode, date) records"""
+    return [LeaderboardEntry(
+        id=score_id,
+        username=username,
+        score=score,
+        mode=mode,
+        date=date,
+        rank=first_rank + i
+    ) for i, (score_id, username, score, mode, date) in enumerate(records)]
+
+
+def scores_committed(rows: List[dict], publish: bool = True):
+    """
+    Bring this process's caches, ranking index and window boards up to date
+    with committed score rows, and tell the other workers unless the rows
+    came from them.
+    """
+    if window_boards.loaded:
+        for row in rows:
+            window_boards.add(row["id"], row["username"], row["score"], row["mode"], row["date"])
+    if leaderboard_index.loaded:
+        for row in rows:
+            leaderboard_index.add(row["id"], row["username"], row["score"], row["mode"], row["date"])
+    # Only once the index holds the rows: a render that reads the new version
+    # must also read the new board, or it caches the old one as current
+    for mode in {row["mode"] for row in rows}:
+        leaderboard_cache.invalidate(mode)
+    for user_id in {row["user_id"] for row in rows}:
+        identity_cache.invalidate_user(user_id)
+    if publish:
+        # Chunked to stay well inside the bus message size limit
+        for start in range(0, len(rows), SCORES_PER_EVENT):
+            event_bus.publish(SCORES_TOPIC, {"rows": rows[start:start + SCORES_PER_EVENT]})
+
+
+def apply_scores_event(data: dict):
+    """Bus handler for score rows committed by another worker"""
+    rows = [{**row, "date": datetime.fromisoformat(row["date"])} for row in data["rows"]]
+    scores_committed(rows, publish=False)
+
+
+def reload_scores():
+    """
+    Bus resync handler: score events from another worker were lost, so drop
+    the caches and rebuild the ranking index and window boards from the
+    database rather than keep serving state that no longer matches it.
+    """
+    leaderboard_cache.invalidate_all()
+    identity_cache.invalidate_all()
+    if not (leaderboard_index.loaded or window_boards.loaded):
+        return
+    session = SessionLocal()
+    try:
+        if leaderboard_index.loaded:
+            leaderboard_index.load(session)
+        if window_boards.loaded:
+            window_boards.load(session)
+    finally:
+        session.close()
 
 
 def seed_dummy_data(session: Session):
@@ -180,10 +444,12 @@ def seed_dummy_data(session: Session):
     if existing_users > 0:
         return  # Already seeded
     
+    # Every dummy user has the same password, so hash it once
+    hashed = pwd_context.hash("password123")
+    
     # Helper to create user
     def create_fake_user(username, email, high_score=0):
         uid = str(uuid.uuid4())
-        hashed = pwd_context.hash("password123")
         user = UserModel(
             id=uid,
             username=username,
@@ -247,6 +513,30 @@ def seed_dummy_data(session: Session):
     session.commit()
 
 
+def backfill_best_scores(session: Session):
+    """Populate best_scores from existing scores if it is empty"""
+    if session.query(BestScoreModel).first() is not None:
+        return
+    
+    ranked = select(
+        ScoreModel.id, ScoreModel.user_id, ScoreModel.username,
+        ScoreModel.mode, ScoreModel.score, ScoreModel.date,
+        func.row_number().over(
+            partition_by=(ScoreModel.user_id, ScoreModel.mode),
+            order_by=(desc(ScoreModel.score), ScoreModel.date)
+        ).label("position")
+    ).subquery()
+    
+    session.execute(insert(BestScoreModel).from_select(
+        ["score_id", "user_id", "username", "mode", "best_score", "achieved_at"],
+        select(
+            ranked.c.id, ranked.c.user_id, ranked.c.username,
+            ranked.c.mode, ranked.c.score, ranked.c.date
+        ).where(ranked.c.position == 1)
+    ))
+    session.commit()
+
+
 # For backward compatibility, create a global db instance getter
 def get_db_instance(session: Session) -> Database:
     """Get a Database instance for a given session"""
@@ -3,7 +3,7 @@ SQLAlchemy ORM models for the database.
 These are separate from Pydantic models (in models.py) which are used for API validation.
 """
 from datetime import datetime, timezone
-from sqlalchemy import Column, String, Integer, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from .database import Base
 import uuid
@@ -36,6 +36,28 @@ class ScoreModel(Base):
     
     # Relationship to user
     user = relationship("UserModel", back_populates="scores")
+    
+    # Leaderboard sort order, so keyset pages are index range scans
+    __table_args__ = (
+        Index("ix_scores_board", mode, score.desc(), date, id),
+        Index("ix_scores_rank", score.desc(), date, id),
+    )
+
+class BestScoreModel(Base):
+    """Best score per user and mode, maintained incrementally by add_score"""
+    __tablename__ = "best_scores"
+    
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    mode = Column(String, primary_key=True)  # "pass-through" or "walls"
+    username = Column(String, nullable=False)
+    best_score = Column(Integer, nullable=False)
+    achieved_at = Column(DateTime, nullable=False)
+    score_id = Column(String, nullable=False)  # ScoreModel row that set the best
+    
+    # Matches the leaderboard sort so top-N is an index range scan
+    __table_args__ = (
+        Index("ix_best_scores_board", mode, best_score.desc(), achieved_at),
+    )
 
 class ActivePlayerModel(Base):
     """Active player model for live game tracking"""
@@ -2,11 +2,13 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 import jwt
 from jwt.exceptions import PyJWTError
+import time
 from typing import Optional
 from sqlalchemy.orm import Session
-from .database import get_db
+from .database import get_db, run_db
 from .db import get_db_instance
 from .models import User
+from .identity import identity_cache
 
 SECRET_KEY = "supersecretkey" # In production, this should be env var
 ALGORITHM = "HS256"
@@ -19,6 +21,32 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def decode_token(token: str) -> Optional[dict]:
+    """Verified JWT payload, or None if the token is invalid or has no subject"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except PyJWTError:
+        return None
+    if payload.get("sub") is None:
+        return None
+    return payload
+
+def get_user_for_payload(payload: dict, session: Session) -> Optional[User]:
+    """Look up the user a decoded token refers to"""
+    db = get_db_instance(session)
+    user_dict = db.get_user_by_email(payload["sub"])
+    if user_dict is None:
+        return None
+    
+    return User(**{k: v for k, v in user_dict.items() if k != "hashed_password"})
+
+def get_user_from_token(token: str, session: Session) -> Optional[User]:
+    """Resolve a bearer token to its user, or None if it is invalid"""
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    return get_user_for_payload(payload, session)
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     session: Session = Depends(get_db)
@@ -28,17 +56,20 @@ async def get_current_user(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except PyJWTError:
-        raise credentials_exception
+    # Hot path: a token seen recently needs neither decoding nor a lookup
+    user = identity_cache.get(token)
+    if user is not None:
+        return user
     
-    db = get_db_instance(session)
-    user_dict = db.get_user_by_email(email)
-    if user_dict is None:
+    payload = decode_token(token)
+    if payload is None:
+        raise credentials_exception
+    # Taken before the lookup, so a score committed meanwhile is not cached over
+    generation = identity_cache.generation()
+    user = await run_db(get_user_for_payload, payload, session)
+    if user is None:
         raise credentials_exception
     
-    return User(**{k: v for k, v in user_dict.items() if k != "hashed_password"})
+    expires_in = payload["exp"] - time.time() if "exp" in payload else None
+    identity_cache.put(token, user, expires_in=expires_in, generation=generation)
+    return user
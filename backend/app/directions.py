@@ -0,0 +1,11 @@
+"""
+Direction codes shared by the engine, replays and spectator frames.
+
+Kept apart from app.engine so modules that only need the codes do not
+import NumPy.
+"""
+
+# Direction codes: opposite of d is (d + 2) % 4
+UP, RIGHT, DOWN, LEFT = 0, 1, 2, 3
+DIRECTIONS = ("UP", "RIGHT", "DOWN", "LEFT")
+DIRECTION_CODES = {name: code for code, name in enumerate(DIRECTIONS)}
@@ -0,0 +1,221 @@
+"""
+Batched snake simulation engine.
+
+Server-side port of the rules in frontend/src/lib/gameLogic.ts (moveSnake,
+generateFood, setDirection, wall vs. pass-through handling). Many games are
+stored side by side in compact arrays and advanced with one vectorized
+step() call:
+
+- occupancy: (games, cells) bool grid of the cells covered by each snake
+- body: (games, cells) ring buffer of cell indices, head at head_ptr
+- food: (games,) cell index of the current food, -1 once the board is full
+
+Food is placed by picking uniformly among free cells with a per-game
+splitmix64 stream, so a game replays identically from its seed no matter
+which batch it runs in.
+"""
+from typing import Dict, List, Optional, Sequence, Union
+import numpy as np
+
+from .directions import UP, RIGHT, DOWN, LEFT, DIRECTIONS, DIRECTION_CODES
+
+INITIAL_SPEED = 150
+SPEED_INCREMENT = 5
+MIN_SPEED = 50
+FOOD_POINTS = 10
+
+DX = np.array([0, 1, 0, -1], dtype=np.int32)
+DY = np.array([-1, 0, 1, 0], dtype=np.int32)
+
+MODES = ("pass-through", "walls")
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def _as_direction(direction: Union[int, str]) -> int:
+    return DIRECTION_CODES[direction] if isinstance(direction, str) else int(direction)
+
+
+class BatchEngine:
+    """Fixed-size batch of snake games advanced in lockstep"""
+
+    def __init__(
+        self,
+        n_games: int,
+        grid_size: int = 20,
+        modes: Union[str, Sequence[str]] = "pass-through",
+        seeds: Optional[Sequence[int]] = None,
+    ):
+        self.n_games = n_games
+        self.grid_size = grid_size
+        self.cells = grid_size * grid_size
+        cell_dtype = np.int16 if self.cells <= np.iinfo(np.int16).max else np.int32
+
+        if isinstance(modes, str):
+            modes = [modes] * n_games
+        self.walls = np.array([m == "walls" for m in modes], dtype=bool)
+        if seeds is None:
+            seeds = range(n_games)
+        self.rng_state = np.array(seeds, dtype=np.uint64)
+
+        self.occupancy = np.zeros((n_games, self.cells), dtype=bool)
+        self.body = np.zeros((n_games, self.cells), dtype=cell_dtype)
+        self.head_ptr = np.zeros(n_games, dtype=np.int32)
+        self.length = np.zeros(n_games, dtype=np.int32)
+        self.food = np.full(n_games, -1, dtype=np.int32)
+        self.direction = np.full(n_games, RIGHT, dtype=np.int8)
+        self.next_direction = np.full(n_games, RIGHT, dtype=np.int8)
+        self.score = np.zeros(n_games, dtype=np.int32)
+        self.speed = np.full(n_games, INITIAL_SPEED, dtype=np.int32)
+        self.alive = np.zeros(n_games, dtype=bool)
+        self.ticks = np.zeros(n_games, dtype=np.int32)
+
+        self.reset(np.arange(n_games))
+
+    # -- randomness -------------------------------------------------------
+
+    def _uniform(self, rows: np.ndarray) -> np.ndarray:
+        """Next splitmix64 draw in [0, 1) for each of the given games"""
+        with np.errstate(over="ignore"):
+            state = self.rng_state[rows] + _GOLDEN
+            self.rng_state[rows] = state
+            z = (state ^ (state >> np.uint64(30))) * _MIX1
+            z = (z ^ (z >> np.uint64(27))) * _MIX2
+            z = z ^ (z >> np.uint64(31))
+        return (z >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+    def _place_food(self, rows: np.ndarray):
+        """Pick a uniformly random free cell for each of the given games"""
+        if rows.size == 0:
+            return
+        free = ~self.occupancy[rows]
+        free_count = free.sum(axis=1)
+        pick = np.floor(self._uniform(rows) * free_count).astype(np.int64)
+        cell = np.argmax(free.cumsum(axis=1) > pick[:, None], axis=1)
+        self.food[rows] = np.where(free_count > 0, cell, -1)
+
+    # -- state management -------------------------------------------------
+
+    def reset(self, rows: np.ndarray):
+        """Start fresh games, matching createInitialState + startGame"""
+        rows = np.asarray(rows)
+        center = self.grid_size // 2
+        start = [(center - 2, center), (center - 1, center), (center, center)]
+        cells = np.array([y * self.grid_size + x for x, y in start], dtype=self.body.dtype)
+
+        self.occupancy[rows] = False
+        self.occupancy[rows[:, None], cells[None, :].astype(np.intp)] = True
+        self.body[rows, :3] = cells
+        self.head_ptr[rows] = 2
+        self.length[rows] = 3
+        self.direction[rows] = RIGHT
+        self.next_direction[rows] = RIGHT
+        self.score[rows] = 0
+        self.speed[rows] = INITIAL_SPEED
+        self.ticks[rows] = 0
+        self.alive[rows] = True
+        self._place_food(rows)
+
+    def set_state(
+        self,
+        game: int,
+        snake: Sequence[Dict[str, int]],
+        food: Dict[str, int],
+        direction: Union[int, str] = RIGHT,
+        next_direction: Union[int, str, None] = None,
+        score: int = 0,
+        speed: int = INITIAL_SPEED,
+        mode: Optional[str] = None,
+    ):
+        """Load a GameState-shaped position (snake listed head first)"""
+        g = self.grid_size
+        cells = [p["y"] * g + p["x"] for p in snake]
+        self.occupancy[game] = False
+        self.occupancy[game, cells] = True
+        self.body[game, :len(cells)] = cells[::-1]
+        self.head_ptr[game] = len(cells) - 1
+        self.length[game] = len(cells)
+        self.food[game] = food["y"] * g + food["x"]
+        self.direction[game] = _as_direction(direction)
+        self.next_direction[game] = _as_direction(
+            direction if next_direction is None else next_direction
+        )
+        self.score[game] = score
+        self.speed[game] = speed
+        if mode is not None:
+            self.walls[game] = mode == "walls"
+        self.alive[game] = True
+
+    def snake(self, game: int) -> List[Dict[str, int]]:
+        """Snake body of one game as {x, y} positions, head first"""
+        g = self.grid_size
+        ptrs = (self.head_ptr[game] - np.arange(self.length[game])) % self.cells
+        return [{"x": int(c % g), "y": int(c // g)} for c in self.body[game, ptrs]]
+
+    def state(self, game: int) -> dict:
+        """One game as a GameState-shaped dict"""
+        g = self.grid_size
+        food = int(self.food[game])
+        return {
+            "snake": self.snake(game),
+            "food": {"x": food % g, "y": food // g} if food >= 0 else None,
+            "direction": DIRECTIONS[self.direction[game]],
+            "nextDirection": DIRECTIONS[self.next_direction[game]],
+            "score": int(self.score[game]),
+            "mode": "walls" if self.walls[game] else "pass-through",
+            "status": "playing" if self.alive[game] else "game-over",
+            "gridSize": g,
+            "speed": int(self.speed[game]),
+        }
+
+    # -- rules ------------------------------------------------------------
+
+    def set_directions(self, rows: np.ndarray, directions: np.ndarray):
+        """Queue direction changes, ignoring reversals and finished games"""
+        rows = np.asarray(rows)
+        directions = np.asarray(directions, dtype=np.int8)
+        valid = self.alive[rows] & (directions != (self.direction[rows] + 2) % 4)
+        self.next_direction[rows[valid]] = directions[valid]
+
+    def step(self) -> np.ndarray:
+        """Advance every live game by one tick; returns the games that ate"""
+        g = self.grid_size
+        rows = np.flatnonzero(self.alive)
+        if rows.size == 0:
+            return rows
+
+        heading = self.next_direction[rows]
+        head_ptr = self.head_ptr[rows]
+        head = self.body[rows, head_ptr].astype(np.int32)
+        x = head % g + DX[heading]
+        y = head // g + DY[heading]
+
+        out_of_bounds = (x < 0) | (x >= g) | (y < 0) | (y >= g)
+        new_head = (y % g) * g + (x % g)
+        tail = self.body[rows, (head_ptr - self.length[rows] + 1) % self.cells].astype(np.int32)
+
+        # The tail moves away this tick, so running into it is allowed
+        hit_self = self.occupancy[rows, new_head] & (new_head != tail)
+        dead = (out_of_bounds & self.walls[rows]) | hit_self
+        self.alive[rows[dead]] = False
+
+        alive = ~dead
+        rows, new_head, tail, heading = rows[alive], new_head[alive], tail[alive], heading[alive]
+        head_ptr = (head_ptr[alive] + 1) % self.cells
+        ate = new_head == self.food[rows]
+
+        self.occupancy[rows[~ate], tail[~ate]] = False
+        self.occupancy[rows, new_head] = True
+        self.body[rows, head_ptr] = new_head
+        self.head_ptr[rows] = head_ptr
+        self.direction[rows] = heading
+        self.ticks[rows] += 1
+
+        eaters = rows[ate]
+        self.length[eaters] += 1
+        self.score[eaters] += FOOD_POINTS
+        self.speed[eaters] = np.maximum(MIN_SPEED, self.speed[eaters] - SPEED_INCREMENT)
+        self._place_food(eaters)
+        return eaters
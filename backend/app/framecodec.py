@@ -0,0 +1,265 @@
+"""
+Compact binary frames for spectated game state.
+
+A GameState as JSON repeats an {"x", "y"} object for every body segment,
+so it grows with the snake and is re-sent whole on every tick. Here the
+state goes out as:
+
+* a keyframe: the head position followed by the body as 2-bit directions
+  (the step from each segment to the next, four per byte), plus score,
+  speed, food and flags;
+* a delta per tick: whether the head moved and in which direction, whether
+  the tail was kept (the snake grew), and the food or score if they
+  changed. A normal tick is 7 bytes however long the snake is.
+
+Frames carry a sequence number. A decoder that misses a delta (a slow
+spectator drops frames) ignores deltas until the next keyframe, which the
+encoder emits every KEYFRAME_INTERVAL frames and whenever a change cannot
+be expressed as a single step. Late joiners are sent the current state as
+a keyframe.
+
+All multi-byte fields are little-endian:
+
+    keyframe  B type=1, I seq, B grid, B flags, I score, H speed,
+              B food x, B food y (0xFF when there is none),
+              B head x, B head y, H length, packed body directions
+    delta     B type=2, I seq, B flags, B changes,
+              [B food x, B food y], [I score, H speed]
+
+flags packs direction, nextDirection, status and mode; changes is a bit
+set of HEAD_MOVED (with the move direction in bits 1-2), GREW,
+FOOD_CHANGED and SCORE_CHANGED.
+"""
+import struct
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+from .directions import DIRECTIONS, DIRECTION_CODES
+
+KEYFRAME = 1
+DELTA = 2
+KEYFRAME_INTERVAL = 100
+
+STATUSES = ("idle", "playing", "paused", "game-over")
+STATUS_CODES = {name: code for code, name in enumerate(STATUSES)}
+NO_FOOD = 0xFF
+
+HEAD_MOVED = 0x01
+GREW = 0x08
+FOOD_CHANGED = 0x10
+SCORE_CHANGED = 0x20
+
+KEY_HEADER = struct.Struct("<BIBBIHBBBBH")
+DELTA_HEADER = struct.Struct("<BIBB")
+FOOD = struct.Struct("<BB")
+SCORE = struct.Struct("<IH")
+
+# (dx, dy) per direction code, matching app.engine
+STEPS = ((0, -1), (1, 0), (0, 1), (-1, 0))
+
+Cell = Tuple[int, int]
+
+
+def step(cell: Cell, direction: int, grid_size: int) -> Cell:
+    """Neighbouring cell, wrapping at the edges"""
+    dx, dy = STEPS[direction]
+    return (cell[0] + dx) % grid_size, (cell[1] + dy) % grid_size
+
+
+def step_direction(a: Cell, b: Cell, grid_size: int) -> int:
+    """Direction code of the step from a to an adjacent cell b"""
+    for direction in range(4):
+        if step(a, direction, grid_size) == b:
+            return direction
+    raise ValueError(f"cells {a} and {b} are not adjacent")
+
+
+def pack_body(snake: List[Cell], grid_size: int) -> bytes:
+    """2-bit directions from each segment to the next, four to a byte"""
+    packed = bytearray((len(snake) + 2) // 4)
+    for i in range(len(snake) - 1):
+        packed[i >> 2] |= step_direction(snake[i], snake[i + 1], grid_size) << ((i & 3) * 2)
+    return bytes(packed)
+
+
+def unpack_body(head: Cell, length: int, packed: bytes, grid_size: int) -> List[Cell]:
+    snake = [head]
+    for i in range(length - 1):
+        snake.append(step(snake[-1], (packed[i >> 2] >> ((i & 3) * 2)) & 3, grid_size))
+    return snake
+
+
+def _flags(state: dict) -> int:
+    return (
+        DIRECTION_CODES[state["direction"]]
+        | DIRECTION_CODES[state.get("nextDirection", state["direction"])] << 2
+        | STATUS_CODES[state.get("status", "playing")] << 4
+        | (state["mode"] == "walls") << 6
+    )
+
+
+def _cell(segment: dict) -> Cell:
+    return segment["x"], segment["y"]
+
+
+class _Ends:
+    """Cell access into a GameState snake list without converting all of it"""
+    __slots__ = ("segments",)
+
+    def __init__(self, segments: List[dict]):
+        self.segments = segments
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    def __getitem__(self, index: int) -> Cell:
+        return _cell(self.segments[index])
+
+
+def _food(state: dict) -> Cell:
+    food = state.get("food")
+    return (food["x"], food["y"]) if food is not None else (NO_FOOD, NO_FOOD)
+
+
+class FrameEncoder:
+    """Turns one game's successive GameState dicts into keyframes and deltas"""
+
+    def __init__(self, keyframe_interval: int = KEYFRAME_INTERVAL):
+        self.keyframe_interval = keyframe_interval
+        self.seq = 0
+        self._state: Optional[dict] = None
+        self._snake: List[dict] = []
+        self._since_keyframe = 0
+        self._keyframe: Optional[Tuple[int, bytes]] = None
+        self.keyframes = 0
+        self.deltas = 0
+
+    def encode(self, state: dict) -> bytes:
+        """Frame for the next state; a delta when it is one step from the last"""
+        snake = state["snake"]
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        frame = None
+        if self._state is not None and self._since_keyframe < self.keyframe_interval:
+            frame = self._delta(state, snake)
+        if frame is None:
+            frame = self._encode_keyframe(state, snake)
+            self._since_keyframe = 0
+            self.keyframes += 1
+        else:
+            self._since_keyframe += 1
+            self.deltas += 1
+        self._state = state
+        self._snake = snake
+        return frame
+
+    def keyframe(self) -> Optional[bytes]:
+        """Current state as a keyframe, for a spectator joining mid-game"""
+        if self._state is None:
+            return None
+        if self._keyframe is None or self._keyframe[0] != self.seq:
+            self._keyframe = (self.seq, self._encode_keyframe(self._state, self._snake))
+        return self._keyframe[1]
+
+    def _encode_keyframe(self, state: dict, snake: List[dict]) -> bytes:
+        grid_size = state["gridSize"]
+        cells = [_cell(segment) for segment in snake]
+        head = cells[0] if cells else (0, 0)
+        return KEY_HEADER.pack(
+            KEYFRAME, self.seq, grid_size, _flags(state), state["score"], state.get("speed", 0),
+            *_food(state), *head, len(cells)
+        ) + pack_body(cells, grid_size)
+
+    def _delta(self, state: dict, segments: List[dict]) -> Optional[bytes]:
+        previous = self._state
+        # Only the ends are compared, so this stays O(1) in the snake's length
+        snake, old = _Ends(segments), _Ends(self._snake)
+        grid_size = state["gridSize"]
+        if grid_size != previous["gridSize"] or not snake or not old:
+            return None
+
+        changes = 0
+        if snake[0] == old[0]:
+            if len(snake) != len(old) or snake[-1] != old[-1]:
+                return None
+        else:
+            try:
+                direction = step_direction(old[0], snake[0], grid_size)
+            except ValueError:
+                return None
+            changes |= HEAD_MOVED | direction << 1
+            if len(snake) == len(old) + 1 and snake[-1] == old[-1]:
+                changes |= GREW
+            elif len(snake) != len(old) or (len(snake) > 1 and snake[-1] != old[-2]):
+                return None
+            if len(snake) > 1 and snake[1] != old[0]:
+                return None
+
+        extra = b""
+        food = _food(state)
+        if food != _food(previous):
+            changes |= FOOD_CHANGED
+            extra += FOOD.pack(*food)
+        if state["score"] != previous["score"] or state.get("speed", 0) != previous.get("speed", 0):
+            changes |= SCORE_CHANGED
+            extra += SCORE.pack(state["score"], state.get("speed", 0))
+        return DELTA_HEADER.pack(DELTA, self.seq, _flags(state), changes) + extra
+
+
+class FrameDecoder:
+    """Rebuilds GameState from frames; applying a delta is O(1)"""
+
+    def __init__(self):
+        self.seq: Optional[int] = None
+        self.snake: Deque[Cell] = deque()
+        self.grid_size = 0
+        self.flags = 0
+        self.score = 0
+        self.speed = 0
+        self.food: Cell = (NO_FOOD, NO_FOOD)
+        self.skipped = 0
+
+    def apply(self, frame: bytes) -> bool:
+        """Apply a frame; False if it was skipped while waiting for a keyframe"""
+        kind = frame[0]
+        if kind == KEYFRAME:
+            (_, self.seq, self.grid_size, self.flags, self.score, self.speed,
+             food_x, food_y, head_x, head_y, length) = KEY_HEADER.unpack_from(frame)
+            self.food = (food_x, food_y)
+            self.snake = deque(unpack_body((head_x, head_y), length, frame[KEY_HEADER.size:], self.grid_size))
+            return True
+        if kind != DELTA:
+            raise ValueError(f"unknown frame type {kind}")
+
+        _, seq, flags, changes = DELTA_HEADER.unpack_from(frame)
+        if self.seq is None or seq != (self.seq + 1) & 0xFFFFFFFF:
+            # A frame went missing; the body can't be trusted until a keyframe
+            self.seq = None
+            self.skipped += 1
+            return False
+        self.seq = seq
+        self.flags = flags
+        if changes & HEAD_MOVED:
+            self.snake.appendleft(step(self.snake[0], (changes >> 1) & 3, self.grid_size))
+            if not changes & GREW:
+                self.snake.pop()
+        offset = DELTA_HEADER.size
+        if changes & FOOD_CHANGED:
+            self.food = FOOD.unpack_from(frame, offset)
+            offset += FOOD.size
+        if changes & SCORE_CHANGED:
+            self.score, self.speed = SCORE.unpack_from(frame, offset)
+        return True
+
+    def state(self) -> dict:
+        """The decoded GameState (builds the snake list, so O(length))"""
+        return {
+            "snake": [{"x": x, "y": y} for x, y in self.snake],
+            "food": {"x": self.food[0], "y": self.food[1]} if self.food[0] != NO_FOOD else None,
+            "direction": DIRECTIONS[self.flags & 3],
+            "nextDirection": DIRECTIONS[(self.flags >> 2) & 3],
+            "score": self.score,
+            "mode": "walls" if self.flags & 0x40 else "pass-through",
+            "status": STATUSES[(self.flags >> 4) & 3],
+            "gridSize": self.grid_size,
+            "speed": self.speed,
+        }
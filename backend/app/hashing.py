@@ -0,0 +1,128 @@
+"""
+Password hashing off the event loop.
+
+pbkdf2_sha256 costs tens of milliseconds of CPU per call, so the auth
+routers hand hashing and verification to a small process pool instead of
+running it inline. The number of outstanding jobs is capped: once the queue
+is full new requests fail fast with HasherBusy rather than piling up behind
+a login storm.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+
+
+class LazyCryptContext:
+    """passlib CryptContext built on first use, so importing the app skips passlib"""
+
+    def __init__(self, **options):
+        self._options = options
+        self._context = None
+
+    def __getattr__(self, name):
+        if self._context is None:
+            from passlib.context import CryptContext
+            self._context = CryptContext(**self._options)
+        return getattr(self._context, name)
+
+
+pwd_context = LazyCryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", str(HASH_WORKERS * 16)))
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(password, hashed_password)
+
+
+def load_hasher() -> int:
+    """Build the CryptContext in a worker so its first real job does not pay for it"""
+    pwd_context.schemes()
+    return os.getpid()
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing queue is full"""
+
+
+class PasswordHasher:
+    """Bounded process pool for hashing and verifying passwords"""
+
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned, not forked: the server process is multi-threaded
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HasherBusy("Too many authentication requests in progress")
+            self.pending += 1
+            self.submitted += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_pool(), fn, *args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+                self.busy_seconds += time.perf_counter() - started
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, password, hashed_password)
+
+    def stats(self) -> dict:
+        """Queue depth and throughput counters"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": self.pending,
+                "max_pending": self.max_pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_ms": round(self.busy_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+            }
+
+    async def warm_up(self):
+        """Start every worker process ahead of the first login"""
+        pool = self._get_pool()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(pool, load_hasher) for _ in range(self.workers)))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# Process-wide hasher used by the auth router
+password_hasher = PasswordHasher()
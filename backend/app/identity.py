@@ -0,0 +1,137 @@
+"""
+Authenticated-identity cache for get_current_user.
+
+Maps a bearer token to the User it resolved to, so repeat requests skip both
+the JWT decode and the user lookup. Entries expire after a TTL (or at the
+token's own exp claim, if earlier), the cache is bounded with LRU eviction,
+and Database.add_score invalidates a user's entries when their stats change.
+
+A lookup that raced with an invalidation must not cache what it read: the
+caller takes generation() before querying and passes it to put(), which is
+refused if the user has been invalidated since (the same idea as the
+version handed to LeaderboardCache.put).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from .models import User
+
+IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", "60"))
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "10000"))
+
+
+class IdentityCache:
+    """Bounded LRU + TTL map of token -> User"""
+
+    def __init__(self, max_entries: int = IDENTITY_CACHE_SIZE, ttl: float = IDENTITY_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[User, float]]" = OrderedDict()
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+        # Generation at which each user was last invalidated, oldest first.
+        # Users dropped from it count as invalidated at _floor.
+        self._generation = 0
+        self._invalidated: "OrderedDict[str, int]" = OrderedDict()
+        self._floor = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, token: str) -> Optional[User]:
+        """Cached user for a token, or None on a miss or expiry"""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            user, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._drop(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return user
+
+    def generation(self) -> int:
+        """Read before looking a user up; pass to put()"""
+        return self._generation
+
+    def put(self, token: str, user: User, expires_in: Optional[float] = None,
+            generation: Optional[int] = None) -> bool:
+        """Cache a resolved user; expires_in caps the TTL (e.g. at the token's exp).
+
+        With generation, the user is only cached if they have not been
+        invalidated since it was read. Returns whether it was cached.
+        """
+        ttl = self.ttl if expires_in is None else min(self.ttl, expires_in)
+        if ttl <= 0:
+            return False
+        with self._lock:
+            if generation is not None and self._invalidated.get(user.id, self._floor) > generation:
+                return False
+            if token in self._entries:
+                self._drop(token)
+            self._entries[token] = (user, time.monotonic() + ttl)
+            self._tokens_by_user.setdefault(user.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def _drop(self, token: str):
+        user, _ = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(user.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user.id]
+
+    def invalidate_user(self, user_id: str):
+        """Forget every token resolved to this user"""
+        with self._lock:
+            self._generation += 1
+            self._invalidated[user_id] = self._generation
+            self._invalidated.move_to_end(user_id)
+            while len(self._invalidated) > self.max_entries:
+                _, self._floor = self._invalidated.popitem(last=False)
+            for token in self._tokens_by_user.pop(user_id, ()):
+                self._entries.pop(token, None)
+                self.invalidations += 1
+
+    def invalidate_all(self):
+        """Forget every cached user, keeping the counters"""
+        with self._lock:
+            self._generation += 1
+            self._invalidated.clear()
+            self._floor = self._generation
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+            self._invalidated.clear()
+            self._floor = self._generation
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+# Process-wide cache used by get_current_user
+identity_cache = IdentityCache()
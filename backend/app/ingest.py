@@ -0,0 +1,173 @@
+"""
+Group-commit write-behind stage for score submissions.
+
+Submissions are queued and flushed together: the flusher waits up to
+SCORE_FLUSH_MS for more rows (or until SCORE_BATCH_SIZE are queued) and
+writes the whole batch with Database.add_scores, i.e. one transaction, one
+bulk insert and one stats update per user. Each caller still awaits its own
+rank and isHighScore. Only one flush runs at a time, so the next batch fills
+while the previous one commits.
+"""
+import asyncio
+import os
+import time
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal, run_db
+from .db import get_db_instance
+
+SCORE_WRITE_BEHIND = os.getenv("SCORE_WRITE_BEHIND", "0") == "1"
+SCORE_BATCH_SIZE = int(os.getenv("SCORE_BATCH_SIZE", "256"))
+SCORE_FLUSH_MS = float(os.getenv("SCORE_FLUSH_MS", "5"))
+SCORE_QUEUE_DEPTH = int(os.getenv("SCORE_QUEUE_DEPTH", "10000"))
+
+
+class IngestQueueFull(Exception):
+    """Raised when too many submissions are waiting to be flushed"""
+
+
+class ScoreIngestor:
+    """Collects score submissions and commits them in batches"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        batch_size: int = SCORE_BATCH_SIZE,
+        flush_ms: float = SCORE_FLUSH_MS,
+        max_queue: int = SCORE_QUEUE_DEPTH,
+        enabled: bool = SCORE_WRITE_BEHIND,
+    ):
+        self.enabled = enabled
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Task] = None
+        self._collecting: list = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.batches = 0
+        self.rows = 0
+        self.rejected = 0
+        self.last_batch_size = 0
+        self.last_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._flusher is not None and not self._flusher.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._flusher = loop.create_task(self._run())
+
+    async def submit(self, user_id: str, score: int, mode: str) -> dict:
+        """Queue a submission and wait for its batch to commit"""
+        self._ensure_started()
+        if self._queue.qsize() >= self.max_queue:
+            self.rejected += 1
+            raise IngestQueueFull("Score submission queue is full")
+        future = self._loop.create_future()
+        self._queue.put_nowait((user_id, score, mode, future))
+        return await future
+
+    async def _collect(self, batch: list):
+        """Fill batch in place, so stop() can reclaim a batch cut short"""
+        batch.append(await self._queue.get())
+        deadline = self._loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+    async def _run(self):
+        while True:
+            self._collecting = []
+            await self._collect(self._collecting)
+            batch, self._collecting = self._collecting, []
+            # Shielded: stopping the flusher must not abandon a batch mid-commit
+            self._flushing = self._loop.create_task(self._flush_batch(batch))
+            await asyncio.shield(self._flushing)
+
+    async def _flush_batch(self, batch: list):
+        """Commit a batch and resolve every caller's future"""
+        started = time.perf_counter()
+        try:
+            results = await run_db(self._flush, [(u, s, m) for u, s, m, _ in batch])
+        except Exception as exc:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        finally:
+            self._record_flush(len(batch), time.perf_counter() - started)
+        for (*_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if result is None:
+                future.set_exception(ValueError("User not found"))
+            else:
+                future.set_result(result)
+
+    def _flush(self, submissions: List[Tuple[str, int, str]]) -> List[Optional[dict]]:
+        session = self.session_factory()
+        try:
+            return get_db_instance(session).add_scores(submissions)
+        finally:
+            session.close()
+
+    def _record_flush(self, size: int, seconds: float):
+        self.batches += 1
+        self.rows += size
+        self.last_batch_size = size
+        self.last_flush_ms = seconds * 1000
+        self.total_flush_ms += seconds * 1000
+
+    def stats(self) -> dict:
+        """Batch size, flush latency and queue depth counters"""
+        return {
+            "enabled": self.enabled,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "batch_size_limit": self.batch_size,
+            "flush_interval_ms": self.flush_interval * 1000,
+            "batches": self.batches,
+            "rows": self.rows,
+            "rejected": self.rejected,
+            "avg_batch_size": round(self.rows / self.batches, 2) if self.batches else 0.0,
+            "last_batch_size": self.last_batch_size,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "avg_flush_ms": round(self.total_flush_ms / self.batches, 3) if self.batches else 0.0,
+        }
+
+    async def stop(self):
+        """Stop the flusher, committing whatever is in flight or still queued"""
+        if self._flusher is None:
+            return
+        self._flusher.cancel()
+        try:
+            await self._flusher
+        except asyncio.CancelledError:
+            pass
+        self._flusher = None
+        if self._flushing is not None:
+            await self._flushing
+            self._flushing = None
+        pending, self._collecting = self._collecting, []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        if pending:
+            await self._flush_batch(pending)
+
+# Process-wide ingestor used by the leaderboard router when SCORE_WRITE_BEHIND=1
+score_ingestor = ScoreIngestor()
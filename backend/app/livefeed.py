@@ -0,0 +1,216 @@
+"""
+Server-Sent Events feed of the live-player list.
+
+Listeners get the full list once, as a "snapshot" event, and afterwards
+only "diff" events with the players who joined, changed score or left.
+Changes reported by the presence registry are coalesced per player and
+published every PRESENCE_FEED_MS as a single diff, which is encoded once
+and the same bytes are handed to every listener.
+
+Events carry "<epoch>-<seq>" as their SSE id: an increasing sequence number
+prefixed with an epoch drawn when the feed is created. A reconnecting
+client sends Last-Event-ID and is replayed the diffs it missed from a
+short history, falling back to a fresh snapshot when they are gone. An id
+from another epoch (the server restarted, or the reconnect reached another
+worker) says nothing about this feed's sequence, so it gets a snapshot too. A
+listener that falls far enough behind to overflow its queue is resynced
+with a snapshot the same way.
+"""
+import asyncio
+import os
+import threading
+import uuid
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+from pydantic import TypeAdapter
+
+from .models import ActivePlayer, PresenceDiff
+from .presence import PresenceRegistry, presence_registry
+from .spectator import Subscriber
+
+PRESENCE_FEED_MS = float(os.getenv("PRESENCE_FEED_MS", "250"))
+PRESENCE_FEED_HISTORY = int(os.getenv("PRESENCE_FEED_HISTORY", "256"))
+# Events a listener may lag behind before it is resynced with a snapshot
+LISTENER_QUEUE_SIZE = 64
+KEEPALIVE_SECONDS = 15.0
+KEEPALIVE = b": keepalive\n\n"
+
+players_adapter = TypeAdapter(List[ActivePlayer])
+
+
+def encode_event(epoch: str, seq: int, event: str, data: bytes) -> bytes:
+    return b"id: %s-%d\nevent: %s\ndata: %s\n\n" % (epoch.encode(), seq, event.encode(), data)
+
+
+def parse_event_id(event_id: Optional[str]) -> Optional[Tuple[str, int]]:
+    """(epoch, seq) of an event id, or None if it is not one of ours"""
+    epoch, _, seq = (event_id or "").rpartition("-")
+    if not epoch or not seq.isdigit():
+        return None
+    return epoch, int(seq)
+
+
+class PresenceFeed:
+    """Coalesces presence changes into sequenced diffs and fans them out"""
+
+    def __init__(
+        self,
+        registry: PresenceRegistry = presence_registry,
+        interval_ms: float = PRESENCE_FEED_MS,
+        history: int = PRESENCE_FEED_HISTORY,
+        listener_queue: int = LISTENER_QUEUE_SIZE,
+    ):
+        self.registry = registry
+        self.interval = interval_ms / 1000
+        self.listener_queue = listener_queue
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Optional[ActivePlayer]] = {}
+        self._players: Dict[str, ActivePlayer] = {}
+        self._history: Deque[Tuple[int, bytes]] = deque(maxlen=history)
+        self._snapshot: Optional[Tuple[int, bytes]] = None
+        self._listeners: Set[Subscriber] = set()
+        self.epoch = uuid.uuid4().hex[:12]
+        self._broadcaster: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._attached = False
+        self.seq = 0
+        self.events = 0
+        self.resyncs = 0
+
+    def _on_change(self, player_id: str, player: Optional[ActivePlayer]):
+        with self._lock:
+            self._pending[player_id] = player
+
+    def _ensure_started(self):
+        if not self._attached:
+            players = self.registry.listen(self._on_change)
+            with self._lock:
+                self._players = {p.id: p for p in players}
+                self._snapshot = None
+            self._attached = True
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._broadcaster is not None and not self._broadcaster.done():
+            return
+        self._loop = loop
+        self._broadcaster = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            # Expiry is lazy, so give quiet players a chance to time out
+            self.registry.expire_due()
+            self.publish_pending()
+
+    def publish_pending(self) -> Optional[int]:
+        """Turn the changes gathered since the last call into one diff event"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            diff = PresenceDiff()
+            for player_id, player in pending.items():
+                previous = self._players.get(player_id)
+                if player is None:
+                    if previous is not None:
+                        del self._players[player_id]
+                        diff.left.append(player_id)
+                    continue
+                self._players[player_id] = player
+                if previous is None or previous.startedAt != player.startedAt or previous.mode != player.mode:
+                    diff.joined.append(player)
+                elif previous.currentScore != player.currentScore:
+                    diff.scores[player_id] = player.currentScore
+            if not (diff.joined or diff.scores or diff.left):
+                return None
+            self.seq += 1
+            frame = (self.seq, encode_event(self.epoch, self.seq, "diff", diff.model_dump_json().encode()))
+            self._history.append(frame)
+            self._snapshot = None
+            self.events += 1
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener.offer(frame)
+        return frame[0]
+
+    def _snapshot_frame(self) -> Tuple[int, bytes]:
+        # Caller holds the lock; the snapshot is encoded once per sequence number
+        if self._snapshot is None or self._snapshot[0] != self.seq:
+            data = players_adapter.dump_json(list(self._players.values()))
+            self._snapshot = (self.seq, encode_event(self.epoch, self.seq, "snapshot", data))
+        return self._snapshot
+
+    def _catch_up(self, last_event_id: Optional[str]) -> List[Tuple[int, bytes]]:
+        # Caller holds the lock
+        resume = parse_event_id(last_event_id)
+        if resume is not None and resume[0] == self.epoch and resume[1] <= self.seq:
+            missed = self.seq - resume[1]
+            if missed == 0:
+                return []
+            if self._history and self._history[0][0] <= resume[1] + 1:
+                return list(self._history)[-missed:]
+        return [self._snapshot_frame()]
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Tuple[Subscriber, List[Tuple[int, bytes]]]:
+        """Register a listener and return it with the events that bring it up to date"""
+        self._ensure_started()
+        subscriber = Subscriber(self.listener_queue)
+        with self._lock:
+            initial = self._catch_up(last_event_id)
+            self._listeners.add(subscriber)
+        return subscriber, initial
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            self._listeners.discard(subscriber)
+
+    async def stream(self, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """SSE body: catch-up events, then diffs as they are published"""
+        subscriber, initial = self.subscribe(last_event_id)
+        try:
+            seen = 0
+            for seen, frame in initial:
+                yield frame
+            dropped = 0
+            while True:
+                try:
+                    item = await asyncio.wait_for(subscriber.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE
+                    continue
+                if item is None:
+                    return
+                if subscriber.dropped != dropped:
+                    # Overflowed: diffs are missing, start over from a snapshot
+                    dropped = subscriber.dropped
+                    self.resyncs += 1
+                    with self._lock:
+                        item = self._snapshot_frame()
+                seq, frame = item
+                if seq <= seen:
+                    continue
+                seen = seq
+                yield frame
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "seq": self.seq,
+                "listeners": len(self._listeners),
+                "events": self.events,
+                "resyncs": self.resyncs,
+            }
+
+    async def stop(self):
+        """Stop publishing and end every open stream"""
+        if self._broadcaster is not None:
+            self._broadcaster.cancel()
+            self._broadcaster = None
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener.close()
+
+
+# Process-wide feed used by the live router
+presence_feed = PresenceFeed()
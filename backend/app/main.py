@@ -1,30 +1,94 @@
-from fastapi import FastAPI
+import time
+_imports_started = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
-from .routers import auth, leaderboard, live
-from .database import init_db, SessionLocal
-from .db import seed_dummy_data
+from fastapi.openapi.docs import get_swagger_ui_html
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.staticfiles import StaticFiles
+from contextlib import asynccontextmanager, nullcontext
+from .routers import auth, leaderboard, live, debug
+from .database import init_db, SessionLocal, engine, read_engine
+from .db import seed_dummy_data, backfill_best_scores, apply_scores_event, reload_scores
+from .ranking import leaderboard_index
+from .windows import window_boards
+from .replay import replay_verifier
+from .hashing import password_hasher
+from .ingest import score_ingestor
+from .presence import presence_registry
+from .livefeed import presence_feed
+from .identity import identity_cache
+from .cache import leaderboard_cache
+from .metrics import metrics, MetricsMiddleware
+from .profiler import SQL_PROFILE, sql_profiler, SqlProfilerMiddleware
+from .assets import STATIC_DIR, static_assets
+from .bus import PRESENCE_TOPIC, SCORES_TOPIC, event_bus
+from .startup import FAST_STARTUP, STARTUP_PROFILE, boot_profile, warm_up
 import os
 
+boot_profile.record("imports", time.perf_counter() - _imports_started)
+
+# Keep this worker's caches, index and presence in step with the other workers
+event_bus.subscribe(SCORES_TOPIC, apply_scores_event)
+event_bus.subscribe(PRESENCE_TOPIC, presence_registry.apply_event)
+event_bus.on_resync(reload_scores)
+
+# Per-route latency, SQL and pool metrics served at GET /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize database on startup"""
+    # Receive other workers' events from before the index is loaded, so none
+    # fall between the load and the bus opening; they are applied after it
+    event_bus.open(hold=True)
+    
     #Skip database initialization in test mode
     if not os.getenv("TESTING"):
-        # Create tables
-        init_db()
+        # Create tables; in fast startup only when the stored schema version differs
+        with boot_profile.phase("schema"):
+            init_db(check_version=FAST_STARTUP)
         
         # Seed dummy data in development mode (when not using production DATABASE_URL)
         db_url = os.getenv("DATABASE_URL", "sqlite:///./snaky_arena.db")
-        if "sqlite" in db_url:
-            session = SessionLocal()
-            try:
-                seed_dummy_data(session)
-            finally:
-                session.close()
+        session = SessionLocal()
+        # With SQL_PROFILE=1, startup queries are profiled like a request
+        startup_profile = sql_profiler.profile("startup") if SQL_PROFILE else nullcontext()
+        try:
+            with startup_profile:
+                if "sqlite" in db_url:
+                    with boot_profile.phase("seed"):
+                        seed_dummy_data(session)
+                
+                # Per-user bests for scores stored before the table existed
+                with boot_profile.phase("backfill"):
+                    backfill_best_scores(session)
+                
+                # Build the in-memory leaderboard index from stored scores
+                with boot_profile.phase("load_index"):
+                    leaderboard_index.load(session)
+                    window_boards.load(session)
+            
+            # Connections, statements, caches and workers ready before serving
+            if FAST_STARTUP:
+                await warm_up(session, [engine] if read_engine is engine else [engine, read_engine])
+        finally:
+            session.close()
+        
+        if STARTUP_PROFILE:
+            boot_profile.log_report()
+    
+    # Apply the events held during loading, then each one as it arrives
+    event_bus.release()
     
     yield
-    # Cleanup on shutdown (if needed)
+    # Cleanup on shutdown
+    await replay_verifier.stop()
+    await score_ingestor.stop()
+    await presence_registry.stop()
+    await presence_feed.stop()
+    event_bus.close()
+    password_hasher.shutdown()
 
 app = FastAPI(
     title="Snaky Arena API",
@@ -42,6 +106,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if METRICS_ENABLED:
+    # Outermost, so latency covers CORS handling too
+    app.add_middleware(MetricsMiddleware, registry=metrics)
+    metrics.instrument_engine(engine, "write")
+    if read_engine is not engine:
+        metrics.instrument_engine(read_engine, "read")
+    for name, component in (
+        ("password_hasher", password_hasher),
+        ("score_ingestor", score_ingestor),
+        ("identity_cache", identity_cache),
+        ("leaderboard_cache", leaderboard_cache),
+        ("presence", presence_registry),
+        ("presence_feed", presence_feed),
+        ("startup", boot_profile),
+        ("event_bus", event_bus),
+    ):
+        metrics.register_collector(name, component.stats)
+
+if SQL_PROFILE:
+    app.add_middleware(SqlProfilerMiddleware, profiler=sql_profiler)
+    sql_profiler.instrument_engine(engine)
+    sql_profiler.instrument_engine(read_engine)
+
 # Include routers
 # Include routers with API prefix
 from fastapi import APIRouter
@@ -49,44 +136,52 @@ api_router = APIRouter(prefix="/api/v1")
 api_router.include_router(auth.router)
 api_router.include_router(leaderboard.router)
 api_router.include_router(live.router)
+if SQL_PROFILE:
+    api_router.include_router(debug.router)
 
 app.include_router(api_router)
 
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
-async def root():
-    if os.path.exists("static/index.html"):
-        return FileResponse("static/index.html")
+async def root(request: Request):
+    if static_assets.index is not None:
+        return static_assets.response("index.html", request.headers.get("accept-encoding"),
+                                      request.headers.get("if-none-match"))
     return {"message": "Welcome to Snaky Arena API"}
 
 # Mount the static directory
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-
 # Verify if static directory exists (it will in Docker)
-if os.path.exists("static"):
-    app.mount("/static", StaticFiles(directory="static"), name="static")
+if os.path.exists(STATIC_DIR):
+    app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+
+    # Read and precompress the built frontend once; requests are served from memory
+    with boot_profile.phase("static_assets"):
+        static_assets.load(STATIC_DIR)
+    if METRICS_ENABLED:
+        metrics.register_collector("static_assets", static_assets.stats)
 
     # Catch-all route for SPA (React Router)
     @app.get("/{full_path:path}")
-    async def serve_spa(full_path: str):
+    async def serve_spa(full_path: str, request: Request):
         # Allow API requests to pass through (if not matched by api_router)
         if full_path.startswith("api"):
-            from fastapi import HTTPException
             raise HTTPException(status_code=404, detail="Not Found")
 
         # Explicitly serve docs if hidden by catch-all
         if full_path == "docs":
-            from fastapi.openapi.docs import get_swagger_ui_html
             return get_swagger_ui_html(openapi_url="/openapi.json", title="Snaky Arena API")
 
         if full_path == "openapi.json":
-            from fastapi.responses import JSONResponse
             return JSONResponse(app.openapi())
-        
-        # Check if file exists in static folder (e.g. assets/index.css)
-        file_path = os.path.join("static", full_path)
-        if os.path.exists(file_path):
-            return FileResponse(file_path)
-            
-        # Fallback to index.html
-        return FileResponse("static/index.html")
+
+        # Asset from the manifest (e.g. assets/index-B4kYc0eR.css), else index.html
+        response = static_assets.response(
+            full_path, request.headers.get("accept-encoding"), request.headers.get("if-none-match")
+        )
+        if response is None:
+            raise HTTPException(status_code=404, detail="Not Found")
+        return response
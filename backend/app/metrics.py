@@ -0,0 +1,279 @@
+"""
+Request, SQL and connection-pool metrics in Prometheus text format.
+
+MetricsMiddleware times every HTTP request and labels it with the route
+template (e.g. /api/v1/leaderboard/page), so path parameters don't blow up
+the label set. SQL statements are timed with engine events and charged to
+the request that issued them through a context variable; run_db copies
+the context into its executor threads, so statements run off the event
+loop are attributed as well. Pool checkout wait is timed by giving the
+engine's pool a subclass that times the public Pool.connect(); the pool
+recreated by engine.dispose() keeps that class. Pool usage is read through
+the engine at scrape time.
+
+Everything is plain counters behind one lock, cheap enough to leave on.
+GET /metrics renders the lot together with the stats() of the in-process
+components (hasher, ingestor, caches, presence).
+"""
+import bisect
+import contextvars
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    """SQL work done on behalf of one request"""
+    __slots__ = ("statements", "sql_seconds", "done")
+
+    def __init__(self):
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.done = False
+
+
+current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "current_request", default=None
+)
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class Metrics:
+    """Process-wide metric registry"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.responses: Dict[Tuple[str, str, int], int] = {}
+        self.sql_statements: Dict[Tuple[str, str], int] = {}
+        self.sql_seconds: Dict[Tuple[str, str], float] = {}
+        self.pool_wait: Dict[str, Histogram] = {}
+        self.sql_outside_requests = 0
+        self._engines: Dict[str, Engine] = {}
+        self._collectors: Dict[str, Callable[[], dict]] = {}
+
+    # -- recording --------------------------------------------------------
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram()
+            histogram.observe(seconds)
+            status_key = (method, route, status)
+            self.responses[status_key] = self.responses.get(status_key, 0) + 1
+            self.sql_statements[key] = self.sql_statements.get(key, 0) + stats.statements
+            self.sql_seconds[key] = self.sql_seconds.get(key, 0.0) + stats.sql_seconds
+
+    def observe_statement(self, seconds: float):
+        stats = current_request.get()
+        # Background tasks started during a request inherit its context after it has finished
+        if stats is None or stats.done:
+            with self._lock:
+                self.sql_outside_requests += 1
+            return
+        # Each request's stats are only touched by the request and the DB thread it waits on
+        stats.statements += 1
+        stats.sql_seconds += seconds
+
+    def observe_pool_wait(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self.pool_wait.get(name)
+            if histogram is None:
+                histogram = self.pool_wait[name] = Histogram()
+            histogram.observe(seconds)
+
+    def register_collector(self, name: str, collect: Callable[[], dict]):
+        """Export the numeric values of collect() as snaky_<name>_<key> gauges"""
+        self._collectors[name] = collect
+
+    def instrument_engine(self, engine: Engine, name: str):
+        """Time statements and pool checkouts of an engine"""
+        if name in self._engines:
+            return
+        self._engines[name] = engine
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_execute(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info["metrics_started"].pop()
+            self.observe_statement(time.perf_counter() - started)
+
+        @event.listens_for(engine, "handle_error")
+        def failed_execute(context):
+            # A failed statement never reaches after_cursor_execute
+            conn = context.connection
+            started = conn.info.get("metrics_started") if conn is not None else None
+            if started:
+                started.pop()
+
+        # The pool has no event before a checkout starts waiting, so time Pool.connect()
+        # itself. Engine.dispose() recreates the pool as self.__class__, so the timed
+        # class carries over to the replacement pool.
+        engine.pool.__class__ = timed_pool_class(type(engine.pool), self, name)
+
+    def reset(self):
+        with self._lock:
+            self.latency.clear()
+            self.responses.clear()
+            self.sql_statements.clear()
+            self.sql_seconds.clear()
+            self.pool_wait.clear()
+            self.sql_outside_requests = 0
+
+    # -- exposition -------------------------------------------------------
+
+    def render(self) -> str:
+        """Prometheus text exposition format 0.0.4"""
+        lines: List[str] = []
+        with self._lock:
+            _histogram(lines, "snaky_http_request_duration_seconds", "HTTP request latency by route",
+                       {("method", "route"): self.latency})
+            _family(lines, "snaky_http_responses_total", "counter", "HTTP responses by route and status",
+                    ((_labels(method=m, route=r, status=s), v) for (m, r, s), v in self.responses.items()))
+            _family(lines, "snaky_sql_statements_total", "counter", "SQL statements issued per route",
+                    ((_labels(method=m, route=r), v) for (m, r), v in self.sql_statements.items()))
+            _family(lines, "snaky_sql_seconds_total", "counter", "Time spent in SQL per route",
+                    ((_labels(method=m, route=r), v) for (m, r), v in self.sql_seconds.items()))
+            _family(lines, "snaky_sql_statements_outside_requests_total", "counter",
+                    "SQL statements issued by background work", [("", self.sql_outside_requests)])
+            _histogram(lines, "snaky_db_pool_checkout_wait_seconds", "Time spent acquiring a pooled connection",
+                       {("engine",): {(name,): h for name, h in self.pool_wait.items()}})
+
+        pool_stats = []
+        for name, engine in self._engines.items():
+            # Read through the engine: dispose() swaps in a new pool
+            pool = engine.pool
+            for stat in ("size", "checkedout", "overflow", "checkedin"):
+                read = getattr(pool, stat, None)
+                if read is not None:
+                    pool_stats.append((stat, name, read()))
+        for stat in ("size", "checkedout", "overflow", "checkedin"):
+            _family(lines, f"snaky_db_pool_{stat}", "gauge", f"Connection pool {stat}",
+                    [(_labels(engine=name), value) for s, name, value in pool_stats if s == stat])
+
+        for component, collect in self._collectors.items():
+            for key, value in collect().items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if isinstance(value, (int, float)):
+                    _family(lines, f"snaky_{component}_{key}", "gauge", f"{component} {key}", [("", value)])
+        return "\n".join(lines) + "\n"
+
+
+def timed_pool_class(pool_class: type, registry: "Metrics", name: str) -> type:
+    """pool_class reporting how long each connection checkout took to registry under name"""
+    class TimedPool(pool_class):
+        def connect(self):
+            started = time.perf_counter()
+            try:
+                return super().connect()
+            finally:
+                registry.observe_pool_wait(name, time.perf_counter() - started)
+
+    TimedPool.__name__ = TimedPool.__qualname__ = f"Timed{pool_class.__name__}"
+    return TimedPool
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _family(lines: List[str], name: str, kind: str, help_text: str, samples):
+    samples = list(samples)
+    if not samples:
+        return
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        lines.append(f"{name}{labels} {value}")
+
+
+def _histogram(lines: List[str], name: str, help_text: str, series: dict):
+    (label_names, histograms), = series.items()
+    if not histograms:
+        return
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for label_values, histogram in histograms.items():
+        base = dict(zip(label_names, label_values))
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), histogram.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{name}_bucket{_labels(**base, le=le)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(**base)} {histogram.total}")
+        lines.append(f"{name}_count{_labels(**base)} {histogram.count}")
+
+
+def route_label(scope) -> str:
+    """Path template of the route that handled the request; unmatched paths share one label"""
+    # Routers included into another keep their own prefix-less route; FastAPI
+    # records the full path of the matched route alongside it
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    path = getattr(context, "path", None) or getattr(scope.get("route"), "path", None)
+    return path or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and SQL work per route"""
+
+    def __init__(self, app, registry: "Metrics"):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            stats.done = True
+            current_request.reset(token)
+            self.registry.observe_request(
+                scope["method"], route_label(scope), status, time.perf_counter() - started, stats
+            )
+
+
+# Process-wide registry used by MetricsMiddleware and GET /metrics
+metrics = Metrics()
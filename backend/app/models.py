@@ -1,7 +1,7 @@
 from datetime import datetime
-from typing import Optional, List, Literal
+from typing import Dict, Optional, List, Literal, Tuple
 from uuid import UUID
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, field_validator
 
 class User(BaseModel):
     id: str = Field(..., description="UUID as string")
@@ -32,14 +32,43 @@ class LeaderboardEntry(BaseModel):
     date: datetime
     rank: int
 
+class LeaderboardPage(BaseModel):
+    entries: List[LeaderboardEntry]
+    nextCursor: Optional[str] = None
+
+class ReplayPayload(BaseModel):
+    seed: int = Field(..., ge=0, lt=2**64, description="Seed of the engine food RNG")
+    gridSize: int = Field(20, ge=5, le=64)
+    ticks: int = Field(..., ge=1, le=100_000, description="Moves played, including the one that ended the game")
+    # (tick, direction): direction in effect for the step at that zero-based tick
+    moves: List[Tuple[int, Literal["UP", "DOWN", "LEFT", "RIGHT"]]] = []
+
+    @field_validator("moves")
+    @classmethod
+    def ticks_increasing(cls, moves):
+        ticks = [tick for tick, _ in moves]
+        if any(b <= a for a, b in zip(ticks, ticks[1:])) or (ticks and ticks[0] < 0):
+            raise ValueError("move ticks must be non-negative and strictly increasing")
+        return moves
+
 class ScoreSubmit(BaseModel):
     score: int
     mode: Literal["pass-through", "walls"]
     duration: int
+    replay: Optional[ReplayPayload] = None
 
 class ScoreResponse(BaseModel):
     rank: Optional[int]
     isHighScore: bool
+    verificationId: Optional[str] = None
+    status: Optional[Literal["pending", "accepted", "rejected"]] = None
+
+class VerificationStatus(BaseModel):
+    id: str
+    status: Literal["pending", "accepted", "rejected"]
+    reason: Optional[str] = None
+    rank: Optional[int] = None
+    isHighScore: bool = False
 
 class ActivePlayer(BaseModel):
     id: str
@@ -49,6 +78,15 @@ class ActivePlayer(BaseModel):
     isLive: bool
     startedAt: datetime
 
+class Heartbeat(BaseModel):
+    score: int = Field(0, ge=0)
+    mode: Literal["pass-through", "walls"]
+
+class PresenceDiff(BaseModel):
+    joined: List[ActivePlayer] = []
+    scores: Dict[str, int] = {}
+    left: List[str] = []
+
 class WatchResponse(BaseModel):
     success: bool
 
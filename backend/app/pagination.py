@@ -0,0 +1,41 @@
+"""
+Keyset cursors for leaderboard pages.
+
+A cursor names the last entry of the previous page by its sort key
+(score, date, id) together with that entry's rank, so the next page is a
+range read that starts right after it instead of an OFFSET scan. Cursors
+are opaque to clients: URL-safe base64 of a small JSON array.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import NamedTuple
+
+# Largest page a single leaderboard request may ask for
+MAX_PAGE_SIZE = 100
+
+
+class Cursor(NamedTuple):
+    rank: int
+    score: int
+    date: datetime
+    id: str
+
+
+def encode_cursor(rank: int, score: int, date: datetime, score_id: str) -> str:
+    """Opaque cursor pointing just past the given entry"""
+    raw = json.dumps([rank, score, date.isoformat(), score_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Parse a cursor from encode_cursor; raises ValueError if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        rank, score, date, score_id = json.loads(base64.urlsafe_b64decode(padded))
+        parsed = Cursor(int(rank), int(score), datetime.fromisoformat(date), str(score_id))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if parsed.rank < 1:
+        raise ValueError("Invalid cursor")
+    return parsed
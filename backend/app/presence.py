@@ -0,0 +1,290 @@
+"""
+In-memory live-presence registry.
+
+Players' games send a heartbeat with their current score every few
+seconds; a player is live until PRESENCE_TTL seconds pass without one.
+Expiry runs off a min-heap of deadlines, so each heartbeat or read only
+pops the entries that are actually due instead of scanning every player
+(superseded deadlines are skipped lazily when they reach the top). The
+player list is served from a snapshot that is rebuilt only after a change,
+and so is its JSON encoding.
+
+Writing presence to the active_players table is optional: with
+PRESENCE_PERSIST=1 changed entries are upserted in one batch every
+PRESENCE_PERSIST_MS.
+
+Heartbeats and departures are published on the event bus, and those from
+other workers are applied here, so every worker lists the same players.
+Only the worker that received a heartbeat persists it.
+"""
+import asyncio
+import heapq
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from .bus import PRESENCE_TOPIC, EventBus, event_bus
+from .database import SessionLocal, run_db
+from .db import get_db_instance
+from .models import ActivePlayer
+from .serialization import active_players_json
+
+PRESENCE_TTL = float(os.getenv("PRESENCE_TTL", "15"))
+PRESENCE_PERSIST = os.getenv("PRESENCE_PERSIST", "0") == "1"
+PRESENCE_PERSIST_MS = float(os.getenv("PRESENCE_PERSIST_MS", "5000"))
+
+
+class PresenceEntry:
+    __slots__ = ("id", "username", "mode", "score", "started_at", "expires_at")
+
+    def __init__(self, player_id: str, username: str, mode: str, score: int, started_at: datetime, expires_at: float):
+        self.id = player_id
+        self.username = username
+        self.mode = mode
+        self.score = score
+        self.started_at = started_at
+        self.expires_at = expires_at
+
+    def as_player(self) -> ActivePlayer:
+        return ActivePlayer(
+            id=self.id,
+            username=self.username,
+            currentScore=self.score,
+            mode=self.mode,
+            isLive=True,
+            startedAt=self.started_at
+        )
+
+    def as_row(self) -> dict:
+        return {
+            "id": self.id, "username": self.username, "currentScore": self.score,
+            "mode": self.mode, "isLive": True, "startedAt": self.started_at,
+        }
+
+
+class PresenceRegistry:
+    """Live players keyed by user id, expired by heartbeat deadline"""
+
+    def __init__(
+        self,
+        ttl: float = PRESENCE_TTL,
+        persist: bool = PRESENCE_PERSIST,
+        persist_ms: float = PRESENCE_PERSIST_MS,
+        session_factory: Callable[[], Session] = SessionLocal,
+        clock: Callable[[], float] = time.monotonic,
+        bus: EventBus = event_bus,
+    ):
+        self.ttl = ttl
+        self.persist = persist
+        self.persist_interval = persist_ms / 1000
+        self.session_factory = session_factory
+        self.clock = clock
+        self.bus = bus
+        self._lock = threading.Lock()
+        self._players: Dict[str, PresenceEntry] = {}
+        self._deadlines: List[Tuple[float, str]] = []
+        self._snapshot: Optional[List[ActivePlayer]] = None
+        self._snapshot_json: Optional[bytes] = None
+        self._dirty: Dict[str, ActivePlayer] = {}
+        self._departed: Set[str] = set()
+        self._listeners: List[Callable[[str, Optional[ActivePlayer]], None]] = []
+        self._persister: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.heartbeats = 0
+        self.expired = 0
+
+    def heartbeat(self, player_id: str, username: str, mode: str, score: int) -> ActivePlayer:
+        """Mark the player live for another TTL with their current score"""
+        with self._lock:
+            entry = self._beat(player_id, username, mode, score, None, persist=True)
+            player = entry.as_player()
+            event = entry.as_row()
+        self.bus.publish(PRESENCE_TOPIC, event)
+        if self.persist:
+            self._ensure_persister()
+        return player
+
+    def _beat(self, player_id: str, username: str, mode: str, score: int,
+              started_at: Optional[datetime], persist: bool) -> PresenceEntry:
+        # Caller holds the lock; started_at is given for heartbeats from other workers
+        now = self.clock()
+        self._expire(now)
+        entry = self._players.get(player_id)
+        if entry is None or entry.mode != mode or (started_at is not None and entry.started_at != started_at):
+            # A new game (or a switch of mode) restarts the session
+            entry = PresenceEntry(
+                player_id, username, mode, score, started_at or datetime.now(timezone.utc), now + self.ttl
+            )
+            self._players[player_id] = entry
+        else:
+            entry.username = username
+            entry.score = score
+            entry.expires_at = now + self.ttl
+        heapq.heappush(self._deadlines, (entry.expires_at, player_id))
+        self.heartbeats += 1
+        self._changed(player_id, entry, persist)
+        return entry
+
+    def leave(self, player_id: str):
+        """Drop a player immediately, e.g. when their game ends"""
+        with self._lock:
+            left = self._players.pop(player_id, None) is not None
+            if left:
+                self._changed(player_id, None)
+        if left:
+            self.bus.publish(PRESENCE_TOPIC, {"id": player_id, "left": True})
+
+    def apply_event(self, data: dict):
+        """Bus handler for a heartbeat or departure seen by another worker"""
+        player_id = data["id"]
+        with self._lock:
+            if data.get("left"):
+                if self._players.pop(player_id, None) is not None:
+                    self._changed(player_id, None, persist=False)
+                return
+            self._beat(
+                player_id, data["username"], data["mode"], data["currentScore"],
+                datetime.fromisoformat(data["startedAt"]), persist=False,
+            )
+
+    def _expire(self, now: float):
+        while self._deadlines and self._deadlines[0][0] <= now:
+            deadline, player_id = heapq.heappop(self._deadlines)
+            entry = self._players.get(player_id)
+            # Stale deadline: the player has sent a heartbeat since, or already left
+            if entry is None or entry.expires_at != deadline:
+                continue
+            del self._players[player_id]
+            self.expired += 1
+            self._changed(player_id, None)
+
+    def _changed(self, player_id: str, entry: Optional[PresenceEntry], persist: bool = True):
+        self._snapshot = None
+        self._snapshot_json = None
+        if self._listeners:
+            player = entry.as_player() if entry is not None else None
+            for listener in self._listeners:
+                listener(player_id, player)
+        if not (self.persist and persist):
+            return
+        if entry is None:
+            self._dirty.pop(player_id, None)
+            self._departed.add(player_id)
+        else:
+            self._departed.discard(player_id)
+            self._dirty[player_id] = entry.as_player()
+
+    def snapshot(self) -> List[ActivePlayer]:
+        """Current live players; the list is shared until the next change"""
+        with self._lock:
+            self._expire(self.clock())
+            if self._snapshot is None:
+                self._snapshot = [entry.as_player() for entry in self._players.values()]
+            return self._snapshot
+
+    def snapshot_json(self) -> bytes:
+        """The live players as a JSON array, encoded once per change"""
+        with self._lock:
+            self._expire(self.clock())
+            if self._snapshot_json is None:
+                self._snapshot_json = active_players_json.dump_json(
+                    [entry.as_row() for entry in self._players.values()]
+                )
+            return self._snapshot_json
+
+    def expire_due(self):
+        """Drop players whose deadline has passed"""
+        with self._lock:
+            self._expire(self.clock())
+
+    def listen(self, listener: Callable[[str, Optional[ActivePlayer]], None]) -> List[ActivePlayer]:
+        """Call listener(player_id, player or None) on every change; returns the current players.
+
+        The listener runs with the registry lock held and must not call back into it.
+        """
+        with self._lock:
+            self._expire(self.clock())
+            self._listeners.append(listener)
+            return [entry.as_player() for entry in self._players.values()]
+
+    def unlisten(self, listener: Callable[[str, Optional[ActivePlayer]], None]):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def is_live(self, player_id: str) -> bool:
+        with self._lock:
+            entry = self._players.get(player_id)
+            return entry is not None and entry.expires_at > self.clock()
+
+    def clear(self):
+        with self._lock:
+            self._players.clear()
+            self._deadlines.clear()
+            self._snapshot = None
+            self._snapshot_json = None
+            self._dirty.clear()
+            self._departed.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "live": len(self._players),
+                "pending_deadlines": len(self._deadlines),
+                "heartbeats": self.heartbeats,
+                "expired": self.expired,
+            }
+
+    def _ensure_persister(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._persister is not None and not self._persister.done():
+            return
+        self._loop = loop
+        self._persister = loop.create_task(self._run_persister())
+
+    async def _run_persister(self):
+        while True:
+            await asyncio.sleep(self.persist_interval)
+            self.expire_due()
+            try:
+                await run_db(self.flush)
+            except Exception:
+                # flush has requeued its changes; try again on the next tick
+                pass
+
+    def flush(self):
+        """Write the entries changed since the last flush in one transaction"""
+        with self._lock:
+            dirty, departed = self._dirty, self._departed
+            self._dirty, self._departed = {}, set()
+        if not dirty and not departed:
+            return
+        session = self.session_factory()
+        try:
+            get_db_instance(session).save_presence(list(dirty.values()), departed)
+        except Exception:
+            # Requeue for the next flush unless newer changes arrived meanwhile
+            with self._lock:
+                for player_id, player in dirty.items():
+                    if player_id not in self._departed:
+                        self._dirty.setdefault(player_id, player)
+                self._departed |= departed - self._dirty.keys()
+            raise
+        finally:
+            session.close()
+
+    async def stop(self):
+        """Stop the persister, writing any outstanding changes"""
+        if self._persister is not None:
+            self._persister.cancel()
+            self._persister = None
+        if self.persist:
+            await run_db(self.flush)
+
+
+# Process-wide registry used by the live router
+presence_registry = PresenceRegistry()
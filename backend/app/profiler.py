@@ -0,0 +1,296 @@
+"""
+Opt-in SQL profiler: per-request statement log, slow queries and N+1 warnings.
+
+With SQL_PROFILE=1 every statement executed on an instrumented engine is
+recorded against the request (or profile() block) that issued it, through
+a context variable that run_db carries onto the DB threads. When the
+request finishes its profile is summarised:
+
+* statements slower than SQL_SLOW_MS are logged with their parameters and
+  the database's plan for them (EXPLAIN QUERY PLAN on SQLite, EXPLAIN on
+  PostgreSQL);
+* a statement shape (the SQL with IN-lists collapsed) executed
+  SQL_REPEAT_THRESHOLD or more times in one request is logged as a likely
+  N+1 pattern.
+
+Each response carries an X-SQL-Profile header with the totals, and the
+last SQL_PROFILE_HISTORY profiles are served at GET /api/v1/debug/sql.
+Profiling is off by default: it keeps every statement of a request in
+memory and runs an extra EXPLAIN for slow ones.
+
+Bound parameters hold emails, password hashes and tokens, so the log and
+the endpoint only show their shape and types (e.g. "(str, int)") unless
+SQL_PROFILE_PARAMS=1. The endpoint answers requests carrying
+X-Debug-Token: <SQL_PROFILE_TOKEN>, or, with no token configured, direct
+requests from the loopback interface only.
+"""
+import contextvars
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SQL_PROFILE = os.getenv("SQL_PROFILE", "0") == "1"
+SQL_SLOW_MS = float(os.getenv("SQL_SLOW_MS", "100"))
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "10"))
+SQL_PROFILE_HISTORY = int(os.getenv("SQL_PROFILE_HISTORY", "50"))
+# Show bound parameter values instead of their types; they may hold secrets
+SQL_PROFILE_PARAMS = os.getenv("SQL_PROFILE_PARAMS", "0") == "1"
+SQL_PROFILE_TOKEN = os.getenv("SQL_PROFILE_TOKEN", "")
+
+PROFILE_HEADER = b"x-sql-profile"
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+# Expanded IN lists differ in length per call but are the same query
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*(?:\?|%\([^)]*\)s|%s|:\w+)\s*,)+\s*(?:\?|%\([^)]*\)s|%s|:\w+)\s*\)")
+_EXPLAINABLE = ("select", "update", "delete", "insert", "with")
+
+
+def statement_shape(statement: str) -> str:
+    """Statement text with whitespace normalised and IN lists collapsed"""
+    return _PLACEHOLDER_LIST.sub("(?...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def redact_parameters(parameters) -> str:
+    """Shape and types of bound parameters, without their values"""
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            # executemany: one parameter set per row
+            return f"[{len(parameters)} x {redact_parameters(parameters[0])}]"
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+class QueryRecord:
+    __slots__ = ("statement", "parameters", "seconds", "plan")
+
+    def __init__(self, statement: str, parameters, seconds: float):
+        self.statement = statement
+        self.parameters = parameters
+        self.seconds = seconds
+        self.plan: Optional[List[str]] = None
+
+    def as_dict(self, show_parameters: bool = False) -> dict:
+        return {
+            "statement": self.statement,
+            "parameters": repr(self.parameters) if show_parameters else redact_parameters(self.parameters),
+            "ms": round(self.seconds * 1000, 3),
+            "plan": self.plan,
+        }
+
+
+class RequestProfile:
+    """Statements executed on behalf of one request"""
+
+    def __init__(self, label: str, slow_seconds: float, repeat_threshold: int,
+                 show_parameters: bool = False):
+        self.label = label
+        self.show_parameters = show_parameters
+        self.slow_seconds = slow_seconds
+        self.repeat_threshold = repeat_threshold
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+        self.shapes: Dict[str, List[float]] = {}
+        self.slow: List[QueryRecord] = []
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.done = False
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, parameters, seconds: float) -> Optional[QueryRecord]:
+        """Count a statement; returns a record for it when it was slow"""
+        shape = statement_shape(statement)
+        with self._lock:
+            self.statements += 1
+            self.sql_seconds += seconds
+            self.shapes.setdefault(shape, []).append(seconds)
+            if seconds < self.slow_seconds:
+                return None
+            record = QueryRecord(shape, parameters, seconds)
+            self.slow.append(record)
+            return record
+
+    def repeated(self) -> List[dict]:
+        """Shapes executed at least repeat_threshold times, most frequent first"""
+        repeats = [
+            {"statement": shape, "count": len(times), "ms": round(sum(times) * 1000, 3)}
+            for shape, times in self.shapes.items()
+            if len(times) >= self.repeat_threshold
+        ]
+        return sorted(repeats, key=lambda r: -r["count"])
+
+    def header(self) -> str:
+        with self._lock:
+            return (
+                f"statements={self.statements}; sql_ms={self.sql_seconds * 1000:.3f}; "
+                f"distinct={len(self.shapes)}; slow={len(self.slow)}; "
+                f"repeated={sum(len(t) >= self.repeat_threshold for t in self.shapes.values())}"
+            )
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "request": self.label,
+                "ms": round(self.seconds * 1000, 3),
+                "statements": self.statements,
+                "sql_ms": round(self.sql_seconds * 1000, 3),
+                "distinct": len(self.shapes),
+                "slow": [record.as_dict(self.show_parameters) for record in self.slow],
+                "repeated": self.repeated(),
+            }
+
+
+class SqlProfiler:
+    """Groups statements by request and reports slow and repeated ones"""
+
+    def __init__(self, slow_ms: float = SQL_SLOW_MS, repeat_threshold: int = SQL_REPEAT_THRESHOLD,
+                 history: int = SQL_PROFILE_HISTORY, show_parameters: bool = SQL_PROFILE_PARAMS):
+        self.slow_seconds = slow_ms / 1000
+        self.show_parameters = show_parameters
+        self.repeat_threshold = repeat_threshold
+        self._history: Deque[dict] = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._engines = set()
+        self.current: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar(
+            f"sql_profile_{id(self)}", default=None
+        )
+
+    def instrument_engine(self, engine: Engine):
+        """Record statements executed on an engine"""
+        if id(engine) in self._engines:
+            return
+        self._engines.add(id(engine))
+        started_key = f"sql_profile_started_{id(self)}"
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            if self.current.get() is not None:
+                conn.info.setdefault(started_key, []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_execute(conn, cursor, statement, parameters, context, executemany):
+            profile = self.current.get()
+            started = conn.info.get(started_key)
+            if profile is None or not started:
+                return
+            seconds = time.perf_counter() - started.pop()
+            if profile.done:
+                return
+            record = profile.record(statement, parameters, seconds)
+            if record is not None and not executemany:
+                record.plan = self.explain(conn, statement, parameters)
+
+    def explain(self, conn, statement: str, parameters) -> Optional[List[str]]:
+        """The database's plan for a statement, run on the same connection"""
+        if not statement.lstrip().lower().startswith(_EXPLAINABLE):
+            return None
+        sqlite = conn.dialect.name == "sqlite"
+        prefix = "EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN "
+        # A raw DBAPI cursor, so the EXPLAIN itself is not profiled
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            # On PostgreSQL a failed statement aborts the whole transaction: confine
+            # the EXPLAIN to a savepoint so the request's own statements carry on
+            if not sqlite:
+                cursor.execute("SAVEPOINT sql_profile_explain")
+            cursor.execute(prefix + statement, parameters)
+            plan = [" ".join(str(column) for column in row) for row in cursor.fetchall()]
+            if not sqlite:
+                cursor.execute("RELEASE SAVEPOINT sql_profile_explain")
+            return plan
+        except Exception as exc:
+            if not sqlite:
+                try:
+                    cursor.execute("ROLLBACK TO SAVEPOINT sql_profile_explain")
+                except Exception:
+                    pass
+            return [f"EXPLAIN failed: {exc}"]
+        finally:
+            cursor.close()
+
+    def begin(self, label: str) -> RequestProfile:
+        return RequestProfile(label, self.slow_seconds, self.repeat_threshold, self.show_parameters)
+
+    def finish(self, profile: RequestProfile):
+        """Log slow and repeated statements and keep the profile for the debug endpoint"""
+        profile.done = True
+        profile.seconds = time.perf_counter() - profile.started
+        report = profile.as_dict()
+        for record in report["slow"]:
+            logger.warning(
+                "slow query (%.1f ms) in %s: %s params=%s plan=%s",
+                record["ms"], profile.label, record["statement"], record["parameters"], record["plan"],
+            )
+        for repeat in report["repeated"]:
+            logger.warning(
+                "possible N+1 in %s: statement ran %d times (%.1f ms): %s",
+                profile.label, repeat["count"], repeat["ms"], repeat["statement"],
+            )
+        with self._lock:
+            self._history.append(report)
+
+    @contextmanager
+    def profile(self, label: str):
+        """Profile the statements issued inside the block, e.g. startup work"""
+        profile = self.begin(label)
+        token = self.current.set(profile)
+        try:
+            yield profile
+        finally:
+            self.current.reset(token)
+            self.finish(profile)
+
+    def recent(self) -> List[dict]:
+        """Finished profiles, newest first"""
+        with self._lock:
+            return list(reversed(self._history))
+
+    def clear(self):
+        with self._lock:
+            self._history.clear()
+
+
+class SqlProfilerMiddleware:
+    """ASGI middleware profiling each HTTP request and adding X-SQL-Profile"""
+
+    def __init__(self, app, profiler: SqlProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        query = scope.get("query_string", b"").decode("latin-1")
+        profile = self.profiler.begin(f"{scope['method']} {scope['path']}" + (f"?{query}" if query else ""))
+        token = self.profiler.current.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # Statements run while streaming the body are in the logged profile only
+                message["headers"] = list(message.get("headers", [])) + [
+                    (PROFILE_HEADER, profile.header().encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.profiler.current.reset(token)
+            self.profiler.finish(profile)
+
+
+# Process-wide profiler; only wired into the app when SQL_PROFILE=1
+sql_profiler = SqlProfiler()
@@ -0,0 +1,56 @@
+"""
+Read-only Core statements for the hot read paths.
+
+Loading ORM entities means identity-map bookkeeping, instance state and
+attribute instrumentation for every row, only for the caller to copy a
+few columns into a Pydantic model or dict. These statements select just
+the needed columns and run on the session's connection, so rows come back
+as plain tuples (sqlalchemy Row) and the session's identity map is never
+touched.
+
+Each statement is built once at import with bind parameters for every
+value that varies, mode included, so SQLAlchemy compiles it once and then
+serves it from the engine's compiled cache. Writes stay on the ORM.
+"""
+from sqlalchemy import Integer, bindparam, desc, select
+
+from .db_models import BestScoreModel, ScoreModel, UserModel
+
+users = UserModel.__table__
+scores = ScoreModel.__table__
+best_scores = BestScoreModel.__table__
+
+# Column order of user rows, matching USER_FIELDS
+USER_COLUMNS = (
+    users.c.id, users.c.username, users.c.email, users.c.hashed_password,
+    users.c.high_score, users.c.games_played, users.c.created_at,
+)
+USER_FIELDS = ("id", "username", "email", "hashed_password", "highScore", "gamesPlayed", "createdAt")
+
+user_by_email = select(*USER_COLUMNS).where(users.c.email == bindparam("email")).limit(1)
+user_by_id = select(*USER_COLUMNS).where(users.c.id == bindparam("user_id"))
+
+_limit = bindparam("limit", type_=Integer)
+
+
+def _top_scores(by_mode: bool):
+    statement = select(scores.c.id, scores.c.username, scores.c.score, scores.c.mode, scores.c.date)
+    if by_mode:
+        statement = statement.where(scores.c.mode == bindparam("mode"))
+    # Score descending, then earliest first for ties: the ix_scores_* index order
+    return statement.order_by(desc(scores.c.score), scores.c.date, scores.c.id).limit(_limit)
+
+
+def _top_best_scores(by_mode: bool):
+    statement = select(
+        best_scores.c.score_id, best_scores.c.username, best_scores.c.best_score,
+        best_scores.c.mode, best_scores.c.achieved_at,
+    )
+    if by_mode:
+        statement = statement.where(best_scores.c.mode == bindparam("mode"))
+    return statement.order_by(desc(best_scores.c.best_score), best_scores.c.achieved_at).limit(_limit)
+
+
+# Keyed by whether a mode filter applies; rows are ScoreRecord tuples
+top_scores = {False: _top_scores(False), True: _top_scores(True)}
+top_best_scores = {False: _top_best_scores(False), True: _top_best_scores(True)}
@@ -0,0 +1,268 @@
+"""
+In-process ranked leaderboard index.
+
+Keeps every score of every mode in an indexable skip list ordered by
+(score desc, date asc, id), so rank lookups and top-N reads are O(log n)
+and need no SQL. The database stays the source of truth: the index is
+loaded from ScoreModel at startup and Database falls back to SQL while it
+is not loaded.
+"""
+import random
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from .db_models import ScoreModel
+
+MAX_LEVEL = 32
+
+
+class _Node:
+    __slots__ = ("key", "value", "next", "width")
+
+    def __init__(self, key, value, level: int):
+        self.key = key
+        self.value = value
+        self.next: List[Optional["_Node"]] = [None] * level
+        self.width: List[int] = [0] * level
+
+
+class RankedIndex:
+    """Indexable skip list: sorted by key, with O(log n) insert, rank and positional access"""
+
+    def __init__(self, seed: Optional[int] = None):
+        self._head = _Node(None, None, MAX_LEVEL)
+        self._level = 1
+        self._size = 0
+        self._random = random.Random(seed)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < MAX_LEVEL and self._random.random() < 0.5:
+            level += 1
+        return level
+
+    def _find_update(self, key) -> List[_Node]:
+        update: List[_Node] = [self._head] * MAX_LEVEL
+        node = self._head
+        for i in reversed(range(self._level)):
+            while node.next[i] is not None and node.next[i].key < key:
+                node = node.next[i]
+            update[i] = node
+        return update
+
+    def __contains__(self, key) -> bool:
+        node = self._find_update(key)[0].next[0]
+        return node is not None and node.key == key
+
+    def insert(self, key, value: Any = None) -> int:
+        """Insert a key and return its zero-based position"""
+        update: List[_Node] = [self._head] * MAX_LEVEL
+        rank = [0] * MAX_LEVEL
+        node = self._head
+        for i in reversed(range(self._level)):
+            rank[i] = rank[i + 1] if i + 1 < self._level else 0
+            while node.next[i] is not None and node.next[i].key < key:
+                rank[i] += node.width[i]
+                node = node.next[i]
+            update[i] = node
+
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                rank[i] = 0
+                update[i] = self._head
+                self._head.width[i] = self._size
+            self._level = level
+
+        new_node = _Node(key, value, level)
+        for i in range(level):
+            new_node.next[i] = update[i].next[i]
+            update[i].next[i] = new_node
+            new_node.width[i] = update[i].width[i] - (rank[0] - rank[i])
+            update[i].width[i] = rank[0] - rank[i] + 1
+        for i in range(level, self._level):
+            update[i].width[i] += 1
+
+        self._size += 1
+        return rank[0]
+
+    def remove(self, key) -> Any:
+        """Remove a key and return its value"""
+        update = self._find_update(key)
+        node = update[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+
+        for i in range(self._level):
+            if update[i].next[i] is node:
+                update[i].width[i] += node.width[i] - 1
+                update[i].next[i] = node.next[i]
+            else:
+                update[i].width[i] -= 1
+        while self._level > 1 and self._head.next[self._level - 1] is None:
+            self._level -= 1
+
+        self._size -= 1
+        return node.value
+
+    def bisect_left(self, key) -> int:
+        """Number of keys strictly less than key"""
+        node = self._head
+        rank = 0
+        for i in reversed(range(self._level)):
+            while node.next[i] is not None and node.next[i].key < key:
+                rank += node.width[i]
+                node = node.next[i]
+        return rank
+
+    def bisect_right(self, key) -> int:
+        """Number of keys less than or equal to key"""
+        node = self._head
+        rank = 0
+        for i in reversed(range(self._level)):
+            while node.next[i] is not None and node.next[i].key <= key:
+                rank += node.width[i]
+                node = node.next[i]
+        return rank
+
+    def _node_at(self, index: int) -> Optional[_Node]:
+        if index < 0 or index >= self._size:
+            return None
+        target = index + 1
+        traversed = 0
+        node = self._head
+        for i in reversed(range(self._level)):
+            while node.next[i] is not None and traversed + node.width[i] <= target:
+                traversed += node.width[i]
+                node = node.next[i]
+            if traversed == target:
+                return node
+        return None
+
+    def slice(self, start: int, stop: int) -> List[Tuple[Any, Any]]:
+        """(key, value) pairs at positions [start, stop)"""
+        start = max(start, 0)
+        node = self._node_at(start)
+        items = []
+        while node is not None and start < stop:
+            items.append((node.key, node.value))
+            node = node.next[0]
+            start += 1
+        return items
+
+    def __iter__(self):
+        node = self._head.next[0]
+        while node is not None:
+            yield node.key, node.value
+            node = node.next[0]
+
+
+def normalize_date(value: datetime) -> datetime:
+    """Naive UTC datetime, matching what the database hands back"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def score_key(score: int, date: datetime, score_id: str) -> tuple:
+    """Sort key: higher score first, earlier date wins ties"""
+    return (-score, normalize_date(date), score_id)
+
+
+# Record stored per entry: (id, username, score, mode, date)
+ScoreRecord = Tuple[str, str, int, str, datetime]
+
+
+class LeaderboardIndex:
+    """Ranked score index per mode, plus a combined board under the None key"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._boards: Dict[Optional[str], RankedIndex] = {}
+        self.loaded = False
+
+    def _board(self, mode: Optional[str]) -> RankedIndex:
+        board = self._boards.get(mode)
+        if board is None:
+            board = self._boards[mode] = RankedIndex()
+        return board
+
+    def reset(self):
+        """Drop all entries and mark the index as not loaded"""
+        with self._lock:
+            self._boards = {}
+            self.loaded = False
+
+    def load(self, session: Session):
+        """Build the index from every stored score"""
+        rows = session.query(
+            ScoreModel.id, ScoreModel.username, ScoreModel.score,
+            ScoreModel.mode, ScoreModel.date
+        ).yield_per(10000)
+        with self._lock:
+            self._boards = {}
+            for row in rows:
+                self._insert(*row)
+            self.loaded = True
+
+    def _insert(self, score_id: str, username: str, score: int, mode: str, date: datetime):
+        record = (score_id, username, score, mode, normalize_date(date))
+        key = score_key(score, date, score_id)
+        self._board(mode).insert(key, record)
+        self._board(None).insert(key, record)
+
+    def add(self, score_id: str, username: str, score: int, mode: str, date: datetime):
+        """Add a freshly committed score; adding one already indexed changes nothing"""
+        with self._lock:
+            # The key ends with the score id, so a score seen twice (loaded and
+            # then announced on the bus) has the same key both times
+            if score_key(score, date, score_id) not in self._board(mode):
+                self._insert(score_id, username, score, mode, date)
+
+    def count_higher(self, mode: Optional[str], score: int) -> int:
+        """Number of scores in the mode strictly greater than score"""
+        with self._lock:
+            board = self._boards.get(mode)
+            if board is None:
+                return 0
+            # (-score,) sorts before every key carrying that score
+            return board.bisect_left((-score,))
+
+    def rank(self, mode: Optional[str], score: int) -> int:
+        """Rank a score of this value would get (1-based)"""
+        return self.count_higher(mode, score) + 1
+
+    def top(self, mode: Optional[str], limit: int, offset: int = 0) -> List[ScoreRecord]:
+        """Score records at ranks offset+1 .. offset+limit"""
+        with self._lock:
+            board = self._boards.get(mode)
+            if board is None or limit <= 0:
+                return []
+            return [value for _, value in board.slice(offset, offset + limit)]
+
+    def after(self, mode: Optional[str], key: tuple, limit: int) -> Tuple[int, List[ScoreRecord]]:
+        """Zero-based position and records of the entries sorting after key"""
+        with self._lock:
+            board = self._boards.get(mode)
+            if board is None or limit <= 0:
+                return 0, []
+            start = board.bisect_right(key)
+            return start, [value for _, value in board.slice(start, start + limit)]
+
+    def around(self, mode: Optional[str], key: tuple, count: int) -> Tuple[int, List[ScoreRecord]]:
+        """Zero-based position and records of up to count entries either side of key, inclusive"""
+        with self._lock:
+            board = self._boards.get(mode)
+            if board is None:
+                return 0, []
+            start = max(board.bisect_left(key) - count, 0)
+            return start, [value for _, value in board.slice(start, board.bisect_right(key) + count)]
+
+
+
+# Process-wide index shared by every Database instance
+leaderboard_index = LeaderboardIndex()
@@ -0,0 +1,246 @@
+"""
+Deterministic replay verification of submitted scores.
+
+A submission carrying a replay (engine seed plus the direction in effect at
+each tick where it changed) is re-simulated with app.engine before the score
+is stored. Pending replays are collected into batches and each batch runs
+as one vectorized BatchEngine call inside a worker process, so neither the
+event loop nor a burst of submits is held up by simulation. Accepted scores
+go through Database.add_score; verdicts are kept for polling. At most
+REPLAY_QUEUE_DEPTH replays wait for a batch; beyond that submits are
+refused with VerifierBusy instead of queueing without bound.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal, run_db
+from .db import get_db_instance
+from .directions import DIRECTION_CODES
+
+# Replays gathered per batch, and how long to wait for a batch to fill
+BATCH_SIZE = int(os.getenv("REPLAY_BATCH_SIZE", "64"))
+BATCH_DELAY = float(os.getenv("REPLAY_BATCH_DELAY_MS", "20")) / 1000
+WORKERS = int(os.getenv("REPLAY_WORKERS", str(os.cpu_count() or 1)))
+QUEUE_DEPTH = int(os.getenv("REPLAY_QUEUE_DEPTH", "1024"))
+MAX_VERDICTS = 10000
+
+logger = logging.getLogger(__name__)
+
+
+def verify_replays(jobs: List[dict]) -> List[Tuple[bool, Optional[str]]]:
+    """Re-simulate a batch of replays; returns (accepted, reason) per job.
+
+    Each job holds the submitted score, mode and duration (seconds) plus the
+    replay fields seed, gridSize, ticks and moves.
+    """
+    # Only the worker processes simulate, so the server never imports NumPy for this
+    import numpy as np
+    from .engine import BatchEngine
+
+    verdicts: List[Tuple[bool, Optional[str]]] = [(False, "not simulated")] * len(jobs)
+    by_grid: Dict[int, List[int]] = {}
+    for i, job in enumerate(jobs):
+        by_grid.setdefault(job["gridSize"], []).append(i)
+
+    for grid_size, indices in by_grid.items():
+        group = [jobs[i] for i in indices]
+        engine = BatchEngine(
+            len(group),
+            grid_size=grid_size,
+            modes=[job["mode"] for job in group],
+            seeds=[job["seed"] for job in group],
+        )
+        # Direction changes scheduled per tick, at most one per game
+        schedule: Dict[int, Tuple[List[int], List[int]]] = {}
+        for row, job in enumerate(group):
+            for tick, direction in job["moves"]:
+                rows, dirs = schedule.setdefault(tick, ([], []))
+                rows.append(row)
+                dirs.append(DIRECTION_CODES[direction])
+
+        claimed_ticks = np.array([job["ticks"] for job in group])
+        died_at = np.zeros(len(group), dtype=np.int64)
+        elapsed_ms = np.zeros(len(group), dtype=np.int64)
+        for tick in range(int(claimed_ticks.max())):
+            if tick in schedule:
+                rows, dirs = schedule[tick]
+                engine.set_directions(np.array(rows), np.array(dirs))
+            # Games whose claimed length is over stop here even if still alive
+            engine.alive &= claimed_ticks > tick
+            playing = engine.alive.copy()
+            if not playing.any():
+                break
+            elapsed_ms[playing] += engine.speed[playing]
+            engine.step()
+            died_at[playing & ~engine.alive] = tick + 1
+
+        for row, job in enumerate(group):
+            if died_at[row] != job["ticks"]:
+                reason = "replay does not end the game at the claimed tick"
+            elif int(engine.score[row]) != job["score"]:
+                reason = f"replay scores {int(engine.score[row])}, not {job['score']}"
+            elif (job["duration"] + 1) * 1000 < elapsed_ms[row]:
+                reason = "duration is shorter than the replayed game"
+            else:
+                reason = None
+            verdicts[indices[row]] = (reason is None, reason)
+    return verdicts
+
+
+class VerifierBusy(Exception):
+    """Raised when too many replays are waiting for verification"""
+
+
+class Verdict:
+    __slots__ = ("id", "user_id", "status", "reason", "rank", "isHighScore")
+
+    def __init__(self, verdict_id: str, user_id: str):
+        self.id = verdict_id
+        self.user_id = user_id
+        self.status = "pending"
+        self.reason: Optional[str] = None
+        self.rank: Optional[int] = None
+        self.isHighScore = False
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "reason": self.reason,
+            "rank": self.rank,
+            "isHighScore": self.isHighScore,
+        }
+
+
+class ReplayVerifier:
+    """Batches pending replays onto a process pool and records verdicts"""
+
+    def __init__(
+        self,
+        workers: int = WORKERS,
+        batch_size: int = BATCH_SIZE,
+        batch_delay: float = BATCH_DELAY,
+        max_queue: int = QUEUE_DEPTH,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.max_queue = max_queue
+        self.session_factory = session_factory
+        self._verdicts: "OrderedDict[str, Verdict]" = OrderedDict()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        self._tasks = set()
+        self.batches = 0
+        self.rejected = 0
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._collector is not None and not self._collector.done():
+            return
+        if self._pool is None:
+            # Spawned, not forked: the server process is multi-threaded
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._in_flight = asyncio.Semaphore(self.workers * 2)
+        self._collector = loop.create_task(self._collect())
+
+    def submit(self, user_id: str, score: int, mode: str, duration: int, replay: dict) -> Verdict:
+        """Queue a replay for verification and return its pending verdict"""
+        self._ensure_started()
+        if self._queue.full():
+            self.rejected += 1
+            raise VerifierBusy("Too many replays waiting for verification")
+        verdict = Verdict(str(uuid.uuid4()), user_id)
+        self._verdicts[verdict.id] = verdict
+        while len(self._verdicts) > MAX_VERDICTS:
+            self._verdicts.popitem(last=False)
+        job = {"score": score, "mode": mode, "duration": duration, **replay}
+        self._queue.put_nowait((verdict, job))
+        return verdict
+
+    def get(self, verdict_id: str) -> Optional[Verdict]:
+        return self._verdicts.get(verdict_id)
+
+    async def _collect(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.batch_delay
+            while len(batch) < self.batch_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._in_flight.acquire()
+            task = self._loop.create_task(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Verdict, dict]]):
+        try:
+            self.batches += 1
+            try:
+                results = await self._loop.run_in_executor(
+                    self._pool, verify_replays, [job for _, job in batch]
+                )
+            except Exception as exc:
+                results = [(False, f"verification failed: {exc}")] * len(batch)
+            for (verdict, job), (accepted, reason) in zip(batch, results):
+                if accepted:
+                    try:
+                        await run_db(self._record, verdict, job)
+                    except Exception as exc:
+                        # Anything left pending here would be polled forever
+                        logger.exception("recording verified replay %s failed", verdict.id)
+                        verdict.status = "rejected"
+                        verdict.reason = f"could not record score: {exc}"
+                else:
+                    verdict.status = "rejected"
+                    verdict.reason = reason
+        finally:
+            self._in_flight.release()
+
+    def _record(self, verdict: Verdict, job: dict):
+        session = self.session_factory()
+        try:
+            result = get_db_instance(session).add_score(verdict.user_id, job["score"], job["mode"])
+        except ValueError as exc:
+            verdict.status = "rejected"
+            verdict.reason = str(exc)
+            return
+        finally:
+            session.close()
+        verdict.rank = result["rank"]
+        verdict.isHighScore = result["isHighScore"]
+        verdict.status = "accepted"
+
+    async def stop(self):
+        """Cancel the collector and shut the worker pool down"""
+        if self._collector is not None:
+            self._collector.cancel()
+            self._collector = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# Process-wide verifier used by the leaderboard router
+replay_verifier = ReplayVerifier()
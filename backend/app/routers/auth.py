@@ -2,9 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from ..models import UserCreate, UserLogin, AuthResponse, Error, User
-from ..database import get_db
+from ..database import get_db, run_db
 from ..db import get_db_instance
 from ..dependencies import create_access_token, get_current_user
+from ..hashing import password_hasher, HasherBusy
 
 router = APIRouter(
     prefix="/auth",
@@ -12,24 +13,49 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-@router.post("/signup", response_model=AuthResponse, status_code=201, responses={400: {"model": Error}})
+def busy_response() -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"error": "Too many authentication requests, try again shortly"},
+        headers={"Retry-After": "1"}
+    )
+
+def already_registered() -> JSONResponse:
+    return JSONResponse(
+        status_code=400,
+        content={"error": "Email or username already registered"}
+    )
+
+@router.post("/signup", response_model=AuthResponse, status_code=201, responses={400: {"model": Error}, 503: {"model": Error}})
 async def signup(user: UserCreate, session: Session = Depends(get_db)):
     db = get_db_instance(session)
-    db_user = db.create_user(user)
+    # Refuse known emails before spending a hashing slot on them
+    if await run_db(db.get_user_by_email, user.email) is not None:
+        return already_registered()
+    try:
+        hashed_password = await password_hasher.hash(user.password)
+    except HasherBusy:
+        return busy_response()
+    
+    # create_user checks again, for a concurrent signup with the same email
+    db_user = await run_db(db.create_user, user, hashed_password=hashed_password)
     if not db_user:
-        return JSONResponse(
-            status_code=400,
-            content={"error": "Email or username already registered"}
-        )
+        return already_registered()
     
     access_token = create_access_token(data={"sub": user.email})
     return {"user": db_user, "token": access_token}
 
-@router.post("/login", response_model=AuthResponse, responses={401: {"model": Error}})
+@router.post("/login", response_model=AuthResponse, responses={401: {"model": Error}, 503: {"model": Error}})
 async def login(user_in: UserLogin, session: Session = Depends(get_db)):
     db = get_db_instance(session)
-    user_dict = db.get_user_by_email(user_in.email)
-    if not user_dict or not db.verify_password(user_in.password, user_dict["hashed_password"]):
+    user_dict = await run_db(db.get_user_by_email, user_in.email)
+    try:
+        valid = user_dict is not None and await password_hasher.verify(
+            user_in.password, user_dict["hashed_password"]
+        )
+    except HasherBusy:
+        return busy_response()
+    if not valid:
          return JSONResponse(
             status_code=401,
             content={"error": "Invalid email or password"}
@@ -0,0 +1,32 @@
+import hmac
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from typing import List, Optional
+from ..profiler import SQL_PROFILE_TOKEN, sql_profiler
+
+LOOPBACK = ("127.0.0.1", "::1")
+
+def require_debug_access(request: Request, x_debug_token: Optional[str] = Header(None)):
+    """
+    The profiles hold statements and timings of every user's requests: require
+    SQL_PROFILE_TOKEN when one is configured, otherwise a direct loopback client.
+    """
+    if SQL_PROFILE_TOKEN:
+        if x_debug_token is None or not hmac.compare_digest(x_debug_token.encode(), SQL_PROFILE_TOKEN.encode()):
+            raise HTTPException(status_code=403, detail="Debug token required")
+        return
+    # A proxy on the same host would make every client look local
+    forwarded = "x-forwarded-for" in request.headers or "forwarded" in request.headers
+    if request.client is None or request.client.host not in LOOPBACK or forwarded:
+        raise HTTPException(status_code=403, detail="Debug endpoints are only served to localhost")
+
+# Only included when SQL_PROFILE=1
+router = APIRouter(
+    prefix="/debug",
+    tags=["Debug"],
+    dependencies=[Depends(require_debug_access)],
+)
+
+@router.get("/sql")
+async def get_sql_profiles() -> List[dict]:
+    """Recent per-request SQL profiles, newest first"""
+    return sql_profiler.recent()
@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from typing import List, Optional, Literal
 from sqlalchemy.orm import Session
-from ..models import LeaderboardEntry, ScoreSubmit, ScoreResponse, User
-from ..database import get_db
+from ..models import LeaderboardEntry, LeaderboardPage, ScoreSubmit, ScoreResponse, User, VerificationStatus
+from ..database import get_db, get_read_db, run_db
 from ..db import get_db_instance
 from ..dependencies import get_current_user
+from ..cache import etag_matches, render_leaderboard
+from ..pagination import MAX_PAGE_SIZE, encode_cursor, decode_cursor
+from ..replay import replay_verifier, VerifierBusy
+from ..ingest import score_ingestor, IngestQueueFull
+from ..serialization import encode_leaderboard, encode_leaderboard_page, json_response
 
 router = APIRouter(
     prefix="/leaderboard",
@@ -13,19 +18,89 @@ router = APIRouter(
 
 @router.get("", response_model=List[LeaderboardEntry])
 async def get_leaderboard(
+    request: Request,
     mode: Optional[Literal["pass-through", "walls"]] = None,
-    limit: int = 10,
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    scope: Literal["all", "best"] = Query("all", description="'best' ranks each user's best score per mode"),
+    window: Literal["all", "daily", "weekly"] = Query("all", description="Scores set today or this ISO week (UTC)"),
+    session: Session = Depends(get_read_db)
+):
+    if window != "all" and scope == "best":
+        raise HTTPException(status_code=400, detail="Windowed leaderboards rank individual scores")
+    
+    cached = await render_leaderboard(session, mode, limit, scope, window)
+    
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return json_response(cached.body, headers=headers)
+
+@router.get("/page", response_model=LeaderboardPage)
+async def get_leaderboard_page(
+    mode: Optional[Literal["pass-through", "walls"]] = None,
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="nextCursor of the previous page"),
+    session: Session = Depends(get_read_db)
+):
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    db = get_db_instance(session)
+    records, first_rank = await run_db(db.leaderboard_page_records, mode=mode, limit=limit, cursor=after)
+    next_cursor = None
+    if len(records) == limit:
+        score_id, _, score, _, date = records[-1]
+        next_cursor = encode_cursor(first_rank + limit - 1, score, date, score_id)
+    return json_response(encode_leaderboard_page(records, first_rank, next_cursor))
+
+@router.get("/around-me", response_model=List[LeaderboardEntry])
+async def get_leaderboard_around_me(
+    mode: Optional[Literal["pass-through", "walls"]] = None,
+    count: int = Query(5, ge=0, le=MAX_PAGE_SIZE // 2, description="Entries above and below"),
+    current_user: User = Depends(get_current_user),
     session: Session = Depends(get_db)
 ):
     db = get_db_instance(session)
-    return db.get_leaderboard(mode=mode, limit=limit)
+    board = await run_db(db.leaderboard_around_records, current_user.id, mode=mode, count=count)
+    if board is None:
+        raise HTTPException(status_code=404, detail="No score recorded")
+    return json_response(encode_leaderboard(*board))
 
-@router.post("/submit", response_model=ScoreResponse)
+@router.post("/submit", response_model=ScoreResponse, responses={202: {"model": ScoreResponse}})
 async def submit_score(
     score_data: ScoreSubmit,
+    response: Response,
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_db)
 ):
+    if score_data.replay is not None:
+        # Stored only once the replay checks out; poll /verifications/{id}
+        try:
+            verdict = replay_verifier.submit(
+                current_user.id, score_data.score, score_data.mode,
+                score_data.duration, score_data.replay.model_dump()
+            )
+        except VerifierBusy:
+            raise HTTPException(status_code=503, detail="Too many replays awaiting verification", headers={"Retry-After": "1"})
+        response.status_code = 202
+        return {"rank": None, "isHighScore": False, "verificationId": verdict.id, "status": verdict.status}
+    
+    if score_ingestor.enabled:
+        # Group commit: wait for the batch this submission lands in
+        try:
+            return await score_ingestor.submit(current_user.id, score_data.score, score_data.mode)
+        except IngestQueueFull:
+            raise HTTPException(status_code=503, detail="Too many score submissions", headers={"Retry-After": "1"})
+    
     db = get_db_instance(session)
-    result = db.add_score(current_user.id, score_data.score, score_data.mode)
+    result = await run_db(db.add_score, current_user.id, score_data.score, score_data.mode)
     return result
+
+@router.get("/verifications/{verificationId}", response_model=VerificationStatus)
+async def get_verification(verificationId: str, current_user: User = Depends(get_current_user)):
+    verdict = replay_verifier.get(verificationId)
+    if verdict is None or verdict.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Verification not found")
+    return verdict.as_dict()
@@ -1,22 +1,124 @@
-from fastapi import APIRouter, Depends
-from typing import List
+import json
+import struct
+from fastapi import APIRouter, Depends, Header, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
 from sqlalchemy.orm import Session
-from ..models import ActivePlayer, WatchResponse
-from ..database import get_db
-from ..db import get_db_instance
+from ..models import ActivePlayer, Heartbeat, User, WatchResponse
+from ..database import get_db, run_db
+from ..dependencies import get_current_user, get_user_from_token
+from ..spectator import spectator_hub
+from ..framecodec import FrameEncoder
+from ..presence import presence_registry
+from ..livefeed import presence_feed
+from ..serialization import json_response
 
 router = APIRouter(
     prefix="/live",
     tags=["Live"],
 )
 
+# Frames larger than this are rejected rather than fanned out
+MAX_FRAME_BYTES = 64 * 1024
+
 @router.get("/players", response_model=List[ActivePlayer])
-async def get_active_players(session: Session = Depends(get_db)):
-    db = get_db_instance(session)
-    return db.get_active_players()
+async def get_active_players():
+    return json_response(presence_registry.snapshot_json())
+
+@router.get("/players/stream")
+async def stream_active_players(
+    lastEventId: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None),
+):
+    """Server-Sent Events: a snapshot of the live players, then join/score/leave diffs"""
+    # EventSource resends the last id as a header; the query parameter is for manual resumes
+    return StreamingResponse(
+        presence_feed.stream(last_event_id or lastEventId),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/heartbeat", response_model=ActivePlayer)
+async def heartbeat(beat: Heartbeat, current_user: User = Depends(get_current_user)):
+    """Called by a running game every few seconds; stops being live after PRESENCE_TTL"""
+    return presence_registry.heartbeat(current_user.id, current_user.username, beat.mode, beat.score)
+
+@router.delete("/heartbeat", status_code=204)
+async def leave(current_user: User = Depends(get_current_user)):
+    presence_registry.leave(current_user.id)
+    return Response(status_code=204)
 
 @router.post("/watch/{playerId}", response_model=WatchResponse)
-async def watch_player(playerId: str, session: Session = Depends(get_db)):
-    db = get_db_instance(session)
-    success = db.watch_player(playerId)
-    return {"success": success}
+async def watch_player(playerId: str):
+    live = spectator_hub.is_live(playerId) or presence_registry.is_live(playerId)
+    return {"success": live}
+
+@router.websocket("/ws/play")
+async def publish_game(
+    websocket: WebSocket,
+    token: str,
+    encoding: Literal["raw", "binary"] = "raw",
+    session: Session = Depends(get_db)
+):
+    """Player side: every message received is a game frame for the player's spectators.
+
+    With encoding=binary the player sends GameState JSON and spectators get
+    app.framecodec keyframes and deltas instead.
+    """
+    user = await run_db(get_user_from_token, token, session)
+    # Release the pooled connection; the socket may stay open for a whole game
+    await run_db(session.close)
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    encoder = FrameEncoder() if encoding == "binary" else None
+    if not spectator_hub.open(user.id, snapshot=encoder.keyframe if encoder else None):
+        # The player is already publishing from another socket
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Already publishing")
+        return
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            frame = message.get("text")
+            if frame is None:
+                frame = message.get("bytes")
+            if frame is None or len(frame) > MAX_FRAME_BYTES:
+                await websocket.close(code=status.WS_1009_MESSAGE_TOO_BIG)
+                break
+            if encoder is not None:
+                try:
+                    frame = encoder.encode(json.loads(frame))
+                except (ValueError, KeyError, TypeError, struct.error):
+                    await websocket.close(code=status.WS_1007_INVALID_FRAME_PAYLOAD_DATA)
+                    break
+            spectator_hub.publish(user.id, frame)
+    finally:
+        spectator_hub.close(user.id)
+
+@router.websocket("/ws/watch/{playerId}")
+async def watch_game(websocket: WebSocket, playerId: str):
+    """Spectator side: streams the player's frames until they stop publishing"""
+    await websocket.accept()
+    if not spectator_hub.is_live(playerId):
+        await websocket.close(code=4404)
+        return
+    
+    subscriber = spectator_hub.subscribe(playerId)
+    try:
+        while True:
+            frame = await subscriber.get()
+            if frame is None:
+                break
+            if isinstance(frame, bytes):
+                await websocket.send_bytes(frame)
+            else:
+                await websocket.send_text(frame)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        spectator_hub.unsubscribe(playerId, subscriber)
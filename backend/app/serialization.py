@@ -0,0 +1,76 @@
+"""
+Fast JSON encoding for the list endpoints.
+
+Declaring response_model=List[LeaderboardEntry] and returning models makes
+FastAPI validate every entry again and turn it into Python dicts before
+encoding, on top of the validation done when the models were built.
+Leaderboard and live-player rows come from our own database or in-memory
+structures, so the list endpoints skip models altogether: records are
+turned into plain dicts and encoded to JSON bytes in one call by a
+serializer compiled once from the TypedDicts below (pydantic-core, so the
+output matches what the models produce). The routes keep response_model
+for the OpenAPI schema and return a Response with the bytes, which FastAPI
+passes through untouched.
+
+The TypedDicts mirror app.models.LeaderboardEntry, LeaderboardPage and
+ActivePlayer field for field; tests check they encode identically.
+"""
+from datetime import datetime
+from typing import Iterable, List, Literal, Optional, TypedDict
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from .ranking import ScoreRecord
+
+
+class LeaderboardRow(TypedDict):
+    id: str
+    username: str
+    score: int
+    mode: Literal["pass-through", "walls"]
+    date: datetime
+    rank: int
+
+
+class LeaderboardPageRow(TypedDict):
+    entries: List[LeaderboardRow]
+    nextCursor: Optional[str]
+
+
+class ActivePlayerRow(TypedDict):
+    id: str
+    username: str
+    currentScore: int
+    mode: Literal["pass-through", "walls"]
+    isLive: bool
+    startedAt: datetime
+
+
+# Compiled once; dump_json validates nothing and writes bytes directly
+leaderboard_json = TypeAdapter(List[LeaderboardRow])
+leaderboard_page_json = TypeAdapter(LeaderboardPageRow)
+active_players_json = TypeAdapter(List[ActivePlayerRow])
+
+
+def leaderboard_rows(records: Iterable[ScoreRecord], first_rank: int) -> List[LeaderboardRow]:
+    """Rows for consecutive (id, username, score, mode, date) records"""
+    return [
+        {"id": score_id, "username": username, "score": score, "mode": mode, "date": date, "rank": rank}
+        for rank, (score_id, username, score, mode, date) in enumerate(records, first_rank)
+    ]
+
+
+def encode_leaderboard(records: Iterable[ScoreRecord], first_rank: int) -> bytes:
+    return leaderboard_json.dump_json(leaderboard_rows(records, first_rank))
+
+
+def encode_leaderboard_page(records: Iterable[ScoreRecord], first_rank: int, next_cursor: Optional[str]) -> bytes:
+    return leaderboard_page_json.dump_json(
+        {"entries": leaderboard_rows(records, first_rank), "nextCursor": next_cursor}
+    )
+
+
+def json_response(body: bytes, headers: Optional[dict] = None) -> Response:
+    """Response for a body that is already JSON"""
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,151 @@
+"""
+Spectator streaming hub.
+
+A player publishes game frames on a channel keyed by their user id and any
+number of spectators subscribe to it. Each frame is encoded once by the
+publisher and the same object is handed to every subscriber. Subscribers
+own a bounded queue: when a viewer falls behind, the oldest frames are
+dropped, so a slow socket can neither stall the broadcaster nor grow memory
+without bound. On a channel of binary deltas a dropped frame would leave
+the following deltas undecodable until the next scheduled keyframe, so an
+overflowing queue is replaced by one keyframe of the current state instead.
+"""
+import asyncio
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Set, Union
+
+Frame = Union[str, bytes]
+
+# Frames a subscriber may lag behind before the oldest ones are dropped
+DEFAULT_QUEUE_SIZE = 8
+
+
+class Subscriber:
+    """One spectator's bounded frame queue"""
+
+    def __init__(self, max_queue: int = DEFAULT_QUEUE_SIZE,
+                 resync: Optional[Callable[[], Optional[Frame]]] = None):
+        self._frames: Deque[Frame] = deque(maxlen=max_queue)
+        # Keyframe of the channel's current state, when its frames are deltas
+        self.resync = resync
+        self._ready = asyncio.Event()
+        self.closed = False
+        self.dropped = 0
+
+    def offer(self, frame: Frame):
+        """Queue a frame without blocking, dropping the oldest one when full"""
+        if self.closed:
+            return
+        if len(self._frames) == self._frames.maxlen:
+            keyframe = self.resync() if self.resync is not None else None
+            if keyframe is not None:
+                # The keyframe already holds the state of this frame
+                self.dropped += len(self._frames)
+                self._frames.clear()
+                frame = keyframe
+            else:
+                self.dropped += 1
+        self._frames.append(frame)
+        self._ready.set()
+
+    def close(self):
+        """Wake the reader and stop after the queued frames"""
+        self.closed = True
+        self._ready.set()
+
+    async def get(self) -> Optional[Frame]:
+        """Next frame, or None once the channel has closed and the queue is drained"""
+        while not self._frames:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        return self._frames.popleft()
+
+
+class Channel:
+    """Frames of one player's game"""
+
+    def __init__(self):
+        self.subscribers: Set[Subscriber] = set()
+        self.last_frame: Optional[Frame] = None
+        # Builds the starting frame for late joiners when frames are deltas
+        self.snapshot: Optional[Callable[[], Optional[Frame]]] = None
+        self.live = False
+
+    def keyframe(self) -> Optional[Frame]:
+        return self.snapshot() if self.snapshot is not None else None
+
+
+class SpectatorHub:
+    """Routes published frames to the subscribers of each player's channel"""
+
+    def __init__(self, max_queue: int = DEFAULT_QUEUE_SIZE):
+        self.max_queue = max_queue
+        self._channels: Dict[str, Channel] = {}
+
+    def _channel(self, player_id: str) -> Channel:
+        channel = self._channels.get(player_id)
+        if channel is None:
+            channel = self._channels[player_id] = Channel()
+        return channel
+
+    def is_live(self, player_id: str) -> bool:
+        """Whether the player currently has a publisher connected"""
+        channel = self._channels.get(player_id)
+        return channel is not None and channel.live
+
+    def viewer_count(self, player_id: str) -> int:
+        channel = self._channels.get(player_id)
+        return len(channel.subscribers) if channel else 0
+
+    def open(self, player_id: str, snapshot: Optional[Callable[[], Optional[Frame]]] = None) -> bool:
+        """Register a publisher; snapshot replaces the latest frame as a new viewer's first.
+
+        Returns False when the player already has a publisher: a channel has
+        exactly one, so that publisher's disconnect cannot end another's stream.
+        """
+        channel = self._channel(player_id)
+        if channel.live:
+            return False
+        channel.live = True
+        channel.last_frame = None
+        channel.snapshot = snapshot
+        return True
+
+    def publish(self, player_id: str, frame: Frame):
+        """Fan a frame out to every subscriber of the player"""
+        channel = self._channel(player_id)
+        channel.last_frame = frame
+        for subscriber in channel.subscribers:
+            subscriber.offer(frame)
+
+    def close(self, player_id: str):
+        """Publisher went away: end every subscription"""
+        channel = self._channels.pop(player_id, None)
+        if channel is None:
+            return
+        for subscriber in channel.subscribers:
+            subscriber.close()
+
+    def subscribe(self, player_id: str) -> Subscriber:
+        """Subscribe to a player, starting from the latest frame if any"""
+        channel = self._channel(player_id)
+        subscriber = Subscriber(self.max_queue, resync=channel.keyframe)
+        first = channel.snapshot() if channel.snapshot is not None else channel.last_frame
+        if first is not None:
+            subscriber.offer(first)
+        channel.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, player_id: str, subscriber: Subscriber):
+        channel = self._channels.get(player_id)
+        if channel is None:
+            return
+        channel.subscribers.discard(subscriber)
+        if not channel.subscribers and not channel.live:
+            del self._channels[player_id]
+
+
+# Process-wide hub used by the live router
+spectator_hub = SpectatorHub()
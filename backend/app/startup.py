@@ -0,0 +1,125 @@
+"""
+Fast startup: boot-phase profile and warm-up hooks.
+
+With FAST_STARTUP=1 (the default) the lifespan
+* skips create_all when the schema fingerprint stored by the last boot
+  matches the models (see database.init_db);
+* warms up before the app reports ready: opens WARM_CONNECTIONS pooled
+  connections, runs every prebuilt read statement once so it is compiled
+  and cached, renders the default leaderboards into the response cache,
+  and starts the password hashing workers.
+
+Heavy imports (NumPy for the replay engine, passlib) are deferred to first
+use in their modules, so they cost nothing at boot.
+
+Every phase is timed into boot_profile, which is exported with the other
+metrics and, with STARTUP_PROFILE=1, logged at INFO once the app is
+ready. benchmarks/startup.py adds an import-time breakdown.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from . import queries
+from .cache import render_leaderboard
+from .database import DB_POOL_SIZE
+from .hashing import password_hasher
+
+FAST_STARTUP = os.getenv("FAST_STARTUP", "1") == "1"
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "0") == "1"
+WARM_CONNECTIONS = int(os.getenv("WARM_CONNECTIONS", str(DB_POOL_SIZE)))
+
+# Leaderboards rendered into the cache at boot: every mode at the default size
+WARM_BOARDS = (None, "pass-through", "walls")
+WARM_LIMIT = 10
+
+logger = logging.getLogger(__name__)
+
+
+class BootProfile:
+    """Wall time of each startup phase, in order"""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    def record(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def stats(self) -> dict:
+        return {
+            **{f"{name}_seconds": round(seconds, 6) for name, seconds in self.phases.items()},
+            "total_seconds": round(sum(self.phases.values()), 6),
+        }
+
+    def report(self) -> str:
+        total = sum(self.phases.values()) or 1.0
+        lines = ["boot profile:"]
+        for name, seconds in self.phases.items():
+            lines.append(f"  {name:<18} {seconds * 1000:9.1f} ms  {seconds / total:6.1%}")
+        lines.append(f"  {'total':<18} {total * 1000:9.1f} ms")
+        return "\n".join(lines)
+
+    def log_report(self):
+        logger.info("%s", self.report())
+
+
+def warm_pool(db_engine: Engine, connections: int = WARM_CONNECTIONS) -> int:
+    """Open up to connections pooled connections at once and return them to the pool"""
+    size = getattr(db_engine.pool, "size", None)
+    if size is not None:
+        connections = min(connections, size())
+    opened: List = []
+    try:
+        for _ in range(max(connections, 1)):
+            connection = db_engine.connect()
+            opened.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
+
+
+def warm_statements(db_engine: Engine):
+    """Execute each prebuilt read once, so its compiled form is cached"""
+    params = {"email": "", "user_id": "", "mode": "walls", "limit": 0}
+    with db_engine.connect() as connection:
+        for statement in (
+            queries.user_by_email, queries.user_by_id,
+            *queries.top_scores.values(), *queries.top_best_scores.values(),
+        ):
+            connection.execute(statement, params).all()
+
+
+async def warm_up(session: Session, engines: List[Engine], profile: Optional[BootProfile] = None):
+    """Pool, compiled statements, leaderboard cache and hashing workers"""
+    profile = profile or boot_profile
+    with profile.phase("warm_pool"):
+        for db_engine in engines:
+            warm_pool(db_engine)
+    with profile.phase("warm_statements"):
+        for db_engine in engines:
+            warm_statements(db_engine)
+    with profile.phase("warm_leaderboards"):
+        for mode in WARM_BOARDS:
+            await render_leaderboard(session, mode, WARM_LIMIT)
+    with profile.phase("warm_hasher"):
+        await password_hasher.warm_up()
+
+
+# Process-wide profile filled in by main.py
+boot_profile = BootProfile()
@@ -0,0 +1,126 @@
+"""
+Daily and weekly leaderboards from per-day rollup buckets.
+
+Every score lands in the bucket of its UTC day, once under its mode and
+once under the combined (None) board. A bucket only keeps its top K
+entries, K being the largest page a leaderboard request may ask for, so
+the top of any window is a merge of at most seven short sorted lists.
+The daily board is the current UTC day and the weekly board runs from
+Monday of the current ISO week. Buckets older than the retention are
+dropped as the day rolls over. Like the ranked index, the buckets are
+loaded at startup and Database falls back to SQL while they are not.
+"""
+import bisect
+import heapq
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+from itertools import islice
+from typing import Dict, List, Literal, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .db_models import ScoreModel
+from .pagination import MAX_PAGE_SIZE
+from .ranking import ScoreRecord, normalize_date, score_key
+
+Window = Literal["daily", "weekly"]
+RETENTION_DAYS = 7
+
+
+def utc_today(now: Optional[datetime] = None) -> date:
+    return normalize_date(now or datetime.now(timezone.utc)).date()
+
+
+def window_start(window: Window, now: Optional[datetime] = None) -> date:
+    """First UTC day included in the window"""
+    today = utc_today(now)
+    if window == "daily":
+        return today
+    return today - timedelta(days=today.weekday())
+
+
+def window_start_datetime(window: Window, now: Optional[datetime] = None) -> datetime:
+    """Naive UTC start of the window, for SQL filters on ScoreModel.date"""
+    return datetime.combine(window_start(window, now), time.min)
+
+
+class WindowedLeaderboards:
+    """Top-K score lists per (UTC day, mode), merged per window on read"""
+
+    def __init__(self, top_k: int = MAX_PAGE_SIZE, retention_days: int = RETENTION_DAYS):
+        self.top_k = top_k
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._buckets: Dict[Tuple[date, Optional[str]], List[Tuple[tuple, ScoreRecord]]] = {}
+        self._today: Optional[date] = None
+        self.loaded = False
+
+    def reset(self):
+        """Drop all buckets and mark the boards as not loaded"""
+        with self._lock:
+            self._buckets = {}
+            self._today = None
+            self.loaded = False
+
+    def load(self, session: Session, now: Optional[datetime] = None):
+        """Fill the buckets from the scores still inside the retention"""
+        cutoff = datetime.combine(utc_today(now) - timedelta(days=self.retention_days - 1), time.min)
+        rows = session.query(
+            ScoreModel.id, ScoreModel.username, ScoreModel.score,
+            ScoreModel.mode, ScoreModel.date
+        ).filter(ScoreModel.date >= cutoff).yield_per(10000)
+        with self._lock:
+            self._buckets = {}
+            self._today = None
+            self._expire(utc_today(now))
+            for row in rows:
+                self._insert(*row)
+            self.loaded = True
+
+    def _expire(self, today: date):
+        if today == self._today:
+            return
+        self._today = today
+        cutoff = today - timedelta(days=self.retention_days - 1)
+        for key in [key for key in self._buckets if key[0] < cutoff]:
+            del self._buckets[key]
+
+    def _insert(self, score_id: str, username: str, score: int, mode: str, date: datetime):
+        date = normalize_date(date)
+        day = date.date()
+        if self._today is not None and day < self._today - timedelta(days=self.retention_days - 1):
+            return
+        key = score_key(score, date, score_id)
+        item = (key, (score_id, username, score, mode, date))
+        for board in (mode, None):
+            bucket = self._buckets.setdefault((day, board), [])
+            if len(bucket) >= self.top_k and item >= bucket[-1]:
+                continue
+            position = bisect.bisect_left(bucket, item)
+            # Keys are unique per score, so an equal key is this score already
+            if position < len(bucket) and bucket[position][0] == key:
+                continue
+            bucket.insert(position, item)
+            del bucket[self.top_k:]
+
+    def add(self, score_id: str, username: str, score: int, mode: str, date: datetime):
+        """Add a freshly committed score; adding one already held changes nothing"""
+        with self._lock:
+            self._expire(utc_today())
+            self._insert(score_id, username, score, mode, date)
+
+    def top(self, window: Window, mode: Optional[str], limit: int, now: Optional[datetime] = None) -> List[ScoreRecord]:
+        """Best score records of the window, merged from its day buckets"""
+        today = utc_today(now)
+        start = window_start(window, now)
+        with self._lock:
+            self._expire(today)
+            lists = [
+                self._buckets.get((start + timedelta(days=offset), mode), [])
+                for offset in range((today - start).days + 1)
+            ]
+            return [record for _, record in islice(heapq.merge(*lists), min(limit, self.top_k))]
+
+
+# Process-wide windowed boards shared by every Database instance
+window_boards = WindowedLeaderboards()
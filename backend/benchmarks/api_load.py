@@ -0,0 +1,212 @@
+"""
+Load test of the API's hot paths against a seeded database.
+
+Seeds a file-backed SQLite database with --users users and --scores
+scores using benchmarks.generate_data, loads the in-memory leaderboard
+structures the way startup does, then drives the ASGI app in-process
+with concurrent clients, one scenario at a time:
+
+    signup, login, leaderboard, leaderboard_page, around_me, submit,
+    heartbeat, live_players
+
+Each scenario reports throughput, p50/p95/p99 latency, errors and SQL
+statements per request (counted with an engine event). Pass --output to
+keep the JSON, and --baseline with an earlier output to add the relative
+change of every metric, so regressions show up between runs.
+
+    python -m benchmarks.api_load --users 10000 --scores 200000 --requests 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List
+
+os.environ.setdefault("TESTING", "1")
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import create_db_engine, get_db, get_read_db
+from app.dependencies import create_access_token
+from app.hashing import password_hasher
+from app.main import app
+from app.ranking import leaderboard_index
+from app.windows import window_boards
+from benchmarks.generate_data import generate, parser as generate_parser
+
+PASSWORD = "password123"
+MODES = ("pass-through", "walls")
+# Scenarios that hash passwords are capped so the suite stays quick
+AUTH_SCENARIOS = ("signup", "login")
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def seed(engine, session_factory, users: int, scores: int, seed_value: int):
+    generate(engine, generate_parser().parse_args([
+        "--users", str(users), "--scores", str(scores), "--active", "0",
+        "--prefix", "", "--password", PASSWORD, "--seed", str(seed_value), "--days", "30",
+    ]))
+    with session_factory() as session:
+        leaderboard_index.load(session)
+        window_boards.load(session)
+
+
+def setup(path: str, users: int, scores: int, seed_value: int):
+    # Same pool sizing and pragmas as the app's own engine, so the numbers carry over
+    engine = create_db_engine(f"sqlite:///{path}")
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    seed(engine, session_factory, users, scores, seed_value)
+
+    queries = [0]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(*_):
+        queries[0] += 1
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    return engine, queries
+
+
+def scenarios(users: int, run_id: str) -> Dict[str, Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]]:
+    tokens = [create_access_token({"sub": f"player{i}@example.com"}) for i in range(min(users, 1000))]
+
+    def auth(i):
+        return {"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+
+    return {
+        "signup": lambda client, i: client.post("/api/v1/auth/signup", json={
+            "username": f"new{i}", "email": f"new{i}-{run_id}@bench.example.com", "password": PASSWORD}),
+        "login": lambda client, i: client.post("/api/v1/auth/login", json={
+            "email": f"player{i % users}@example.com", "password": PASSWORD}),
+        "leaderboard": lambda client, i: client.get(
+            "/api/v1/leaderboard", params={"mode": MODES[i % 2], "limit": 10}),
+        "leaderboard_page": lambda client, i: client.get(
+            "/api/v1/leaderboard/page", params={"mode": MODES[i % 2], "limit": 50}),
+        "around_me": lambda client, i: client.get("/api/v1/leaderboard/around-me", headers=auth(i)),
+        "submit": lambda client, i: client.post("/api/v1/leaderboard/submit", headers=auth(i), json={
+            "score": (i * 37) % 5000, "mode": MODES[i % 2], "duration": 60}),
+        "heartbeat": lambda client, i: client.post("/api/v1/live/heartbeat", headers=auth(i), json={
+            "score": i % 500, "mode": MODES[i % 2]}),
+        "live_players": lambda client, i: client.get("/api/v1/live/players"),
+    }
+
+
+async def drive(client, call, requests: int, concurrency: int, queries: List[int]) -> dict:
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await call(client, i)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    queries_before = queries[0]
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "requests_per_second": round(requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "queries_per_request": round((queries[0] - queries_before) / requests, 2),
+    }
+
+
+async def run(args, queries: List[int]) -> Dict[str, dict]:
+    calls = scenarios(args.users, uuid.uuid4().hex[:8])
+    selected = args.scenarios or list(calls)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name in selected:
+            requests = min(args.requests, args.auth_requests) if name in AUTH_SCENARIOS else args.requests
+            results[name] = await drive(client, calls[name], requests, args.concurrency, queries)
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict]) -> Dict[str, dict]:
+    """Relative change of each metric against a baseline run (positive = larger now)"""
+    changes = {}
+    for name, metrics in results.items():
+        before = baseline.get(name, {})
+        changes[name] = {
+            key: round((value - before[key]) / before[key], 4)
+            for key, value in metrics.items()
+            if isinstance(value, (int, float)) and before.get(key)
+        }
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--scores", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--auth-requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--scenarios", nargs="+", help="Subset of scenarios to run, in order")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Also write the JSON result to this file")
+    parser.add_argument("--baseline", help="Earlier --output file to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        engine, queries = setup(os.path.join(tmp, "bench.db"), args.users, args.scores, args.seed)
+        seed_seconds = time.perf_counter() - started
+        try:
+            results = asyncio.run(run(args, queries))
+        finally:
+            app.dependency_overrides.clear()
+            leaderboard_index.reset()
+            window_boards.reset()
+            password_hasher.shutdown()
+            engine.dispose()
+
+    report = {
+        "benchmark": "api_load",
+        "users": args.users,
+        "scores": args.scores,
+        "concurrency": args.concurrency,
+        "seed_seconds": round(seed_seconds, 2),
+        "scenarios": results,
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["change_vs_baseline"] = compare(results, json.load(f)["scenarios"])
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Password hashing throughput: inline on the event loop vs. the process pool.
+
+Runs the same burst of pbkdf2 verifications both ways while a ticker
+coroutine measures how long the event loop is stalled, and reports
+verifications per second overall and per worker core.
+
+    python -m benchmarks.auth_throughput --requests 200 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from app.hashing import PasswordHasher, pwd_context
+
+
+async def _measure(label: str, verify_once, requests: int, concurrency: int, workers: int) -> dict:
+    hashed = pwd_context.hash("password123")
+    stop = asyncio.Event()
+    max_lag = 0.0
+
+    async def ticker():
+        nonlocal max_lag
+        interval = 0.005
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            max_lag = max(max_lag, time.perf_counter() - started - interval)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            assert await verify_once("password123", hashed)
+
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker_task
+
+    return {
+        "mode": label,
+        "requests": requests,
+        "workers": workers,
+        "verifications_per_second": round(requests / elapsed, 1),
+        "per_core": round(requests / elapsed / workers, 1),
+        "max_event_loop_stall_ms": round(max_lag * 1000, 1),
+    }
+
+
+async def run(requests: int, concurrency: int, workers: int) -> dict:
+    async def inline(password, hashed):
+        return pwd_context.verify(password, hashed)
+
+    hasher = PasswordHasher(workers=workers, max_pending=requests)
+    # Warm the pool so worker start-up is not counted
+    await asyncio.gather(*(hasher.hash("warmup") for _ in range(workers)))
+    try:
+        before = await _measure("inline", inline, requests, concurrency, 1)
+        after = await _measure("process_pool", hasher.verify, requests, concurrency, workers)
+    finally:
+        hasher.shutdown()
+    return {"benchmark": "auth_throughput", "before": before, "after": after}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests, args.concurrency, args.workers))))
+
+
+if __name__ == "__main__":
+    main()
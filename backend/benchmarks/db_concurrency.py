@@ -0,0 +1,133 @@
+"""
+Load test for the database access path of the async routers.
+
+Drives the ASGI app in-process with concurrent clients calling
+GET /auth/me (one user lookup per request) against a file-backed SQLite
+database. Every statement is delayed by --latency-ms to stand in for a
+network round trip to Postgres. Each concurrency level runs twice: with
+blocking calls inline on the event loop (DB_THREADS=0 behaviour) and on
+the bounded DB executor. The identity cache is disabled for the runs, so
+every request does its lookup in SQL instead of answering from memory.
+
+    python -m benchmarks.db_concurrency --requests 400 --latency-ms 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("TESTING", "1")
+
+import httpx
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import database
+from app.database import Base, get_db
+from app.db_models import UserModel
+from app.dependencies import create_access_token
+from app.hashing import pwd_context
+from app.identity import identity_cache
+from app.main import app
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def setup_database(path: str, users: int, latency_ms: float):
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False},
+        pool_size=database.DB_THREADS or 1,
+    )
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    hashed = pwd_context.hash("password123")
+    with session_factory() as session:
+        session.add_all(
+            UserModel(id=f"user-{i}", username=f"user{i}", email=f"user{i}@bench.example.com", hashed_password=hashed)
+            for i in range(users)
+        )
+        session.commit()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def simulate_round_trip(*_):
+        time.sleep(latency_ms / 1000)
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return engine
+
+
+async def drive(requests: int, concurrency: int, tokens) -> dict:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i):
+            headers = {"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get("/api/v1/auth/me", headers=headers)
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests_per_second": round(requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    executor = database._db_executor
+    cache_ttl = identity_cache.ttl
+    # With a zero TTL nothing is cached: each /auth/me is a user lookup
+    identity_cache.ttl = 0
+    identity_cache.clear()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = setup_database(os.path.join(tmp, "bench.db"), args.users, args.latency_ms)
+        tokens = [create_access_token({"sub": f"user{i}@bench.example.com"}) for i in range(args.users)]
+        results = {"benchmark": "db_concurrency", "latency_ms": args.latency_ms, "runs": []}
+        try:
+            for label, mode_executor in (("inline", None), ("executor", executor)):
+                database._db_executor = mode_executor
+                for concurrency in args.concurrency:
+                    run = asyncio.run(drive(args.requests, concurrency, tokens))
+                    results["runs"].append({"mode": label, **run, "identity_cache_hits": identity_cache.hits})
+                    identity_cache.clear()
+        finally:
+            database._db_executor = executor
+            identity_cache.ttl = cache_ttl
+            app.dependency_overrides.clear()
+            engine.dispose()
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Throughput benchmark for the batched snake engine.
+
+Steps a batch of games with random direction changes and reports game-ticks
+per second, restarting games as they end so the batch stays full.
+
+    python -m benchmarks.engine_throughput --games 10000 --ticks 200
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.engine import BatchEngine
+
+
+def run(games: int, ticks: int, grid_size: int, turn_rate: float, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    modes = rng.choice(["pass-through", "walls"], size=games)
+    engine = BatchEngine(games, grid_size=grid_size, modes=list(modes), seeds=range(seed, seed + games))
+
+    step_time = 0.0
+    for _ in range(ticks):
+        turning = np.flatnonzero(rng.random(games) < turn_rate)
+        engine.set_directions(turning, rng.integers(0, 4, size=turning.size))
+
+        started = time.perf_counter()
+        engine.step()
+        step_time += time.perf_counter() - started
+
+        finished = np.flatnonzero(~engine.alive)
+        if finished.size:
+            engine.reset(finished)
+
+    return {
+        "benchmark": "engine_throughput",
+        "games": games,
+        "ticks": ticks,
+        "grid_size": grid_size,
+        "step_seconds": round(step_time, 4),
+        "game_ticks_per_second": round(games * ticks / step_time),
+        "ms_per_batch_tick": round(step_time / ticks * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--grid-size", type=int, default=20)
+    parser.add_argument("--turn-rate", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    print(json.dumps(run(args.games, args.ticks, args.grid_size, args.turn_rate, args.seed)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Size and throughput benchmark for spectator frames: JSON vs app.framecodec.
+
+For each snake length a snake circles a Hamiltonian cycle of the grid,
+eating every few ticks, and each tick's GameState is encoded both as JSON
+and as a binary keyframe/delta frame. Reports average bytes per frame and
+encode/decode time per frame for each length.
+
+    python -m benchmarks.frame_codec --lengths 10 100 1000 --ticks 2000
+"""
+import argparse
+import json
+import time
+from typing import Iterator, List, Tuple
+
+from app.engine import DIRECTIONS
+from app.framecodec import FrameDecoder, FrameEncoder, step_direction
+
+
+def hamiltonian_cycle(grid_size: int) -> List[Tuple[int, int]]:
+    """Serpentine over columns 1.. and back up column 0 (grid_size must be even)"""
+    path = []
+    for y in range(grid_size):
+        xs = range(1, grid_size) if y % 2 == 0 else range(grid_size - 1, 0, -1)
+        path.extend((x, y) for x in xs)
+    path.extend((0, y) for y in range(grid_size - 1, -1, -1))
+    return path
+
+
+def states(length: int, ticks: int, grid_size: int, eat_every: int) -> Iterator[dict]:
+    cycle = hamiltonian_cycle(grid_size)
+    n = len(cycle)
+    head = length - 1
+    score = 0
+    for tick in range(ticks):
+        head += 1
+        if eat_every and tick % eat_every == 0 and length < n - 1:
+            length += 1
+            score += 10
+        food = cycle[(head + eat_every) % n]
+        yield {
+            "snake": [{"x": x, "y": y} for x, y in (cycle[(head - i) % n] for i in range(length))],
+            "food": {"x": food[0], "y": food[1]},
+            "direction": DIRECTIONS[step_direction(cycle[(head - 1) % n], cycle[head % n], grid_size)],
+            "nextDirection": "RIGHT",
+            "score": score,
+            "mode": "pass-through",
+            "status": "playing",
+            "gridSize": grid_size,
+            "speed": 150,
+        }
+
+
+def run_length(length: int, ticks: int, grid_size: int, eat_every: int) -> dict:
+    frames = list(states(length, ticks, grid_size, eat_every))
+
+    started = time.perf_counter()
+    json_frames = [json.dumps(state, separators=(",", ":")).encode() for state in frames]
+    json_encode = time.perf_counter() - started
+
+    encoder = FrameEncoder()
+    started = time.perf_counter()
+    binary_frames = [encoder.encode(state) for state in frames]
+    binary_encode = time.perf_counter() - started
+
+    decoder = FrameDecoder()
+    started = time.perf_counter()
+    for frame in binary_frames:
+        decoder.apply(frame)
+    binary_decode = time.perf_counter() - started
+    assert decoder.state() == frames[-1]
+
+    return {
+        "length": length,
+        "json_bytes_per_frame": round(sum(map(len, json_frames)) / ticks, 1),
+        "binary_bytes_per_frame": round(sum(map(len, binary_frames)) / ticks, 1),
+        "keyframes": encoder.keyframes,
+        "json_encode_us": round(json_encode / ticks * 1e6, 2),
+        "binary_encode_us": round(binary_encode / ticks * 1e6, 2),
+        "binary_decode_us": round(binary_decode / ticks * 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--ticks", type=int, default=2000)
+    parser.add_argument("--grid-size", type=int, default=64)
+    parser.add_argument("--eat-every", type=int, default=20)
+    args = parser.parse_args()
+    results = [run_length(n, args.ticks, args.grid_size, args.eat_every) for n in args.lengths]
+    print(json.dumps({"benchmark": "frame_codec", "ticks": args.ticks, "grid_size": args.grid_size, "results": results}))
+
+
+if __name__ == "__main__":
+    main()
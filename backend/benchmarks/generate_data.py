@@ -0,0 +1,225 @@
+"""
+Bulk synthetic data generator for realistic database volumes.
+
+Creates users, scores and active players with chunked Core executemany
+inserts. Rows are generated one chunk at a time with NumPy, so memory
+stays flat whatever the totals. Every user shares one precomputed
+password hash (the password is --password). Scores follow a configurable
+distribution, rounded to whole food items, and are spread over the last
+--days days across users with an optional activity skew. Afterwards user
+stats and the best_scores table are rebuilt from the scores in SQL.
+
+Secondary indexes on scores are dropped during the load and rebuilt at
+the end (--keep-indexes to skip). On SQLite the load connection runs with
+synchronous=OFF.
+
+    python -m benchmarks.generate_data --database-url sqlite:///./big.db \\
+        --users 1000000 --scores 10000000 --active 5000 --distribution lognormal
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Iterator, List
+
+import numpy as np
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.database import Base, create_db_engine
+from app.db import backfill_best_scores
+from app.db_models import ActivePlayerModel, BestScoreModel, ScoreModel, UserModel
+from app.engine import FOOD_POINTS
+from app.hashing import pwd_context
+
+MODES = np.array(["pass-through", "walls"], dtype=object)
+DISTRIBUTIONS = ("lognormal", "exponential", "pareto", "uniform")
+
+
+def sample_scores(rng: np.random.Generator, n: int, distribution: str, scale: float, shape: float) -> np.ndarray:
+    """n scores with the given median-ish scale, in multiples of FOOD_POINTS"""
+    if distribution == "lognormal":
+        values = rng.lognormal(np.log(scale), shape, n)
+    elif distribution == "exponential":
+        values = rng.exponential(scale, n)
+    elif distribution == "pareto":
+        values = (rng.pareto(shape, n) + 1) * scale
+    elif distribution == "uniform":
+        values = rng.uniform(0, 2 * scale, n)
+    else:
+        raise ValueError(f"unknown distribution {distribution!r}")
+    return (np.round(values / FOOD_POINTS) * FOOD_POINTS).astype(np.int64)
+
+
+def sample_users(rng: np.random.Generator, n: int, users: int, skew: float) -> np.ndarray:
+    """User indices; skew > 1 makes low-numbered users play more often"""
+    return np.minimum((rng.random(n) ** skew * users).astype(np.int64), users - 1)
+
+
+def user_chunks(users: int, prefix: str, hashed: str, chunk: int, now: datetime) -> Iterator[List[dict]]:
+    for start in range(0, users, chunk):
+        yield [
+            {"id": f"{prefix}user-{i}", "username": f"{prefix}player{i}",
+             "email": f"{prefix}player{i}@example.com", "hashed_password": hashed,
+             "high_score": 0, "games_played": 0, "created_at": now}
+            for i in range(start, min(start + chunk, users))
+        ]
+
+
+def score_chunks(rng: np.random.Generator, args, now: datetime) -> Iterator[List[dict]]:
+    base = np.datetime64(now.replace(tzinfo=None), "s")
+    for start in range(0, args.scores, args.chunk):
+        n = min(args.chunk, args.scores - start)
+        owners = sample_users(rng, n, args.users, args.skew)
+        scores = sample_scores(rng, n, args.distribution, args.scale, args.shape)
+        modes = MODES[rng.integers(0, 2, n)]
+        dates = (base - rng.integers(0, args.days * 86400, n).astype("timedelta64[s]")).astype(object)
+        yield [
+            {"id": f"{args.prefix}score-{start + i}", "user_id": f"{args.prefix}user-{owner}",
+             "username": f"{args.prefix}player{owner}", "score": int(score), "mode": mode, "date": date}
+            for i, (owner, score, mode, date) in enumerate(zip(owners.tolist(), scores.tolist(), modes, dates))
+        ]
+
+
+def active_rows(rng: np.random.Generator, args, now: datetime) -> List[dict]:
+    owners = sample_users(rng, args.active, args.users, args.skew)
+    return [
+        {"id": f"{args.prefix}user-{owner}", "username": f"{args.prefix}player{owner}",
+         "current_score": int(score), "mode": mode, "is_live": True, "started_at": now}
+        for owner, score, mode in zip(
+            np.unique(owners).tolist(),
+            sample_scores(rng, args.active, args.distribution, args.scale, args.shape),
+            MODES[rng.integers(0, 2, args.active)],
+        )
+    ]
+
+
+def log(message: str):
+    print(message, file=sys.stderr, flush=True)
+
+
+def insert_chunks(connection: Connection, table, chunks: Iterator[List[dict]], label: str, total: int) -> int:
+    written = 0
+    started = time.perf_counter()
+    for rows in chunks:
+        connection.execute(insert(table), rows)
+        connection.commit()
+        written += len(rows)
+        log(f"{label}: {written}/{total} ({written / (time.perf_counter() - started):.0f} rows/s)")
+    return written
+
+
+def refresh_user_stats(connection: Connection, prefix: str):
+    """Recompute high_score and games_played of generated users from their scores"""
+    scores = ScoreModel.__table__
+    users = UserModel.__table__
+    connection.execute(
+        update(users)
+        .where(users.c.id.like(f"{prefix}user-%"))
+        .values(
+            high_score=func.coalesce(
+                select(func.max(scores.c.score)).where(scores.c.user_id == users.c.id).scalar_subquery(), 0),
+            games_played=select(func.count()).where(scores.c.user_id == users.c.id).scalar_subquery(),
+        )
+    )
+    connection.commit()
+
+
+def generate(engine: Engine, args) -> dict:
+    """Load the requested volumes into the database behind engine"""
+    Base.metadata.create_all(bind=engine)
+    rng = np.random.default_rng(args.seed)
+    now = datetime.now(timezone.utc)
+    hashed = pwd_context.hash(args.password)
+    counts = {}
+    timings = {}
+
+    deferred = [] if args.keep_indexes else list(ScoreModel.__table__.indexes)
+    with engine.connect() as connection:
+        if engine.dialect.name == "sqlite":
+            connection.exec_driver_sql("PRAGMA synchronous=OFF")
+        for index in deferred:
+            index.drop(connection, checkfirst=True)
+        connection.commit()
+
+        started = time.perf_counter()
+        counts["users"] = insert_chunks(
+            connection, UserModel.__table__, user_chunks(args.users, args.prefix, hashed, args.chunk, now),
+            "users", args.users)
+        counts["scores"] = insert_chunks(
+            connection, ScoreModel.__table__, score_chunks(rng, args, now), "scores", args.scores)
+        counts["active_players"] = insert_chunks(
+            connection, ActivePlayerModel.__table__, iter([active_rows(rng, args, now)] if args.active else []),
+            "active players", args.active)
+        timings["insert_seconds"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for index in deferred:
+            log(f"creating index {index.name}")
+            index.create(connection)
+        connection.commit()
+        timings["index_seconds"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        if not args.skip_stats:
+            log("refreshing user stats")
+            refresh_user_stats(connection, args.prefix)
+        timings["stats_seconds"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with Session(engine) as session:
+        log("rebuilding best_scores")
+        session.query(BestScoreModel).delete()
+        session.commit()
+        backfill_best_scores(session)
+    timings["best_scores_seconds"] = time.perf_counter() - started
+
+    rows = sum(counts.values())
+    return {
+        **counts,
+        **{key: round(value, 2) for key, value in timings.items()},
+        "rows_per_second": round(rows / timings["insert_seconds"]) if timings["insert_seconds"] else 0,
+    }
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///./synthetic.db")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--scores", type=int, default=1000000)
+    parser.add_argument("--active", type=int, default=1000)
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--scale", type=float, default=150.0, help="Typical score")
+    parser.add_argument("--shape", type=float, default=1.0, help="lognormal sigma or pareto alpha")
+    parser.add_argument("--skew", type=float, default=1.5, help="Activity skew across users (1 = uniform)")
+    parser.add_argument("--days", type=int, default=90, help="Spread score dates over this many days")
+    parser.add_argument("--chunk", type=int, default=20000)
+    parser.add_argument("--prefix", default="", help="Prefix for generated ids, to add to an existing dataset")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep-indexes", action="store_true", help="Insert with the scores indexes in place")
+    parser.add_argument("--skip-stats", action="store_true", help="Leave users.high_score/games_played at 0")
+    return parser
+
+
+def main():
+    args = parser().parse_args()
+    engine = create_db_engine(args.database_url)
+    started = time.perf_counter()
+    try:
+        result = generate(engine, args)
+    finally:
+        engine.dispose()
+    print(json.dumps({
+        "benchmark": "generate_data",
+        "database": engine.dialect.name,
+        "distribution": args.distribution,
+        "total_seconds": round(time.perf_counter() - started, 2),
+        **result,
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Per-row cost of ORM entity reads vs the Core statements in app.queries.
+
+Seeds a temporary SQLite database with benchmarks.generate_data, then for
+each read (top scores, best scores, user lookups) runs the
+ORM entity query the Database layer used to issue and the prebuilt Core
+statement it issues now. Reports time per row and the peak memory
+allocated by one read (tracemalloc).
+
+    python -m benchmarks.read_layer --users 20000 --scores 200000 --limit 100
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Callable
+
+from sqlalchemy import create_engine, desc
+from sqlalchemy.orm import Session
+
+from app import queries
+from app.db_models import BestScoreModel, ScoreModel, UserModel
+from benchmarks.generate_data import generate, parser as generate_parser
+
+
+def measure(read: Callable[[], int], repeat: int) -> dict:
+    rows = read()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        read()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    read()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "rows": rows,
+        "us_per_row": round(elapsed / repeat / max(rows, 1) * 1e6, 3),
+        "us_per_read": round(elapsed / repeat * 1e6, 1),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def reads(session: Session, limit: int, users: int):
+    connection = session.connection()
+
+    def orm_top():
+        # A fresh identity map per read, as a request gets
+        session.expunge_all()
+        entities = session.query(ScoreModel).filter(ScoreModel.mode == "walls").order_by(
+            desc(ScoreModel.score), ScoreModel.date, ScoreModel.id).limit(limit).all()
+        return len([(s.id, s.username, s.score, s.mode, s.date) for s in entities])
+
+    def core_top():
+        return len(connection.execute(queries.top_scores[True], {"mode": "walls", "limit": limit}).all())
+
+    def orm_best():
+        session.expunge_all()
+        entities = session.query(BestScoreModel).filter(BestScoreModel.mode == "walls").order_by(
+            desc(BestScoreModel.best_score), BestScoreModel.achieved_at).limit(limit).all()
+        return len([(b.score_id, b.username, b.best_score, b.mode, b.achieved_at) for b in entities])
+
+    def core_best():
+        return len(connection.execute(queries.top_best_scores[True], {"mode": "walls", "limit": limit}).all())
+
+    emails = [f"player{i * 7919 % users}@example.com" for i in range(100)]
+
+    def orm_users():
+        session.expunge_all()
+        for email in emails:
+            user = session.query(UserModel).filter(UserModel.email == email).first()
+            dict(id=user.id, username=user.username, email=user.email, hashed_password=user.hashed_password,
+                 highScore=user.high_score, gamesPlayed=user.games_played, createdAt=user.created_at)
+        return len(emails)
+
+    def core_users():
+        for email in emails:
+            dict(zip(queries.USER_FIELDS, connection.execute(queries.user_by_email, {"email": email}).first()))
+        return len(emails)
+
+    return {
+        "top_scores": (orm_top, core_top),
+        "best_scores": (orm_best, core_best),
+        "user_by_email": (orm_users, core_users),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--scores", type=int, default=200000)
+    parser.add_argument("--limit", type=int, default=100, help="Leaderboard rows per read")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        generate(engine, generate_parser().parse_args([
+            "--users", str(args.users), "--scores", str(args.scores), "--active", "0",
+        ]))
+        with Session(engine) as session:
+            for name, (orm, core) in reads(session, args.limit, args.users).items():
+                results[name] = {"orm": measure(orm, args.repeat), "core": measure(core, args.repeat)}
+        engine.dispose()
+
+    print(json.dumps({
+        "benchmark": "read_layer",
+        "users": args.users,
+        "scores": args.scores,
+        "limit": args.limit,
+        "results": results,
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Encoding cost of the list endpoints, per 1,000 entries.
+
+Compares, for leaderboard entries and live players:
+
+    models_response   build validated models, then FastAPI's response_model
+                      path: validate again, dump to Python, json.dumps
+    models_dump_json  build validated models, encode with a TypeAdapter
+    rows_dump_json    build plain dicts from the records and encode with the
+                      precompiled serializers in app.serialization (current)
+
+    python -m benchmarks.serialization --entries 1000 --repeat 200
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List
+
+from pydantic import TypeAdapter
+
+from app.models import ActivePlayer, LeaderboardEntry
+from app.serialization import active_players_json, encode_leaderboard
+
+
+def fastapi_render(adapter: TypeAdapter, models) -> bytes:
+    """What a route returning models with response_model does (JSONResponse.render)"""
+    value = adapter.validate_python(models)
+    return json.dumps(
+        adapter.dump_python(value, mode="json"), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def per_thousand(fn: Callable[[], bytes], entries: int, repeat: int) -> float:
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return round((time.perf_counter() - started) / repeat / entries * 1000 * 1e6, 1)
+
+
+def leaderboard(entries: int, repeat: int) -> dict:
+    now = datetime.now(timezone.utc)
+    records = [
+        (f"score-{i}", f"player{i}", 10 * (entries - i), "walls" if i % 2 else "pass-through",
+         now - timedelta(seconds=i))
+        for i in range(entries)
+    ]
+    adapter = TypeAdapter(List[LeaderboardEntry])
+
+    def models():
+        return [
+            LeaderboardEntry(id=score_id, username=username, score=score, mode=mode, date=date, rank=rank)
+            for rank, (score_id, username, score, mode, date) in enumerate(records, 1)
+        ]
+
+    assert encode_leaderboard(records, 1) == adapter.dump_json(models())
+    return {
+        "models_response_us": per_thousand(lambda: fastapi_render(adapter, models()), entries, repeat),
+        "models_dump_json_us": per_thousand(lambda: adapter.dump_json(models()), entries, repeat),
+        "rows_dump_json_us": per_thousand(lambda: encode_leaderboard(records, 1), entries, repeat),
+    }
+
+
+def live_players(entries: int, repeat: int) -> dict:
+    now = datetime.now(timezone.utc)
+    players = [(f"user-{i}", f"player{i}", i * 10, "walls", now) for i in range(entries)]
+    adapter = TypeAdapter(List[ActivePlayer])
+
+    def models():
+        return [
+            ActivePlayer(id=i, username=u, currentScore=s, mode=m, isLive=True, startedAt=d)
+            for i, u, s, m, d in players
+        ]
+
+    def rows():
+        return active_players_json.dump_json([
+            {"id": i, "username": u, "currentScore": s, "mode": m, "isLive": True, "startedAt": d}
+            for i, u, s, m, d in players
+        ])
+
+    assert rows() == adapter.dump_json(models())
+    return {
+        "models_response_us": per_thousand(lambda: fastapi_render(adapter, models()), entries, repeat),
+        "models_dump_json_us": per_thousand(lambda: adapter.dump_json(models()), entries, repeat),
+        "rows_dump_json_us": per_thousand(rows, entries, repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1000, help="Entries per encoded list")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps({
+        "benchmark": "serialization",
+        "entries": args.entries,
+        "unit": "microseconds per 1000 entries",
+        "leaderboard": leaderboard(args.entries, args.repeat),
+        "live_players": live_players(args.entries, args.repeat),
+    }))
+
+
+if __name__ == "__main__":
+    main()
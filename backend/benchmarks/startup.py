@@ -0,0 +1,85 @@
+"""
+Import-time and boot-time profile of the API process.
+
+Imports app.main under `python -X importtime` in a fresh interpreter and
+reports the slowest imports (self and cumulative time), then boots the app
+through its lifespan against a temporary SQLite database three times, each
+in a fresh process:
+
+    cold     empty database, FAST_STARTUP=1 (creates the schema)
+    restart  same database, FAST_STARTUP=1 (schema version matches)
+    full     same database, FAST_STARTUP=0 (create_all, no warm-up)
+
+and reports each boot's phases from app.startup.boot_profile plus the wall
+time from interpreter start to ready.
+
+    python -m benchmarks.startup --top 15
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BOOT = """
+import asyncio, json, time
+started = time.perf_counter()
+from app.main import app
+from app.startup import boot_profile
+async def boot():
+    async with app.router.lifespan_context(app):
+        print(json.dumps({**boot_profile.stats(), "ready_seconds": round(time.perf_counter() - started, 6)}))
+asyncio.run(boot())
+"""
+
+
+def import_profile(top: int) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True, text=True, env={**os.environ, "TESTING": "1"}, check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append({"module": name.strip(), "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    total = next(m["cumulative_ms"] for m in modules if m["module"] == "app.main")
+    return {
+        "app_main_ms": total,
+        "slowest_self": sorted(modules, key=lambda m: -m["self_ms"])[:top],
+        "slowest_cumulative": [
+            m for m in sorted(modules, key=lambda m: -m["cumulative_ms"]) if m["module"] != "app.main"
+        ][:top],
+    }
+
+
+def boot(database: str, fast: bool) -> dict:
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{database}", "FAST_STARTUP": "1" if fast else "0"}
+    env.pop("TESTING", None)
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", BOOT], capture_output=True, text=True, env=env, check=True)
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report["process_seconds"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, "boot.db")
+        boots = {
+            "cold": boot(database, fast=True),
+            "restart": boot(database, fast=True),
+            "full": boot(database, fast=False),
+        }
+    print(json.dumps({"benchmark": "startup", "imports": import_profile(args.top), "boots": boots}))
+
+
+if __name__ == "__main__":
+    main()
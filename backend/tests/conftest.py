@@ -10,7 +10,10 @@ os.environ["TESTING"] = "1"
 
 
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_db, get_read_db
+from app.cache import leaderboard_cache
+from app.identity import identity_cache
+from app.presence import presence_registry
 
 # Import models to register them with Base BEFORE creating tables
 from app.db_models import UserModel, ScoreModel, ActivePlayerModel
@@ -41,6 +44,17 @@ TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engin
 # Create tables once when module loads
 Base.metadata.create_all(bind=engine)
 
+@pytest.fixture(autouse=True)
+def reset_caches():
+    """In-process caches outlive the per-test rollback, so clear them"""
+    leaderboard_cache.clear()
+    identity_cache.clear()
+    presence_registry.clear()
+    yield
+    leaderboard_cache.clear()
+    identity_cache.clear()
+    presence_registry.clear()
+
 @pytest.fixture(scope="function")
 def db_session():
     """Create a fresh session for each test and clean data"""
@@ -64,6 +78,7 @@ def client(db_session):
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     yield TestClient(app)
     app.dependency_overrides.clear()
 
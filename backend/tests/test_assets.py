@@ -0,0 +1,64 @@
+import gzip
+
+from app.assets import IMMUTABLE, REVALIDATE, AssetManifest, accepts_gzip
+
+SCRIPT = b"export const board = [" + b"{rank: 1, score: 300}, " * 200 + b"];"
+
+
+def make_manifest(tmp_path) -> AssetManifest:
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "index.html").write_bytes(b"<!doctype html><div id=root></div>")
+    (tmp_path / "assets" / "index-B4kYc0eR.js").write_bytes(SCRIPT)
+    (tmp_path / "favicon.ico").write_bytes(b"\x00" * 2048)
+    manifest = AssetManifest()
+    assert manifest.load(str(tmp_path)) == 3
+    return manifest
+
+
+def test_hashed_asset_is_immutable_and_gzip_negotiated(tmp_path):
+    manifest = make_manifest(tmp_path)
+
+    plain = manifest.response("assets/index-B4kYc0eR.js")
+    assert plain.body == SCRIPT
+    assert plain.headers["cache-control"] == IMMUTABLE
+    assert plain.headers["vary"] == "Accept-Encoding"
+    assert "content-encoding" not in plain.headers
+
+    packed = manifest.response("assets/index-B4kYc0eR.js", "br, gzip;q=0.8")
+    assert packed.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(packed.body) == SCRIPT
+    assert packed.headers["etag"] != plain.headers["etag"]
+
+    assert "content-encoding" not in manifest.response("assets/index-B4kYc0eR.js", "gzip;q=0").headers
+    # Binary and tiny files are never compressed
+    icon = manifest.response("favicon.ico", "gzip")
+    assert "content-encoding" not in icon.headers and "vary" not in icon.headers
+    assert icon.headers["cache-control"] == REVALIDATE
+
+
+def test_unknown_paths_fall_back_to_index_and_etags_revalidate(tmp_path):
+    manifest = make_manifest(tmp_path)
+    page = manifest.response("play/walls")
+    assert page.body.startswith(b"<!doctype html>")
+    assert page.headers["cache-control"] == REVALIDATE
+
+    (tmp_path / "index.html").unlink()
+    again = manifest.response("play/walls", if_none_match=page.headers["etag"])
+    assert again.status_code == 304 and again.body == b""
+
+    stats = manifest.stats()
+    assert stats["files"] == 3 and stats["fallbacks"] == 2 and stats["not_modified"] == 1
+    assert AssetManifest().response("index.html") is None
+
+
+def test_accepts_gzip():
+    assert accepts_gzip("gzip, deflate, br")
+    assert accepts_gzip("*")
+    assert not accepts_gzip(None)
+    assert not accepts_gzip("br, identity")
+    assert not accepts_gzip("gzip;q=0")
+    # Every entry is read: an explicit gzip entry takes precedence over *
+    assert accepts_gzip("*;q=0, gzip")
+    assert not accepts_gzip("*, gzip;q=0")
+    assert not accepts_gzip("br, *;q=0")
+    assert accepts_gzip("GZIP ; level=1 ; q=0.5")
@@ -42,3 +42,66 @@ def test_me(client, test_user_token):
 def test_me_unauthorized(client):
     response = client.get("/api/v1/auth/me")
     assert response.status_code == 401
+
+def test_login_rejected_when_hasher_saturated(client, monkeypatch):
+    from app.hashing import password_hasher
+    client.post(
+        "/api/v1/auth/signup",
+        json={"username": "BusyUser", "email": "busy@example.com", "password": "password"}
+    )
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+
+    response = client.post(
+        "/api/v1/auth/login",
+        json={"email": "busy@example.com", "password": "password"}
+    )
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert password_hasher.stats()["rejected"] >= 1
+
+def test_me_served_from_identity_cache(client, test_user_token):
+    from app.identity import identity_cache
+    headers = {"Authorization": f"Bearer {test_user_token}"}
+    client.get("/api/v1/auth/me", headers=headers)
+    hits = identity_cache.stats()["hits"]
+
+    response = client.get("/api/v1/auth/me", headers=headers)
+    assert response.status_code == 200
+    assert identity_cache.stats()["hits"] == hits + 1
+
+    # Submitting a score changes the user's stats and drops the cached identity
+    client.post("/api/v1/leaderboard/submit", json={"score": 40, "mode": "walls", "duration": 9}, headers=headers)
+    assert client.get("/api/v1/auth/me", headers=headers).json()["user"]["gamesPlayed"] == 1
+
+def test_duplicate_signup_skips_hashing(client, monkeypatch):
+    from app.hashing import password_hasher
+    body = {"username": "Twice", "email": "twice@example.com", "password": "password"}
+    assert client.post("/api/v1/auth/signup", json=body).status_code == 201
+    submitted = password_hasher.stats()["submitted"]
+
+    response = client.post("/api/v1/auth/signup", json=body)
+    assert response.status_code == 400
+    assert password_hasher.stats()["submitted"] == submitted
+
+def test_identity_put_refused_after_concurrent_invalidation():
+    from datetime import datetime, timezone
+    from app.identity import IdentityCache
+    from app.models import User
+
+    cache = IdentityCache(max_entries=2)
+    stale = User(id="u1", username="Alice", email="a@example.com", createdAt=datetime.now(timezone.utc))
+    other = stale.model_copy(update={"id": "u2"})
+
+    generation = cache.generation()
+    # A score commits for u1 between the lookup and the put
+    cache.invalidate_user("u1")
+    assert cache.put("token", stale, generation=generation) is False
+    assert cache.get("token") is None
+    # Other users are unaffected
+    assert cache.put("other", other, generation=generation) is True
+    assert cache.put("token", stale, generation=cache.generation()) is True
+
+    # Users pushed out of the invalidation log are treated as just invalidated
+    for user_id in ("u2", "u3", "u4"):
+        cache.invalidate_user(user_id)
+    assert cache.put("token", stale, generation=generation) is False
@@ -0,0 +1,170 @@
+import json
+import os
+import socket
+import threading
+from datetime import datetime, timezone
+
+from app.bus import EventBus, LocalBackend, UnixSocketBackend
+from app.cache import leaderboard_cache
+from app.db import apply_scores_event
+from app.identity import identity_cache
+from app.models import User
+from app.presence import PresenceRegistry
+
+
+def test_local_bus_delivers_to_other_buses_only():
+    hub = LocalBackend()
+    first, second = EventBus(hub), EventBus(hub)
+    seen = {"first": [], "second": []}
+    first.subscribe("t", seen["first"].append)
+    second.subscribe("t", seen["second"].append)
+    first.open()
+    second.open()
+
+    first.publish("t", {"at": datetime(2024, 5, 1, tzinfo=timezone.utc)})
+    assert seen == {"first": [], "second": [{"at": "2024-05-01T00:00:00+00:00"}]}
+    assert first.stats()["published"] == 1 and second.stats()["received"] == 1
+
+    second.close()
+    first.publish("t", {})
+    assert len(seen["second"]) == 1
+
+
+def test_unix_socket_bus_between_workers(tmp_path):
+    directory = str(tmp_path / "bus")
+    first, second = EventBus(UnixSocketBackend(directory, peer_refresh=0)), EventBus(UnixSocketBackend(directory, peer_refresh=0))
+    received = threading.Event()
+    second.subscribe("scores", lambda data: received.set())
+    first.open()
+    second.open()
+    try:
+        # A socket left behind by a crashed worker is cleaned up on the first send.
+        # Bound and closed with no reader, so sends to it are always refused.
+        stale_path = os.path.join(directory, "crashed.sock")
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        stale.bind(stale_path)
+        stale.close()
+
+        first.publish("scores", {"rows": []})
+        assert received.wait(2)
+        assert not os.path.exists(stale_path)
+        assert first.backend.stats()["peers"] == 1
+    finally:
+        first.close()
+        second.close()
+    assert os.listdir(directory) == []
+
+
+def test_score_and_presence_events_update_other_workers():
+    leaderboard_cache.put("walls", "top", 0, b"[]")
+    identity_cache.put("token", User(id="u1", username="Alice", email="a@example.com",
+                                     highScore=0, gamesPlayed=0, createdAt=datetime.now(timezone.utc)))
+    apply_scores_event({"rows": [{
+        "id": "s1", "user_id": "u1", "username": "Alice", "score": 50,
+        "mode": "walls", "date": "2024-05-01T12:00:00+00:00",
+    }]})
+    assert leaderboard_cache.get("walls", "top") is None
+    assert identity_cache.get("token") is None
+
+    hub = LocalBackend()
+    here, there = EventBus(hub), EventBus(hub)
+    origin = PresenceRegistry(ttl=10, persist=False, bus=here)
+    replica = PresenceRegistry(ttl=10, persist=False, bus=there)
+    there.subscribe("presence", replica.apply_event)
+    here.open()
+    there.open()
+
+    origin.heartbeat("u1", "Alice", "walls", 40)
+    origin.heartbeat("u1", "Alice", "walls", 70)
+    [player] = replica.snapshot()
+    assert player.currentScore == 70 and player.startedAt == origin.snapshot()[0].startedAt
+    origin.leave("u1")
+    assert replica.snapshot() == []
+
+
+def test_index_and_window_adds_are_idempotent():
+    from app.ranking import LeaderboardIndex
+    from app.windows import WindowedLeaderboards
+
+    index, boards = LeaderboardIndex(), WindowedLeaderboards(top_k=3)
+    now = datetime.now(timezone.utc)
+    # Loaded from the database, then announced again by the worker that committed it
+    for date in (now, now.replace(tzinfo=None)):
+        index.add("s1", "Alice", 50, "walls", date)
+        boards.add("s1", "Alice", 50, "walls", date)
+    index.add("s2", "Bob", 50, "walls", now)
+
+    assert [r[0] for r in index.top(None, 10)] == ["s1", "s2"]
+    assert [r[0] for r in boards.top("daily", "walls", 10)] == ["s1"]
+
+
+def test_held_events_apply_after_release_in_order():
+    hub = LocalBackend()
+    publisher, worker = EventBus(hub), EventBus(hub)
+    seen = []
+    worker.subscribe("t", lambda data: seen.append(data["n"]))
+    publisher.open()
+    worker.open(hold=True)
+
+    for n in range(3):
+        publisher.publish("t", {"n": n})
+    assert seen == [] and worker.stats()["held"] == 3
+    worker.release()
+    publisher.publish("t", {"n": 3})
+    assert seen == [0, 1, 2, 3]
+    assert worker.stats()["gaps"] == 0
+
+
+def test_lost_events_trigger_a_resync():
+    from app.bus import MAX_MESSAGE_BYTES
+
+    hub = LocalBackend()
+    publisher, worker = EventBus(hub), EventBus(hub, hold_limit=1)
+    resyncs, seen = [], []
+    worker.subscribe("t", seen.append)
+    worker.on_resync(lambda: resyncs.append(len(seen)))
+    publisher.open()
+    worker.open()
+
+    publisher.publish("t", {})
+    # Too large to send, but numbered: the next event reveals the gap
+    publisher.publish("t", {"blob": "x" * MAX_MESSAGE_BYTES})
+    publisher.publish("t", {})
+    assert resyncs == [1] and len(seen) == 2
+    assert worker.stats()["gaps"] == 1
+
+    # A delivered copy of an event already applied is skipped
+    worker._deliver(json.dumps({"origin": publisher.origin, "seq": 3, "topic": "t", "data": {}}).encode())
+    assert len(seen) == 2 and worker.stats()["duplicates"] == 1
+
+    # Overflowing the hold buffer loses events too
+    late = EventBus(hub, hold_limit=1)
+    late.on_resync(lambda: resyncs.append("late"))
+    late.open(hold=True)
+    publisher.publish("t", {})
+    publisher.publish("t", {})
+    late.release()
+    assert resyncs[-1] == "late"
+
+
+def test_reload_scores_rebuilds_from_the_database(db_session, monkeypatch):
+    from app import db as db_module
+    from app.db import reload_scores
+    from app.db_models import ScoreModel
+    from app.ranking import LeaderboardIndex
+
+    index = LeaderboardIndex()
+    monkeypatch.setattr(db_module, "leaderboard_index", index)
+    monkeypatch.setattr(db_module, "SessionLocal", lambda: db_session)
+    monkeypatch.setattr(db_session, "close", lambda: None)
+    index.load(db_session)
+    leaderboard_cache.put("walls", "top", 0, b"[]")
+
+    # Committed by another worker whose event never arrived
+    db_session.add(ScoreModel(id="s9", user_id="u9", username="Zed", score=90, mode="walls",
+                              date=datetime(2024, 5, 1)))
+    db_session.commit()
+    reload_scores()
+
+    assert [r[0] for r in index.top("walls", 10)] == ["s9"]
+    assert leaderboard_cache.get("walls", "top") is None
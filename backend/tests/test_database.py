@@ -0,0 +1,98 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.database import create_db_engine, storage_profile
+
+
+def test_sqlite_file_profile_uses_wal(tmp_path):
+    url = f"sqlite:///{tmp_path / 'profile.db'}"
+    write_engine = create_db_engine(url)
+    read_engine = create_db_engine(url, read_only=True)
+    try:
+        with write_engine.begin() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        with read_engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM t")).scalar() == 0
+            with pytest.raises(OperationalError):
+                conn.execute(text("INSERT INTO t VALUES (1)"))
+    finally:
+        write_engine.dispose()
+        read_engine.dispose()
+
+
+def test_postgres_profile_sets_pool_and_timeouts():
+    options = storage_profile("postgresql://user:pw@localhost/db", read_only=True)
+    assert options["pool_pre_ping"] is True
+    assert options["pool_size"] > 0
+    assert "statement_timeout" in options["connect_args"]["options"]
+    assert "default_transaction_read_only=on" in options["connect_args"]["options"]
+
+def test_only_leaderboard_lists_use_the_read_engine(client, test_user_token):
+    from app.database import get_read_db
+    from app.main import app
+
+    def replica_down():
+        raise RuntimeError("read engine used")
+        yield
+
+    app.dependency_overrides[get_read_db] = replica_down
+    headers = {"Authorization": f"Bearer {test_user_token}"}
+    client.post("/api/v1/leaderboard/submit", json={"score": 10, "mode": "walls", "duration": 5}, headers=headers)
+    # Read-after-write endpoints stay on the primary
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+    assert client.get("/api/v1/leaderboard/around-me", headers=headers).status_code == 200
+    with pytest.raises(RuntimeError, match="read engine used"):
+        client.get("/api/v1/leaderboard")
+
+
+@pytest.mark.parametrize("mode", [None, "walls"])
+def test_core_leaderboard_reads_match_orm_order(db_session, mode):
+    from datetime import datetime, timedelta
+    from sqlalchemy import desc
+    from app import queries
+    from app.db import Database
+    from app.db_models import BestScoreModel, ScoreModel
+    from app.models import UserCreate
+
+    db = Database(db_session)
+    users = [db.create_user(UserCreate(username=f"P{i}", email=f"p{i}@example.com", password="pw")) for i in range(4)]
+    start = datetime(2024, 1, 1)
+    # Ties on score, and on score and date, so every sort key is exercised
+    for i, (score, minutes, board) in enumerate([
+        (50, 3, "walls"), (80, 1, "walls"), (50, 1, "pass-through"), (80, 1, "walls"),
+        (20, 0, "pass-through"), (50, 2, "walls"), (80, 0, "pass-through"), (50, 2, "walls"),
+    ]):
+        user = users[i % len(users)]
+        date = start + timedelta(minutes=minutes)
+        db_session.add(ScoreModel(id=f"s{7 - i}", user_id=user.id, username=user.username,
+                                  score=score, mode=board, date=date))
+    for i, (score, minutes, board) in enumerate([
+        (90, 2, "walls"), (90, 1, "walls"), (40, 0, "pass-through"), (70, 5, "walls"), (90, 0, "pass-through"),
+    ]):
+        user = users[i % len(users)]
+        db_session.add(BestScoreModel(user_id=user.id, mode=board, username=user.username, best_score=score,
+                                      achieved_at=start + timedelta(minutes=minutes), score_id=f"b{i}"))
+    db_session.commit()
+
+    orm_scores = db_session.query(ScoreModel)
+    orm_best = db_session.query(BestScoreModel)
+    if mode:
+        orm_scores = orm_scores.filter(ScoreModel.mode == mode)
+        orm_best = orm_best.filter(BestScoreModel.mode == mode)
+    expected_scores = [
+        (s.id, s.username, s.score, s.mode, s.date)
+        for s in orm_scores.order_by(desc(ScoreModel.score), ScoreModel.date, ScoreModel.id).limit(6)
+    ]
+    expected_best = [
+        (b.score_id, b.username, b.best_score, b.mode, b.achieved_at)
+        for b in orm_best.order_by(desc(BestScoreModel.best_score), BestScoreModel.achieved_at).limit(6)
+    ]
+
+    assert [tuple(r) for r in db._read(queries.top_scores[bool(mode)], mode=mode, limit=6)] == expected_scores
+    assert [tuple(r) for r in db._read(queries.top_best_scores[bool(mode)], mode=mode, limit=6)] == expected_best
+    # The public reads serve the same rows while the in-memory index is not loaded
+    assert [tuple(r) for r in db.leaderboard_records(mode, 6)[0]] == expected_scores
+    assert [tuple(r) for r in db.best_leaderboard_records(mode, 6)[0]] == expected_best
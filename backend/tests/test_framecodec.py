@@ -0,0 +1,95 @@
+import random
+
+import numpy as np
+
+from app.engine import BatchEngine
+from app.framecodec import DELTA, KEYFRAME, FrameDecoder, FrameEncoder
+
+
+def play(seed, ticks, grid_size=10):
+    """GameState dicts of one engine game, one per tick"""
+    rng = random.Random(seed)
+    engine = BatchEngine(1, grid_size=grid_size, modes="pass-through", seeds=[seed])
+    for _ in range(ticks):
+        if rng.random() < 0.3:
+            engine.set_directions(np.array([0]), np.array([rng.randrange(4)]))
+        engine.step()
+        yield engine.state(0)
+        if not engine.alive[0]:
+            engine.reset(np.array([0]))
+
+
+def test_round_trip_uses_deltas():
+    encoder = FrameEncoder(keyframe_interval=50)
+    decoder = FrameDecoder()
+    for state in play(seed=3, ticks=400):
+        frame = encoder.encode(state)
+        assert decoder.apply(frame)
+        assert decoder.state() == state
+    assert encoder.deltas > encoder.keyframes * 10
+    # A one-step move costs the same however long the snake is
+    encoder = FrameEncoder()
+    sizes = [len(encoder.encode(s)) for s in play(seed=5, ticks=30)]
+    assert set(sizes[1:]) <= {7, 9, 13, 15}
+
+
+def test_decoder_waits_for_keyframe_after_a_gap():
+    encoder = FrameEncoder(keyframe_interval=5)
+    frames = [encoder.encode(state) for state in play(seed=8, ticks=12)]
+    decoder = FrameDecoder()
+    assert decoder.apply(frames[0])
+    assert not decoder.apply(frames[2])
+    assert not decoder.apply(frames[3])
+    first_keyframe = next(i for i, f in enumerate(frames) if i > 0 and f[0] == KEYFRAME)
+    assert decoder.apply(frames[first_keyframe])
+    assert all(decoder.apply(f) for f in frames[first_keyframe + 1:])
+
+
+def test_late_joiner_starts_from_keyframe(client):
+    import json
+    response = client.post(
+        "/api/v1/auth/signup",
+        json={"username": "Encoder", "email": "encoder@example.com", "password": "password"}
+    )
+    token, player_id = response.json()["token"], response.json()["user"]["id"]
+    states = list(play(seed=2, ticks=5))
+
+    with client:
+        with client.websocket_connect(f"/api/v1/live/ws/play?token={token}&encoding=binary") as player:
+            for state in states[:3]:
+                player.send_text(json.dumps(state))
+            with client.websocket_connect(f"/api/v1/live/ws/watch/{player_id}") as viewer:
+                decoder = FrameDecoder()
+                first = viewer.receive_bytes()
+                assert first[0] == KEYFRAME and decoder.apply(first)
+                assert decoder.state() == states[2]
+                player.send_text(json.dumps(states[3]))
+                frame = viewer.receive_bytes()
+                assert frame[0] == DELTA and decoder.apply(frame)
+                assert decoder.state() == states[3]
+
+
+def test_slow_viewer_resumes_from_a_keyframe_after_a_drop():
+    import asyncio
+    from app.spectator import SpectatorHub
+
+    async def scenario():
+        hub = SpectatorHub(max_queue=3)
+        encoder = FrameEncoder()
+        hub.open("p1", snapshot=encoder.keyframe)
+        subscriber = hub.subscribe("p1")
+        states = list(play(seed=4, ticks=10))
+        for state in states:
+            hub.publish("p1", encoder.encode(state))
+        hub.close("p1")
+        frames = []
+        while (frame := await subscriber.get()) is not None:
+            frames.append(frame)
+        return states, frames, subscriber.dropped
+
+    states, frames, dropped = asyncio.run(scenario())
+    decoder = FrameDecoder()
+    # Every frame decodes straight away, without waiting for a scheduled keyframe
+    assert all(decoder.apply(frame) for frame in frames)
+    assert decoder.state() == states[-1]
+    assert frames[0][0] == KEYFRAME and dropped > 0
@@ -0,0 +1,103 @@
+import asyncio
+
+from app.db import Database
+from app.ingest import ScoreIngestor
+from app.models import UserCreate
+
+
+def make_user(db, name):
+    return db.create_user(UserCreate(username=name, email=f"{name.lower()}@example.com", password="pw"))
+
+
+def test_add_scores_batch_matches_sequential_semantics(db_session):
+    db = Database(db_session)
+    alice = make_user(db, "Alice")
+    bob = make_user(db, "Bob")
+
+    results = db.add_scores([
+        (alice.id, 100, "walls"),
+        (bob.id, 300, "walls"),
+        (alice.id, 50, "walls"),
+        (alice.id, 200, "walls"),
+        ("missing-user", 10, "walls"),
+    ])
+
+    assert [r and r["isHighScore"] for r in results] == [True, True, False, True, None]
+    assert [r and r["rank"] for r in results] == [1, 1, 3, 2, None]
+    assert db.get_user_by_id(alice.id).gamesPlayed == 3
+    assert db.get_user_by_id(alice.id).highScore == 200
+
+
+def test_ingestor_flushes_concurrent_submits_together(db_session):
+    db = Database(db_session)
+    users = [make_user(db, f"Player{i}") for i in range(5)]
+    ingestor = ScoreIngestor(session_factory=lambda: db_session, batch_size=100, flush_ms=50, enabled=True)
+
+    async def scenario():
+        results = await asyncio.gather(*(
+            ingestor.submit(user.id, (i + 1) * 10, "pass-through") for i, user in enumerate(users)
+        ))
+        await ingestor.stop()
+        return results
+
+    results = asyncio.run(scenario())
+    # Each score beats every one submitted before it
+    assert [r["rank"] for r in results] == [1, 1, 1, 1, 1]
+    assert all(r["isHighScore"] for r in results)
+    stats = ingestor.stats()
+    assert stats["batches"] == 1
+    assert stats["rows"] == 5
+
+
+def test_stop_resolves_in_flight_and_queued_submissions(db_session):
+    import time
+
+    db = Database(db_session)
+    alice = make_user(db, "Alice")
+    ingestor = ScoreIngestor(session_factory=lambda: db_session, batch_size=2, flush_ms=0, enabled=True)
+    flush = ingestor._flush
+
+    def slow_flush(submissions):
+        time.sleep(0.1)
+        return flush(submissions)
+
+    ingestor._flush = slow_flush
+
+    async def scenario():
+        first = [asyncio.ensure_future(ingestor.submit(user_id, 10, "walls")) for user_id in (alice.id, "missing")]
+        await asyncio.sleep(0.02)
+        # The first batch is committing; this one is still queued
+        queued = asyncio.ensure_future(ingestor.submit(alice.id, 20, "walls"))
+        await asyncio.sleep(0)
+        await ingestor.stop()
+        return await asyncio.wait_for(asyncio.gather(*first, queued, return_exceptions=True), 1)
+
+    in_flight, missing, queued = asyncio.run(scenario())
+    assert in_flight["rank"] == 1
+    assert isinstance(missing, ValueError)
+    assert queued["rank"] == 1
+    assert ingestor.stats()["rows"] == 3
+
+
+def test_best_scores_upsert_only_raises_bests(db_session):
+    from app.db_models import BestScoreModel
+
+    db = Database(db_session)
+    alice = make_user(db, "Alice")
+    db.add_scores([(alice.id, 100, "walls"), (alice.id, 300, "walls"), (alice.id, 300, "walls")])
+    first_best = db_session.get(BestScoreModel, (alice.id, "walls")).score_id
+
+    # A batch committed later with a lower score must not overwrite the best
+    db.add_scores([(alice.id, 200, "walls"), (alice.id, 50, "pass-through")])
+    db_session.expire_all()
+    best = db_session.get(BestScoreModel, (alice.id, "walls"))
+    assert (best.best_score, best.score_id) == (300, first_best)
+    assert db_session.get(BestScoreModel, (alice.id, "pass-through")).best_score == 50
+
+    # Two first inserts for the same key upsert instead of colliding
+    row = {"user_id": alice.id, "username": "Alice", "mode": "survival", "date": best.achieved_at}
+    db._update_best_scores([{**row, "id": "s-low", "score": 10}])
+    db._update_best_scores([{**row, "id": "s-high", "score": 40}])
+    db._update_best_scores([{**row, "id": "s-mid", "score": 20}])
+    db_session.expire_all()
+    assert db_session.get(BestScoreModel, (alice.id, "survival")).score_id == "s-high"
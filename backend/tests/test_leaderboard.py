@@ -1,3 +1,5 @@
+import pytest
+
 def test_get_leaderboard(client):
     response = client.get("/api/v1/leaderboard")
     assert response.status_code == 200
@@ -15,3 +17,117 @@ def test_submit_score(client, test_user_token):
     data = response.json()
     assert "rank" in data
     assert "isHighScore" in data
+
+def test_leaderboard_etag_not_modified(client):
+    response = client.get("/api/v1/leaderboard?mode=walls")
+    etag = response.headers["etag"]
+
+    response = client.get("/api/v1/leaderboard?mode=walls", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+def test_leaderboard_cache_invalidated_on_submit(client, test_user_token):
+    response = client.get("/api/v1/leaderboard?mode=walls")
+    etag = response.headers["etag"]
+    assert response.json() == []
+
+    headers = {"Authorization": f"Bearer {test_user_token}"}
+    client.post("/api/v1/leaderboard/submit", json={"score": 70, "mode": "walls", "duration": 30}, headers=headers)
+
+    response = client.get("/api/v1/leaderboard?mode=walls", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert [e["score"] for e in response.json()] == [70]
+
+def test_best_scope_lists_each_player_once(client, test_user_token, db_session):
+    from app.db import backfill_best_scores
+    from app.db_models import BestScoreModel
+    headers = {"Authorization": f"Bearer {test_user_token}"}
+    for score in [30, 90, 60]:
+        client.post("/api/v1/leaderboard/submit", json={"score": score, "mode": "walls", "duration": 9}, headers=headers)
+
+    assert [e["score"] for e in client.get("/api/v1/leaderboard?mode=walls").json()] == [90, 60, 30]
+    best = client.get("/api/v1/leaderboard?mode=walls&scope=best").json()
+    assert [(e["username"], e["score"], e["rank"]) for e in best] == [("TestUser", 90, 1)]
+
+    # Rebuilding from the raw scores gives the same table
+    db_session.query(BestScoreModel).delete()
+    backfill_best_scores(db_session)
+    assert [(b.best_score, b.mode) for b in db_session.query(BestScoreModel)] == [(90, "walls")]
+
+def seed_scores(db_session, scores, mode="walls"):
+    from datetime import datetime, timezone
+    from app.db import get_db_instance
+    from app.db_models import UserModel
+    db = get_db_instance(db_session)
+    for i, score in enumerate(scores):
+        db_session.add(UserModel(id=f"seed-{i}", username=f"Seed{i}", email=f"seed{i}@example.com",
+                                 hashed_password="x", created_at=datetime.now(timezone.utc)))
+        db_session.commit()
+        db.add_score(f"seed-{i}", score, mode)
+
+def walk_pages(client, limit):
+    pages, cursor = [], None
+    while True:
+        url = f"/api/v1/leaderboard/page?mode=walls&limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+        page = client.get(url).json()
+        pages.append([(e["score"], e["rank"]) for e in page["entries"]])
+        cursor = page["nextCursor"]
+        if cursor is None:
+            return pages
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_leaderboard_keyset_pages(client, db_session, indexed):
+    from app.ranking import leaderboard_index
+    seed_scores(db_session, [50, 80, 50, 20, 80, 10, 50])
+    if indexed:
+        leaderboard_index.load(db_session)
+    try:
+        pages = walk_pages(client, 3)
+    finally:
+        leaderboard_index.reset()
+    assert pages == [[(80, 1), (80, 2), (50, 3)], [(50, 4), (50, 5), (20, 6)], [(10, 7)]]
+    assert client.get("/api/v1/leaderboard/page?cursor=not-a-cursor").status_code == 400
+    assert client.get("/api/v1/leaderboard/page?limit=1000").status_code == 422
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_leaderboard_around_me(client, db_session, test_user_token, indexed):
+    from app.ranking import leaderboard_index
+    headers = {"Authorization": f"Bearer {test_user_token}"}
+    assert client.get("/api/v1/leaderboard/around-me", headers=headers).status_code == 404
+
+    seed_scores(db_session, [90, 80, 70, 50, 40, 30])
+    client.post("/api/v1/leaderboard/submit", json={"score": 60, "mode": "walls", "duration": 9}, headers=headers)
+    client.post("/api/v1/leaderboard/submit", json={"score": 10, "mode": "walls", "duration": 9}, headers=headers)
+    if indexed:
+        leaderboard_index.load(db_session)
+    try:
+        around = client.get("/api/v1/leaderboard/around-me?mode=walls&count=2", headers=headers).json()
+        top = client.get("/api/v1/leaderboard/around-me?count=2", headers=headers).json()
+    finally:
+        leaderboard_index.reset()
+    assert [(e["score"], e["rank"]) for e in around] == [(80, 2), (70, 3), (60, 4), (50, 5), (40, 6)]
+    assert [(e["score"], e["rank"]) for e in top] == [(80, 2), (70, 3), (60, 4), (50, 5), (40, 6)]
+
+def test_render_during_commit_does_not_cache_the_old_board(db_session, monkeypatch):
+    import asyncio
+    from app.cache import render_leaderboard
+    from app.ranking import leaderboard_index
+
+    seed_scores(db_session, [50])
+    leaderboard_index.load(db_session)
+    add = leaderboard_index.add
+
+    def add_after_a_render(*args):
+        # A request renders the board while the commit is being applied
+        asyncio.run(render_leaderboard(db_session, "walls", 10))
+        add(*args)
+
+    monkeypatch.setattr(leaderboard_index, "add", add_after_a_render)
+    try:
+        from app.db import get_db_instance
+        get_db_instance(db_session).add_score("seed-0", 90, "walls")
+        board = asyncio.run(render_leaderboard(db_session, "walls", 10))
+    finally:
+        leaderboard_index.reset()
+    assert b'"score":90' in board.body
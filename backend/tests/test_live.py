@@ -8,3 +8,169 @@ def test_watch_player(client):
     assert response.status_code == 200
     # Should return False for non-existent player
     assert response.json()["success"] is False
+
+def test_spectator_receives_published_frames(client):
+    response = client.post(
+        "/api/v1/auth/signup",
+        json={"username": "Streamer", "email": "streamer@example.com", "password": "password"}
+    )
+    token = response.json()["token"]
+    player_id = response.json()["user"]["id"]
+
+    with client:
+        with client.websocket_connect(f"/api/v1/live/ws/play?token={token}") as player:
+            player.send_text('{"score": 0}')
+            assert client.post(f"/api/v1/live/watch/{player_id}").json()["success"] is True
+
+            with client.websocket_connect(f"/api/v1/live/ws/watch/{player_id}") as viewer:
+                # A new viewer starts from the latest frame
+                assert viewer.receive_text() == '{"score": 0}'
+                player.send_text('{"score": 10}')
+                assert viewer.receive_text() == '{"score": 10}'
+
+def test_slow_subscriber_drops_oldest_frames():
+    import asyncio
+    from app.spectator import SpectatorHub
+
+    async def scenario():
+        hub = SpectatorHub(max_queue=3)
+        hub.open("p1")
+        subscriber = hub.subscribe("p1")
+        for i in range(10):
+            hub.publish("p1", str(i))
+        hub.close("p1")
+        frames = []
+        while (frame := await subscriber.get()) is not None:
+            frames.append(frame)
+        return frames, subscriber.dropped
+
+    frames, dropped = asyncio.run(scenario())
+    assert frames == ["7", "8", "9"]
+    assert dropped == 7
+
+def test_heartbeat_makes_player_live(client, test_user_token):
+    headers = {"Authorization": f"Bearer {test_user_token}"}
+    response = client.post("/api/v1/live/heartbeat", json={"score": 30, "mode": "walls"}, headers=headers)
+    assert response.status_code == 200
+    player_id = response.json()["id"]
+
+    client.post("/api/v1/live/heartbeat", json={"score": 40, "mode": "walls"}, headers=headers)
+    players = client.get("/api/v1/live/players").json()
+    assert [(p["username"], p["currentScore"]) for p in players] == [("TestUser", 40)]
+    assert client.post(f"/api/v1/live/watch/{player_id}").json()["success"] is True
+
+    assert client.delete("/api/v1/live/heartbeat", headers=headers).status_code == 204
+    assert client.get("/api/v1/live/players").json() == []
+
+def test_presence_expires_by_deadline(db_session):
+    from app.db_models import ActivePlayerModel
+    from app.presence import PresenceRegistry
+
+    now = [0.0]
+    registry = PresenceRegistry(ttl=10, persist=True, session_factory=lambda: db_session, clock=lambda: now[0])
+    registry._ensure_persister = lambda: None
+    registry.heartbeat("a", "A", "walls", 10)
+    registry.heartbeat("b", "B", "walls", 20)
+    now[0] = 8
+    registry.heartbeat("a", "A", "walls", 15)
+    registry.flush()
+    assert {p.id: p.current_score for p in db_session.query(ActivePlayerModel)} == {"a": 15, "b": 20}
+
+    # b's deadline passes; a's first deadline is superseded by the later heartbeat
+    now[0] = 12
+    assert [p.id for p in registry.snapshot()] == ["a"]
+    assert registry.stats()["expired"] == 1
+    registry.flush()
+    assert {p.id: p.is_live for p in db_session.query(ActivePlayerModel)} == {"a": True, "b": False}
+
+    now[0] = 18
+    assert registry.snapshot() == []
+
+def test_save_presence_is_one_upsert(db_session):
+    from datetime import datetime, timezone
+    from sqlalchemy import event
+    from app.db import Database
+    from app.db_models import ActivePlayerModel
+    from app.models import ActivePlayer
+
+    started = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    players = [
+        ActivePlayer(id=f"p{i}", username=f"P{i}", currentScore=i, mode="walls", isLive=True, startedAt=started)
+        for i in range(5)
+    ]
+    db = Database(db_session)
+    db.save_presence(players[:2], [])
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    engine = db_session.get_bind().engine
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        db.save_presence([p.model_copy(update={"currentScore": 50}) for p in players], ["gone"])
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    # No per-player SELECT: the upsert (one executemany) and the departure update
+    assert not any(statement.lstrip().upper().startswith("SELECT") for statement in statements)
+    assert {p.id: p.current_score for p in db_session.query(ActivePlayerModel)} == {f"p{i}": 50 for i in range(5)}
+
+def test_presence_feed_snapshot_diffs_and_resume():
+    import asyncio
+    import json
+    from app.livefeed import PresenceFeed
+    from app.presence import PresenceRegistry
+
+    def parse(frame):
+        fields = dict(line.split(": ", 1) for line in frame.decode().strip().split("\n"))
+        return int(fields["id"].rpartition("-")[2]), fields["event"], json.loads(fields["data"])
+
+    async def scenario():
+        registry = PresenceRegistry(ttl=10, persist=False)
+        feed = PresenceFeed(registry, interval_ms=60_000, history=1)
+        registry.heartbeat("a", "A", "walls", 0)
+        stream = feed.stream()
+        frame = await anext(stream)
+        assert frame.startswith(b"id: %s-0\n" % feed.epoch.encode())
+        seq, event, players = parse(frame)
+        assert (seq, event, [p["id"] for p in players]) == (0, "snapshot", ["a"])
+
+        # Several changes within one interval become a single diff
+        for score in (10, 20):
+            registry.heartbeat("a", "A", "walls", score)
+        registry.heartbeat("b", "B", "walls", 5)
+        feed.publish_pending()
+        seq, event, diff = parse(await anext(stream))
+        assert (seq, event, diff["scores"], [p["id"] for p in diff["joined"]]) == (1, "diff", {"a": 20}, ["b"])
+
+        registry.leave("b")
+        feed.publish_pending()
+        assert parse(await anext(stream))[2]["left"] == ["b"]
+
+        # Resuming right behind replays the missed diff; further back needs a snapshot
+        resumed = feed.stream(last_event_id=f"{feed.epoch}-1")
+        assert parse(await anext(resumed))[:2] == (2, "diff")
+        stale = feed.stream(last_event_id=f"{feed.epoch}-0")
+        seq, event, players = parse(await anext(stale))
+        assert (seq, event, [p["currentScore"] for p in players]) == (2, "snapshot", [20])
+        # Same sequence number from another instance: the ids cannot be compared
+        foreign = feed.stream(last_event_id="0123456789ab-1")
+        assert parse(await anext(foreign))[:2] == (2, "snapshot")
+        await feed.stop()
+        for s in (stream, resumed, stale, foreign):
+            await s.aclose()
+        assert feed.stats()["listeners"] == 0
+
+    asyncio.run(scenario())
+
+def test_second_publisher_is_rejected():
+    from app.spectator import SpectatorHub
+
+    hub = SpectatorHub()
+    assert hub.open("p1") is True
+    subscriber = hub.subscribe("p1")
+    # A duplicate socket must not take over, or close, the first one's channel
+    assert hub.open("p1") is False
+    hub.publish("p1", "frame")
+    assert not subscriber.closed and hub.is_live("p1")
+    hub.close("p1")
+    assert subscriber.closed
+    assert hub.open("p1") is True
@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool
+
+from app.metrics import Metrics, RequestStats, metrics
+
+
+def test_metrics_endpoint_reports_routes_and_sql(client, db_session, test_user_token):
+    metrics.instrument_engine(db_session.bind.engine, "test")
+    metrics.reset()
+
+    client.get("/api/v1/leaderboard/page?mode=walls")
+    client.get("/api/v1/leaderboard/page?cursor=bogus")
+    client.get("/api/v1/no-such-route")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+
+    route = 'method="GET",route="/api/v1/leaderboard/page"'
+    assert f"snaky_http_request_duration_seconds_count{{{route}}} 2" in body
+    assert f'snaky_http_request_duration_seconds_bucket{{{route},le="+Inf"}} 2' in body
+    assert f'snaky_http_responses_total{{{route},status="200"}} 1' in body
+    assert f'snaky_http_responses_total{{{route},status="400"}} 1' in body
+    assert 'route="unmatched",status="404"' in body
+
+    # The keyset page query ran on a DB thread but is charged to the route
+    sql_line = next(line for line in body.splitlines() if line.startswith(f"snaky_sql_statements_total{{{route}}}"))
+    assert int(sql_line.split()[-1]) >= 1
+    assert "snaky_identity_cache_hits" in body
+
+
+def test_render_histogram_is_cumulative():
+    registry = Metrics()
+    registry.observe_request("GET", "/x", 200, 0.003, RequestStats())
+    registry.observe_request("GET", "/x", 200, 0.3, RequestStats())
+    lines = registry.render().splitlines()
+    assert 'snaky_http_request_duration_seconds_bucket{method="GET",route="/x",le="0.001"} 0' in lines
+    assert 'snaky_http_request_duration_seconds_bucket{method="GET",route="/x",le="0.005"} 1' in lines
+    assert 'snaky_http_request_duration_seconds_bucket{method="GET",route="/x",le="0.5"} 2' in lines
+    assert 'snaky_http_request_duration_seconds_count{method="GET",route="/x"} 2' in lines
+
+
+def test_pool_gauges_and_checkout_wait(tmp_path):
+    registry = Metrics()
+    db_engine = create_engine(f"sqlite:///{tmp_path}/pool.db", poolclass=QueuePool, pool_size=2)
+    registry.instrument_engine(db_engine, "write")
+    with db_engine.connect() as connection:
+        connection.execute(text("select 1"))
+        lines = registry.render().splitlines()
+    db_engine.dispose()
+
+    assert 'snaky_db_pool_checkedout{engine="write"} 1' in lines
+    assert 'snaky_db_pool_size{engine="write"} 2' in lines
+    assert 'snaky_db_pool_checkout_wait_seconds_count{engine="write"} 1' in lines
+    assert "snaky_sql_statements_outside_requests_total 1" in lines
+
+
+def test_pool_timing_survives_dispose_and_errors_pop_the_stack(tmp_path):
+    registry = Metrics()
+    db_engine = create_engine(f"sqlite:///{tmp_path}/pool.db", poolclass=QueuePool, pool_size=2)
+    registry.instrument_engine(db_engine, "write")
+    db_engine.dispose()
+    with db_engine.connect() as connection:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                connection.execute(text("select * from missing"))
+        assert connection.info.get("metrics_started") == []
+        lines = registry.render().splitlines()
+    db_engine.dispose()
+
+    assert 'snaky_db_pool_checkout_wait_seconds_count{engine="write"} 1' in lines
+    assert 'snaky_db_pool_checkedout{engine="write"} 1' in lines
@@ -0,0 +1,113 @@
+import logging
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database import get_db, run_db
+from app.db_models import UserModel
+from app.profiler import SqlProfiler, SqlProfilerMiddleware, redact_parameters, statement_shape
+from app.routers import debug
+
+
+def test_statement_shape_collapses_in_lists():
+    a = statement_shape("SELECT * FROM users\n WHERE id IN (?, ?, ?)")
+    b = statement_shape("SELECT * FROM users WHERE id IN (?)")
+    c = statement_shape("SELECT * FROM users WHERE id IN (?, ?)")
+    assert a == c == "SELECT * FROM users WHERE id IN (?...)"
+    assert b == "SELECT * FROM users WHERE id IN (?)"
+
+
+def test_profile_flags_repeated_and_slow_statements(db_session, caplog):
+    profiler = SqlProfiler(slow_ms=0, repeat_threshold=5, show_parameters=True)
+    profiler.instrument_engine(db_session.bind.engine)
+
+    with caplog.at_level(logging.WARNING, logger="app.profiler"):
+        with profiler.profile("seed") as profile:
+            for i in range(6):
+                db_session.query(UserModel).filter(UserModel.id == f"user-{i}").first()
+
+    report = profiler.recent()[0]
+    assert report["request"] == "seed"
+    assert report["statements"] == profile.statements == 6
+    assert report["distinct"] == 1
+    assert report["repeated"][0]["count"] == 6
+    # Everything is "slow" at a 0 ms threshold, and each carries its plan and parameters
+    assert report["slow"][0]["plan"] and "users" in " ".join(report["slow"][0]["plan"])
+    assert "user-0" in report["slow"][0]["parameters"]
+    assert "possible N+1 in seed: statement ran 6 times" in caplog.text
+
+
+def test_middleware_adds_header_and_follows_run_db(db_session):
+    profiler = SqlProfiler(slow_ms=1000, repeat_threshold=3)
+    profiler.instrument_engine(db_session.bind.engine)
+    app = FastAPI()
+    app.add_middleware(SqlProfilerMiddleware, profiler=profiler)
+
+    @app.get("/users")
+    async def users(session: Session = Depends(get_db)):
+        for _ in range(3):
+            await run_db(lambda: session.execute(text("SELECT count(*) FROM users")).scalar())
+        return {}
+
+    app.dependency_overrides[get_db] = lambda: db_session
+    response = TestClient(app).get("/users?x=1")
+
+    assert response.headers["x-sql-profile"].startswith("statements=3; ")
+    assert response.headers["x-sql-profile"].endswith("distinct=1; slow=0; repeated=1")
+    assert profiler.recent()[0]["request"] == "GET /users?x=1"
+
+
+def test_parameters_are_redacted_by_default(db_session, caplog):
+    profiler = SqlProfiler(slow_ms=0)
+    profiler.instrument_engine(db_session.bind.engine)
+
+    with caplog.at_level(logging.WARNING, logger="app.profiler"):
+        with profiler.profile("login"):
+            db_session.query(UserModel).filter(UserModel.email == "secret@example.com").first()
+
+    slow = profiler.recent()[0]["slow"][0]
+    assert slow["parameters"] == "(str, int, int)"
+    assert "secret@example.com" not in caplog.text
+    assert redact_parameters([("a", 1), ("b", 2)]) == "[2 x (str, int)]"
+    assert redact_parameters({"email": "x", "limit": 1}) == "{email: str, limit: int}"
+
+
+def test_debug_endpoint_requires_localhost_or_token(monkeypatch):
+    app = FastAPI()
+    app.include_router(debug.router)
+
+    assert TestClient(app).get("/debug/sql").status_code == 403
+    local = TestClient(app, client=("127.0.0.1", 50000))
+    assert local.get("/debug/sql").status_code == 200
+    assert local.get("/debug/sql", headers={"X-Forwarded-For": "203.0.113.9"}).status_code == 403
+
+    monkeypatch.setattr(debug, "SQL_PROFILE_TOKEN", "s3cret")
+    assert local.get("/debug/sql").status_code == 403
+    assert TestClient(app).get("/debug/sql", headers={"X-Debug-Token": "s3cret"}).status_code == 200
+
+
+def test_failed_explain_is_rolled_back_to_a_savepoint():
+    from types import SimpleNamespace
+
+    executed = []
+
+    class Cursor:
+        def execute(self, sql, parameters=None):
+            executed.append(sql.split(" ")[0] if not sql.startswith("ROLLBACK") else "ROLLBACK TO")
+            if sql.startswith("EXPLAIN"):
+                raise RuntimeError("syntax error")
+
+        def close(self):
+            pass
+
+    conn = SimpleNamespace(
+        dialect=SimpleNamespace(name="postgresql"),
+        connection=SimpleNamespace(dbapi_connection=SimpleNamespace(cursor=Cursor)),
+    )
+    plan = SqlProfiler().explain(conn, "SELECT * FROM users WHERE id = %(id)s", {"id": "x"})
+
+    assert plan == ["EXPLAIN failed: syntax error"]
+    # The request's transaction is left as it was before the EXPLAIN
+    assert executed == ["SAVEPOINT", "EXPLAIN", "ROLLBACK TO"]
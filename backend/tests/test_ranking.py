@@ -0,0 +1,62 @@
+import random
+from datetime import datetime, timedelta
+
+from app import db as db_module
+from app.db import Database
+from app.models import UserCreate
+from app.ranking import RankedIndex, LeaderboardIndex
+
+
+def test_ranked_index_matches_sorted_list():
+    rng = random.Random(7)
+    index = RankedIndex(seed=1)
+    reference = []
+    for i in range(500):
+        key = (rng.randint(0, 50), i)
+        index.insert(key, i)
+        reference.append(key)
+        if i % 7 == 0:
+            victim = reference.pop(rng.randrange(len(reference)))
+            index.remove(victim)
+    reference.sort()
+
+    assert len(index) == len(reference)
+    assert [k for k, _ in index] == reference
+    assert [k for k, _ in index.slice(40, 60)] == reference[40:60]
+    for probe in [(0,), (10,), (25, 100), (51,)]:
+        expected = sum(1 for k in reference if k < probe)
+        assert index.bisect_left(probe) == expected
+        assert index.bisect_right(probe) == sum(1 for k in reference if k <= probe)
+    assert index.bisect_right(reference[10]) == index.bisect_left(reference[10]) + 1
+
+
+def test_leaderboard_index_rank_and_top():
+    index = LeaderboardIndex()
+    base = datetime(2024, 1, 1)
+    index.add("a", "A", 100, "walls", base)
+    index.add("b", "B", 300, "walls", base + timedelta(minutes=1))
+    index.add("c", "C", 300, "walls", base)
+    index.add("d", "D", 500, "pass-through", base)
+
+    assert [r[0] for r in index.top("walls", 10)] == ["c", "b", "a"]
+    assert [r[0] for r in index.top(None, 2)] == ["d", "c"]
+    assert index.rank("walls", 300) == 1
+    assert index.rank("walls", 200) == 3
+    assert index.rank("walls", 50) == 4
+
+
+def test_database_uses_loaded_index(db_session, monkeypatch):
+    db = Database(db_session)
+    user = db.create_user(UserCreate(username="Ranker", email="rank@example.com", password="pw"))
+    for score in [50, 400, 200]:
+        db.add_score(user.id, score, "walls")
+    expected = [(e.id, e.rank) for e in db.get_leaderboard(mode="walls", limit=10)]
+
+    index = LeaderboardIndex()
+    index.load(db_session)
+    monkeypatch.setattr(db_module, "leaderboard_index", index)
+
+    assert [(e.id, e.rank) for e in db.get_leaderboard(mode="walls", limit=10)] == expected
+    result = db.add_score(user.id, 300, "walls")
+    assert result["rank"] == 2
+    assert [e.score for e in db.get_leaderboard(mode="walls", limit=10)] == [400, 300, 200, 50]
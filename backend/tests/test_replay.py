@@ -0,0 +1,130 @@
+import asyncio
+import random
+import time
+
+import numpy as np
+
+from app.engine import BatchEngine, DIRECTIONS
+from app.replay import ReplayVerifier, VerifierBusy, verify_replays
+from app.routers import leaderboard as leaderboard_router
+
+
+def record_game(seed, mode="walls", grid_size=10, turn_seed=0):
+    """Play a random game on the engine and return its submission fields"""
+    rng = random.Random(turn_seed)
+    engine = BatchEngine(1, grid_size=grid_size, modes=mode, seeds=[seed])
+    moves, ticks, elapsed = [], 0, 0
+    effective = engine.next_direction[0]
+    while engine.alive[0]:
+        if rng.random() < 0.3:
+            engine.set_directions(np.array([0]), np.array([rng.randrange(4)]))
+        if engine.next_direction[0] != effective:
+            effective = engine.next_direction[0]
+            moves.append((ticks, DIRECTIONS[effective]))
+        elapsed += int(engine.speed[0])
+        engine.step()
+        ticks += 1
+    return {
+        "score": int(engine.score[0]),
+        "mode": mode,
+        "duration": elapsed // 1000 + 1,
+        "replay": {"seed": seed, "gridSize": grid_size, "ticks": ticks, "moves": moves},
+    }
+
+
+def as_job(game):
+    return {"score": game["score"], "mode": game["mode"], "duration": game["duration"], **game["replay"]}
+
+
+def test_verify_replays_batch():
+    games = [record_game(seed, mode, turn_seed=seed) for seed, mode in
+             [(1, "walls"), (2, "pass-through"), (3, "walls")]]
+    cheat_score = {**as_job(games[0]), "score": games[0]["score"] + 500}
+    cheat_ticks = {**as_job(games[1]), "ticks": games[1]["replay"]["ticks"] + 5}
+    cheat_duration = {**as_job(games[2]), "duration": 0}
+    jobs = [as_job(g) for g in games] + [cheat_score, cheat_ticks]
+    if games[2]["duration"] > 1:
+        jobs.append(cheat_duration)
+
+    verdicts = verify_replays(jobs)
+    assert [accepted for accepted, _ in verdicts[:3]] == [True, True, True]
+    assert not any(accepted for accepted, _ in verdicts[3:])
+
+
+def test_submit_with_replay_is_verified(client, test_user_token, db_session, monkeypatch):
+    verifier = ReplayVerifier(workers=1, batch_delay=0.001, session_factory=lambda: db_session)
+    monkeypatch.setattr(leaderboard_router, "replay_verifier", verifier)
+    headers = {"Authorization": f"Bearer {test_user_token}"}
+    game = record_game(11, turn_seed=4)
+
+    with client:
+        response = client.post("/api/v1/leaderboard/submit", json=game, headers=headers)
+        assert response.status_code == 202
+        assert response.json()["status"] == "pending"
+        verification_url = f"/api/v1/leaderboard/verifications/{response.json()['verificationId']}"
+
+        deadline = time.time() + 30
+        while (status := client.get(verification_url, headers=headers).json())["status"] == "pending":
+            assert time.time() < deadline
+            time.sleep(0.05)
+        client.portal.call(verifier.stop)
+
+    assert status["status"] == "accepted"
+    assert status["rank"] == 1
+    scores = [e["score"] for e in client.get("/api/v1/leaderboard?mode=walls").json()]
+    assert scores == [game["score"]]
+
+
+def test_full_replay_queue_rejects_submits(client, test_user_token, monkeypatch):
+    verifier = ReplayVerifier(workers=1, max_queue=1)
+    game = record_game(11, turn_seed=4)
+
+    # No await between the two submits, so the collector cannot drain the queue
+    async def submit_twice():
+        try:
+            verifier.submit("u1", game["score"], game["mode"], game["duration"], game["replay"])
+            verifier.submit("u1", game["score"], game["mode"], game["duration"], game["replay"])
+        except VerifierBusy:
+            return True
+        finally:
+            await verifier.stop()
+        return False
+
+    assert asyncio.run(submit_twice())
+    assert verifier.rejected == 1
+
+    def busy(*args):
+        raise VerifierBusy("full")
+
+    monkeypatch.setattr(leaderboard_router.replay_verifier, "submit", busy)
+    response = client.post(
+        "/api/v1/leaderboard/submit", json=game, headers={"Authorization": f"Bearer {test_user_token}"}
+    )
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+def test_database_errors_reject_the_verdict(db_session, monkeypatch, caplog):
+    from sqlalchemy.exc import OperationalError
+    from app.db import Database
+    from app.replay import Verdict
+
+    def locked(self, submissions):
+        raise OperationalError("INSERT INTO scores", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(Database, "add_scores", locked)
+    verifier = ReplayVerifier(session_factory=lambda: db_session)
+    games = [record_game(seed, turn_seed=seed) for seed in (1, 3)]
+    verdicts = [Verdict(f"v{i}", "u1") for i in range(len(games))]
+
+    async def run():
+        verifier._loop = asyncio.get_running_loop()
+        verifier._in_flight = asyncio.Semaphore(1)
+        await verifier._in_flight.acquire()
+        # No process pool: verification runs on the loop's default executor
+        await verifier._run_batch(list(zip(verdicts, [as_job(g) for g in games])))
+
+    asyncio.run(run())
+    assert [v.status for v in verdicts] == ["rejected", "rejected"]
+    assert "database is locked" in verdicts[1].reason
+    assert "recording verified replay v0 failed" in caplog.text
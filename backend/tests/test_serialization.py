@@ -0,0 +1,32 @@
+from datetime import datetime, timezone
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app.models import ActivePlayer, LeaderboardEntry, LeaderboardPage
+from app.presence import PresenceEntry
+from app.serialization import encode_leaderboard, encode_leaderboard_page, active_players_json
+
+RECORDS = [
+    ("s1", "Alice", 300, "walls", datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)),
+    ("s2", "Bob", 200, "pass-through", datetime(2024, 5, 2, 8, 30, 15, 123456)),
+]
+
+
+def test_leaderboard_encoding_matches_models():
+    models = [
+        LeaderboardEntry(id=i, username=u, score=s, mode=m, date=d, rank=rank)
+        for rank, (i, u, s, m, d) in enumerate(RECORDS, 7)
+    ]
+    assert encode_leaderboard(RECORDS, 7) == TypeAdapter(List[LeaderboardEntry]).dump_json(models)
+    assert encode_leaderboard_page(RECORDS, 7, "abc") == LeaderboardPage(
+        entries=models, nextCursor="abc"
+    ).model_dump_json().encode()
+    assert encode_leaderboard([], 1) == b"[]"
+
+
+def test_active_player_encoding_matches_models():
+    entry = PresenceEntry("u1", "Alice", "walls", 40, datetime(2024, 5, 1, tzinfo=timezone.utc), 0.0)
+    assert active_players_json.dump_json([entry.as_row()]) == TypeAdapter(List[ActivePlayer]).dump_json(
+        [entry.as_player()]
+    )
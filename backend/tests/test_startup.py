@@ -0,0 +1,93 @@
+import subprocess
+import sys
+
+import pytest
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.pool import QueuePool
+
+from app.database import init_db, schema_fingerprint, stored_schema_fingerprint
+from app.startup import BootProfile, warm_pool, warm_statements
+
+
+def test_init_db_skips_create_all_when_schema_version_matches(tmp_path):
+    db_engine = create_engine(f"sqlite:///{tmp_path}/boot.db")
+    assert stored_schema_fingerprint(db_engine) is None
+
+    assert init_db(check_version=True, db_engine=db_engine) is True
+    assert stored_schema_fingerprint(db_engine) == schema_fingerprint(db_engine)
+    assert {"users", "scores", "best_scores", "schema_version"} <= set(inspect(db_engine).get_table_names())
+
+    assert init_db(check_version=True, db_engine=db_engine) is False
+    # Without the version check create_all always runs
+    assert init_db(db_engine=db_engine) is True
+    db_engine.dispose()
+
+
+def test_init_db_adds_new_indexes_to_existing_tables(tmp_path):
+    from sqlalchemy import text
+
+    db_engine = create_engine(f"sqlite:///{tmp_path}/old.db")
+    init_db(db_engine=db_engine)
+    # A scores table created before the leaderboard indexes were declared
+    with db_engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_scores_board"))
+        connection.execute(text("DROP INDEX ix_scores_rank"))
+
+    init_db(db_engine=db_engine)
+    names = {index["name"] for index in inspect(db_engine).get_indexes("scores")}
+    assert {"ix_scores_board", "ix_scores_rank"} <= names
+    db_engine.dispose()
+
+
+def test_init_db_stamps_only_after_indexes_exist(tmp_path, monkeypatch):
+    from sqlalchemy import Index, text
+    from app import database
+
+    db_engine = create_engine(f"sqlite:///{tmp_path}/stamped.db")
+    # Stamped by an init_db that did not add indexes to existing tables
+    monkeypatch.setattr(database, "SCHEMA_INIT_REVISION", database.SCHEMA_INIT_REVISION - 1)
+    init_db(db_engine=db_engine)
+    monkeypatch.undo()
+    with db_engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_scores_rank"))
+
+    def fail(self, bind, checkfirst=False):
+        raise RuntimeError("disk full")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(Index, "create", fail)
+        with pytest.raises(RuntimeError):
+            init_db(check_version=True, db_engine=db_engine)
+    assert stored_schema_fingerprint(db_engine) != schema_fingerprint(db_engine)
+
+    assert init_db(check_version=True, db_engine=db_engine) is True
+    assert "ix_scores_rank" in {index["name"] for index in inspect(db_engine).get_indexes("scores")}
+    assert init_db(check_version=True, db_engine=db_engine) is False
+    db_engine.dispose()
+
+
+def test_warm_up_helpers(tmp_path):
+    db_engine = create_engine(f"sqlite:///{tmp_path}/warm.db", poolclass=QueuePool, pool_size=3)
+    init_db(db_engine=db_engine)
+    assert warm_pool(db_engine, connections=10) == 3
+    assert db_engine.pool.checkedin() == 3
+    warm_statements(db_engine)
+    db_engine.dispose()
+
+
+def test_boot_profile_report():
+    profile = BootProfile()
+    profile.record("imports", 0.5)
+    with profile.phase("schema"):
+        pass
+    assert list(profile.stats()) == ["imports_seconds", "schema_seconds", "total_seconds"]
+    assert "imports" in profile.report() and "total" in profile.report()
+
+
+def test_app_import_skips_heavy_modules():
+    code = "import sys, app.main; print(sorted(m for m in ('numpy', 'passlib') if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, env={"TESTING": "1", "PATH": ""}, check=True
+    )
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta, timezone
+
+from app.db_models import ScoreModel
+from app.ranking import normalize_date
+from app.windows import WindowedLeaderboards, window_start
+
+
+def test_window_start_daily_and_weekly():
+    thursday = datetime(2024, 5, 16, 13, 30)
+    assert window_start("daily", thursday).isoformat() == "2024-05-16"
+    assert window_start("weekly", thursday).isoformat() == "2024-05-13"
+
+
+def test_windowed_boards_merge_trim_and_expire(db_session):
+    monday = datetime(2024, 5, 13, 9)
+    boards = WindowedLeaderboards(top_k=3, retention_days=7)
+    for i, (score, days) in enumerate([(100, -1), (40, 0), (70, 0), (90, 2), (10, 2), (20, 2), (30, 2), (60, 3)]):
+        db_session.add(ScoreModel(id=f"s{i}", user_id="u", username=f"P{i}", score=score,
+                                  mode="walls", date=monday + timedelta(days=days)))
+    db_session.flush()
+    thursday = monday + timedelta(days=3)
+    boards.load(db_session, now=thursday)
+
+    assert [r[2] for r in boards.top("daily", "walls", 10, now=thursday)] == [60]
+    # Sunday's 100 is before this week; Wednesday's bucket kept only its top 3
+    assert [r[2] for r in boards.top("weekly", "walls", 10, now=thursday)] == [90, 70, 60]
+    assert [r[2] for _, r in boards._buckets[(monday.date() + timedelta(days=2), "walls")]] == [90, 30, 20]
+    assert [r[2] for r in boards.top("weekly", None, 2, now=thursday)] == [90, 70]
+
+    # A week later every bucket loaded above has aged out
+    boards.top("daily", "walls", 10, now=thursday + timedelta(days=7))
+    assert boards._buckets == {}
+
+
+def test_daily_leaderboard_endpoint(client, test_user_token, db_session):
+    headers = {"Authorization": f"Bearer {test_user_token}"}
+    client.post("/api/v1/leaderboard/submit", json={"score": 40, "mode": "walls", "duration": 9}, headers=headers)
+    user_id = db_session.query(ScoreModel).first().user_id
+    db_session.add(ScoreModel(id="old", user_id=user_id, username="TestUser", score=900,
+                              mode="walls", date=normalize_date(datetime.now(timezone.utc)) - timedelta(days=8)))
+    db_session.commit()
+
+    assert [e["score"] for e in client.get("/api/v1/leaderboard?mode=walls&window=daily").json()] == [40]
+    assert [e["score"] for e in client.get("/api/v1/leaderboard?mode=walls").json()] == [900, 40]
+    assert client.get("/api/v1/leaderboard?window=weekly&scope=best").status_code == 400